@@ -0,0 +1,98 @@
+"""
+This module computes lower bounds on the number of groups needed to group a set of PCBs. They allow the searches
+to stop as soon as the incumbent matches the bound and to cut branches that can no longer reach the incumbent.
+
+The bounds used are:
+    - a clique of pairwise incompatible PCBs, every one of them needs its own group,
+    - PCBs wider than C_max on their own, which can only be produced in a group of one,
+    - the material covering relaxation: every material of the remaining PCBs has to be loaded in at least one
+      group and no group holds more than C_max, so at least ceil(width of all materials / C_max) groups are needed.
+"""
+import math
+
+import numpy as np
+
+from algorithms.compatibility import CompatibilityIndex
+
+
+def _bitset(row: np.ndarray) -> int:
+    return int.from_bytes(np.packbits(row, bitorder="little").tobytes(), "little")
+
+
+class SearchBound:
+    """
+    Pairwise incompatibility of a list of PCBs as integer bitsets over their positions in that list.
+
+    :param pcbs: List of PCB identifiers.
+    :param pcb_masks: Dictionary with PCB identifiers as keys and their material bitmasks as values.
+    :param material_widths: List of slot widths indexed by the bit position of the material.
+    :param C_max: Maximum allowed slot width for any group.
+    """
+
+    def __init__(self, pcbs, pcb_masks, material_widths, C_max):
+        self.pcbs = list(pcbs)
+        self.C_max = C_max
+
+        incidence = np.zeros((len(self.pcbs), len(material_widths)), dtype=bool)
+        for i, pcb in enumerate(self.pcbs):
+            mask = pcb_masks[pcb]
+            incidence[i] = [(mask >> bit) & 1 for bit in range(len(material_widths))]
+        self.index = CompatibilityIndex(self.pcbs, incidence, material_widths, C_max)
+
+        self.bit = {pcb: 1 << i for i, pcb in enumerate(self.pcbs)}
+        self._incompatible_at = [_bitset(~row) for row in self.index.compatible]          # PCBs that can never share a group with the PCB
+        self.incompatible = {pcb: self._incompatible_at[i] for i, pcb in enumerate(self.pcbs)}
+
+    def mask(self, pcbs) -> int:
+        """ Bitset of the positions of the given PCBs. """
+        mask = 0
+        for pcb in pcbs:
+            mask |= self.bit[pcb]
+        return mask
+
+    def clique(self, candidates: int, start=None) -> int:
+        """
+        Size of a greedy clique of pairwise incompatible PCBs among the candidates, optionally containing the PCB at
+        position start. Every PCB of the clique needs its own group.
+        """
+        size = 0
+        if start is not None:
+            size = 1
+            candidates &= self._incompatible_at[start]
+        while candidates:
+            position = (candidates & -candidates).bit_length() - 1
+            size += 1
+            candidates &= self._incompatible_at[position]
+        return size
+
+    def lower_bound(self, pcbs=None) -> int:
+        """
+        Lower bound on the number of groups needed for the given PCBs (all PCBs of the bound if not given).
+        """
+        candidates = self.mask(self.pcbs if pcbs is None else pcbs)
+        if not candidates:
+            return 0
+
+        positions = [position for position in range(len(self.pcbs)) if (candidates >> position) & 1]
+
+        best_clique = max(self.clique(candidates, start) for start in positions)
+
+        oversized = [position for position in positions if self.index.widths[position] > self.C_max]
+        regular = [position for position in positions if self.index.widths[position] <= self.C_max]
+        covered_width = int(self.index.incidence[regular].any(axis=0) @ self.index.material_widths) if regular else 0
+        covering = len(oversized) + math.ceil(covered_width / self.C_max)
+
+        return max(1, best_clique, covering)
+
+
+def lower_bound(pcbs, pcb_masks, material_widths, C_max) -> int:
+    '''
+    This function returns a lower bound on the number of groups needed to group the PCBs.
+
+    :param pcbs: List of PCB identifiers.
+    :param pcb_masks: Dictionary with PCB identifiers as keys and their material bitmasks as values.
+    :param material_widths: List of slot widths indexed by the bit position of the material.
+    :param C_max: Maximum allowed slot width for any group.
+    :return: Number of groups that every valid combination needs at least.
+    '''
+    return SearchBound(pcbs, pcb_masks, material_widths, C_max).lower_bound()
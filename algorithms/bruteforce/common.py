@@ -0,0 +1,300 @@
+"""
+This module contains the search routines shared by the serial, hybrid and parallel brute forcing optimization algorithms.
+The material set of every PCB is encoded as an integer bitmask over the index of the material catalogue, so that
+merging PCBs into a group costs one bitwise OR plus a width lookup of the newly added materials.
+"""
+import time
+from collections import namedtuple
+
+from algorithms.bounds import SearchBound
+from algorithms.dataset import DEFAULT_DATASET_PATH, get_dataset, pcb_name
+
+# A node of the search tree: the first depth PCBs are placed in groups, blocked holds for every group the bitset of
+# PCBs that must not be added to it.
+Subtree = namedtuple("Subtree", ["depth", "groups", "blocked"])
+
+CHECK_INTERVAL = 1024     # search nodes visited between two looks at the clock and two progress reports
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised by a search whose deadline passed. It carries the best combination found so far and the best proven lower
+    bound on the number of groups, so the caller can still answer.
+    """
+
+    def __init__(self, combination=None, lower_bound=None):
+        super().__init__("The deadline of the search passed.")
+        self.combination = combination
+        self.lower_bound = lower_bound
+
+
+def deadline_after(time_limit):
+    '''
+    This function converts a time limit in seconds ( or None for no limit ) to a deadline on the time.monotonic() clock.
+    '''
+    return None if time_limit is None else time.monotonic() + time_limit
+
+
+def encode_materials(pcb_data_dict, material_catalogue_dict):
+    '''
+    This function encodes the materials of every PCB as an integer bitmask over the material catalogue index.
+
+    :param pcb_data_dict: Dictionary with PCB identifiers as keys and lists of required materials as values.
+    :param material_catalogue_dict: Dictionary with material identifiers as keys and their respective slot widths as values.
+    :return: Tuple of a dictionary with PCB identifiers as keys and their material bitmasks as values, and a list of
+             slot widths indexed by the bit position of the material.
+    '''
+    material_bits = {material: bit for bit, material in enumerate(material_catalogue_dict)}   # bit position of every material ( position in Material_catalogue )
+    material_widths = [int(width) for width in material_catalogue_dict.values()]
+
+    pcb_masks = {}
+    for pcb, materials in pcb_data_dict.items():
+        mask = 0
+        for material in materials:
+            mask |= 1 << material_bits[material]
+        pcb_masks[pcb] = mask
+
+    return pcb_masks, material_widths
+
+
+def load_pcbs(input_pcb_list, dataset_path=DEFAULT_DATASET_PATH):
+    '''
+    This function takes the PCBs to be grouped from the resident dataset, so the CSV files are only parsed again if they changed.
+
+    :param input_pcb_list: List of PCB numbers.
+    :param dataset_path: Directory containing Material_catalogue.csv and the PCB###.csv files.
+    :return: Tuple of the PCB identifiers sorted by their total slot width in descending order, a dictionary with PCB
+             identifiers as keys and their materials as values, a dictionary with PCB identifiers as keys and their
+             material bitmasks as values, and a list of slot widths indexed by the bit position of the material.
+    '''
+    dataset = get_dataset(dataset_path)
+    pcb_list = list(dict.fromkeys(pcb_name(pcb_number) for pcb_number in input_pcb_list))      # list of all PCBs ( without duplicates )
+    pcb_masks, material_widths = dataset.encode(pcb_list)
+    pcb_data_dict = dataset.pcb_data_dict(pcb_list)
+    pcb_list = sorted(pcb_list, key=dataset.pcb_width, reverse=True)    # sorting PCBs basing on their total slot width in descending order
+    return pcb_list, pcb_data_dict, pcb_masks, material_widths
+
+
+def mask_width(mask, material_widths):
+    '''
+    This function sums the slot widths of all materials set in a bitmask.
+
+    :param mask: Integer bitmask of materials.
+    :param material_widths: List of slot widths indexed by the bit position of the material.
+    :return: Total slot width of the materials in the mask.
+    '''
+    width = 0
+    while mask:
+        lowest_bit = mask & -mask
+        width += material_widths[lowest_bit.bit_length() - 1]
+        mask ^= lowest_bit
+    return width
+
+
+def group_mask(group, pcb_masks):
+    '''
+    This function computes the union of the material bitmasks of a group of PCBs.
+
+    :param group: List of PCB identifiers forming a group.
+    :param pcb_masks: Dictionary with PCB identifiers as keys and their material bitmasks as values.
+    :return: Integer bitmask of all materials required by the group.
+    '''
+    mask = 0
+    for pcb in group:
+        mask |= pcb_masks[pcb]
+    return mask
+
+
+def is_valid_group(group, pcb_masks, material_widths, C_max):
+    '''
+    This function checks if a group of PCBs is valid based on their total required slot width.
+
+    :param group: List of PCB identifiers forming a group.
+    :param pcb_masks: Dictionary with PCB identifiers as keys and their material bitmasks as values.
+    :param material_widths: List of slot widths indexed by the bit position of the material.
+    :param C_max: Maximum allowed slot width for any group.
+    :return: True if the group is valid, otherwise False.
+    '''
+    if len(group) == 1:    # a group consisting of only one PCB is always valid
+        return True
+
+    return mask_width(group_mask(group, pcb_masks), material_widths) <= C_max     # shared materials are only counted once by the union of the masks
+
+
+def generate_combinations(pcbs, pcb_masks, material_widths, C_max, current_groups, min_groups, group_masks=None, group_widths=None, search_bound=None, group_excluded=None, split_depth=None, deadline=None, progress=None):
+    '''
+    This function generates combinations of PCBs based on their total required slot width.
+    It aims to find the minimum number of groups such that the combined slot width of PCBs in each group does not exceed C_max.
+
+    :param pcbs: List of PCB identifiers to be grouped.
+    :param pcb_masks: Dictionary with PCB identifiers as keys and their material bitmasks as values.
+    :param material_widths: List of slot widths indexed by the bit position of the material.
+    :param C_max: Maximum allowed slot width for any group.
+    :param current_groups: List of current groups of PCBs being formed. Defaults to an empty list.
+    :param min_groups: A list containing a single element which is the minimum number of groups found so far. Defaults to infinity.
+    :param group_masks: Material bitmask of every group in current_groups. Computed from current_groups if not given.
+    :param group_widths: Slot width of every group in current_groups. Computed from group_masks if not given.
+    :param search_bound: SearchBound covering pcbs and the PCBs of current_groups. Built from them if not given.
+    :param group_excluded: Bitset (over the positions of search_bound) for every group in current_groups, of PCBs that
+                           must not be added to it. Used to split the search into disjoint parts.
+    :param split_depth: If given, the search stops after placing this many PCBs and yields a Subtree for every node
+                        reached there instead of combinations. Every Subtree can be searched on its own by passing
+                        pcbs[subtree.depth:], subtree.groups and subtree.blocked (as group_excluded) back in.
+    :param deadline: time.monotonic() value after which the search raises DeadlineExceeded. No limit if not given.
+    :param progress: SearchProgress the number of explored search nodes is added to. If it is instrumented, the
+                     validity checks, prunes by the bound, solutions and the nodes and time per depth are added too.
+    :return: Generator yielding valid combinations of groups.
+    '''
+    pcbs = list(pcbs)
+    if group_masks is None:
+        group_masks = [group_mask(group, pcb_masks) for group in current_groups]
+    if group_widths is None:
+        group_widths = [mask_width(mask, material_widths) for mask in group_masks]
+    if search_bound is None:
+        search_bound = SearchBound(pcbs + [pcb for group in current_groups for pcb in group], pcb_masks, material_widths, C_max)
+
+    pcb_bits = [search_bound.bit[pcb] for pcb in pcbs]
+    incompatible = search_bound.incompatible
+
+    visited = [0]
+
+    instrumented = progress is not None and progress.instrumented
+    counts = [0, 0, 0]                                                  # validity checks, prunes by the bound and solutions since the last report
+    depth_nodes = [0] * (len(pcbs) + 1)
+    depth_seconds = [0.0] * (len(pcbs) + 1)
+    last_visit = [time.perf_counter(), 0]                               # time and depth of the last node visited, it is charged the time until the next one
+
+    def report_counts():
+        progress.add_counts(*counts, depth_nodes, depth_seconds)
+        counts[:] = [0, 0, 0]
+        depth_nodes[:] = [0] * len(depth_nodes)
+        depth_seconds[:] = [0.0] * len(depth_seconds)
+
+    def search(depth, groups, masks, widths, blocked, remaining):
+        if deadline is not None or progress is not None:
+            visited[0] += 1
+            if instrumented:
+                now = time.perf_counter()
+                depth_seconds[last_visit[1]] += now - last_visit[0]
+                last_visit[0], last_visit[1] = now, depth
+                depth_nodes[depth] += 1
+            if visited[0] % CHECK_INTERVAL == 0:
+                if progress is not None:
+                    progress.add_nodes(CHECK_INTERVAL)
+                    if instrumented:
+                        report_counts()
+                if deadline is not None and time.monotonic() > deadline:
+                    raise DeadlineExceeded()
+
+        if depth == len(pcbs):                                          # base case: If there are no PCBs left to group, yield the current grouping and return
+            if instrumented and split_depth is None:
+                counts[2] += 1
+            yield groups if split_depth is None else Subtree(depth, groups, blocked)
+            return
+
+        if len(groups) > min_groups[0]:                                 # pruning: If the current number of groups exceeds the minimum found so far, stop further exploration
+            if instrumented:
+                counts[1] += 1
+            return
+
+        unplaceable = remaining                                         # remaining PCBs that are incompatible with a PCB of every current group, they need new groups
+        for group_blocked in blocked:
+            unplaceable &= group_blocked
+        if unplaceable and len(groups) + search_bound.clique(unplaceable) > min_groups[0]:    # pruning: the new groups they need already exceed the minimum found so far
+            if instrumented:
+                counts[1] += 1
+            return
+
+        if depth == split_depth:
+            yield Subtree(depth, groups, blocked)
+            return
+
+        pcb = pcbs[depth]
+        pcb_mask = pcb_masks[pcb]
+        pcb_bit = pcb_bits[depth]
+        rest = remaining & ~pcb_bit
+        for i, group in enumerate(groups):                              # try to add the next PCB to each of the existing groups and recurse
+            if blocked[i] & pcb_bit:                                    # incompatible with a member of the group ( or excluded from it )
+                continue
+            new_width = widths[i] + mask_width(pcb_mask & ~masks[i], material_widths)   # only the materials missing in the group add to its width
+            if instrumented:
+                counts[0] += 1
+            if new_width <= C_max:
+                yield from search(depth + 1,
+                                  groups[:i] + [group + [pcb]] + groups[i + 1:],
+                                  masks[:i] + [masks[i] | pcb_mask] + masks[i + 1:],
+                                  widths[:i] + [new_width] + widths[i + 1:],
+                                  blocked[:i] + [blocked[i] | incompatible[pcb]] + blocked[i + 1:],
+                                  rest)
+
+        if len(groups) + 1 <= min_groups[0]:                            # try to create a new group with the next PCB (always valid) and recurse
+
+            for combination in search(depth + 1, groups + [[pcb]], masks + [pcb_mask],
+                                      widths + [mask_width(pcb_mask, material_widths)],
+                                      blocked + [incompatible[pcb]], rest):
+
+                if split_depth is None:
+                    min_groups[0] = min(min_groups[0], len(combination))                                        # update the minimum number of groups found
+                yield combination
+
+    current_blocked = []                                                # PCBs incompatible with any member of each current group
+    for i, group in enumerate(current_groups):
+        group_blocked = group_excluded[i] if group_excluded is not None else 0
+        for pcb in group:
+            group_blocked |= incompatible[pcb]
+        current_blocked.append(group_blocked)
+
+    try:
+        yield from search(0, current_groups, group_masks, group_widths, current_blocked, search_bound.mask(pcbs))
+    finally:                                                            # also runs if the caller stops early and closes the generator
+        if progress is not None:
+            progress.add_nodes(visited[0] % CHECK_INTERVAL)
+            if instrumented:
+                depth_seconds[last_visit[1]] += time.perf_counter() - last_visit[0]
+                report_counts()
+
+
+def find_minimum_groups(pcb_list, pcb_masks, material_widths, C_max, search_bound=None, incumbent=None, deadline=None, progress=None, known_lower_bound=0):
+    '''
+    This function searches for a combination with the minimum number of groups. Every combination found tightens the
+    incumbent, and the search stops as soon as the incumbent matches the lower bound of the PCBs.
+
+    :param pcb_list: List of PCB identifiers to be grouped.
+    :param pcb_masks: Dictionary with PCB identifiers as keys and their material bitmasks as values.
+    :param material_widths: List of slot widths indexed by the bit position of the material.
+    :param C_max: Maximum allowed slot width for any group.
+    :param search_bound: SearchBound covering pcb_list. Built from it if not given.
+    :param incumbent: Valid combination to start from, e.g. found by a heuristic. Every PCB on its own if not given.
+    :param deadline: time.monotonic() value after which the search stops. It then raises DeadlineExceeded with the
+                     best combination found so far and the lower bound of the PCBs.
+    :param progress: SearchProgress receiving the explored nodes, the lower bound and every improvement of the incumbent.
+    :param known_lower_bound: Number of groups the caller already proved to be needed, e.g. from the optimum of a
+                              similar set of PCBs.
+    :return: A valid combination with the minimum number of groups.
+    '''
+    if search_bound is None:
+        search_bound = SearchBound(pcb_list, pcb_masks, material_widths, C_max)
+    lower = max(search_bound.lower_bound(pcb_list), known_lower_bound)
+
+    best_combination = incumbent or [[pcb] for pcb in pcb_list]        # every PCB on its own is always a valid combination
+    if progress is not None:
+        progress.report(len(best_combination), lower)
+    if len(best_combination) <= lower:
+        return best_combination
+
+    min_groups = [len(best_combination) - 1]                            # only strictly better combinations are of interest
+    try:
+        for combination in generate_combinations(pcb_list, pcb_masks, material_widths, C_max, [], min_groups, search_bound=search_bound, deadline=deadline, progress=progress):
+            if len(combination) < len(best_combination):
+                best_combination = combination
+                if progress is not None:
+                    progress.report(len(best_combination))
+                if len(best_combination) <= lower:                      # early termination: the incumbent is proven optimal
+                    break
+                min_groups[0] = len(best_combination) - 1
+    except DeadlineExceeded:
+        raise DeadlineExceeded(best_combination, lower)
+
+    if progress is not None:
+        progress.report(lower_bound=len(best_combination))             # the search finished, so the incumbent is optimal
+    return best_combination
@@ -0,0 +1,93 @@
+"""
+This module re-optimizes a grouping after a few PCBs were added to or removed from the list, starting from the previous
+grouping instead of from scratch. Adding a PCB raises the minimum number of groups by at most one and removing a PCB
+lowers it by at most one, so the previous grouping gives both a warm start and a lower bound:
+    - the previous groups without the removed PCBs, with the added PCBs put in by best fit, are a valid combination,
+    - if the previous grouping was optimal, at least its number of groups minus the number of removed PCBs is needed.
+Usually the warm start already matches the bound, or a single feasibility check for one group less decides it.
+"""
+from algorithms.bounds import SearchBound
+from algorithms.bruteforce.common import DeadlineExceeded, deadline_after, find_minimum_groups, load_pcbs
+from algorithms.dataset import DEFAULT_DATASET_PATH, has_pcbs, pcb_name
+from algorithms.heuristics import best_fit
+
+
+def previous_grouping(json_data):
+    '''
+    This function extracts the grouping from the result of an optimizer, in the format of any of the optimizers.
+
+    :param json_data: json dictionary returned by an optimizer.
+    :return: Tuple of the combination as a list of groups of PCB identifiers and whether it has the minimum number of
+             groups. A grouping scheduled for the delivery dates is only optimal under them, so it is never reported so.
+    '''
+    groups = json_data["groups"] if "groups" in json_data else next(iter(json_data["combinations"][0].values()))
+    return [list(group["PCBs"]) for group in groups], json_data.get("optimal", True) and not json_data.get("scheduled", False)
+
+
+def changed_pcbs(json_data, input_pcb_list):
+    '''
+    This function counts the PCBs that were added to or removed from the PCBs of a previous result.
+
+    :param json_data: json dictionary returned by an optimizer.
+    :param input_pcb_list: List of PCB numbers.
+    :return: Number of PCBs in only one of the two lists.
+    '''
+    combination, _ = previous_grouping(json_data)
+    previous = {pcb for group in combination for pcb in group}
+    return len(previous.symmetric_difference(pcb_name(pcb_number) for pcb_number in input_pcb_list))
+
+
+def warm_start(combination, pcb_list, pcb_masks, material_widths, C_max):
+    '''
+    This function adapts a combination of a previous list of PCBs to a new one: removed PCBs are dropped from their
+    groups and added PCBs are put into the group they fit best, or into a new group.
+
+    :param combination: Valid combination of the previous list of PCBs.
+    :param pcb_list: List of PCB identifiers, sorted by their total slot width in descending order.
+    :param pcb_masks: Dictionary with PCB identifiers as keys and their material bitmasks as values.
+    :param material_widths: List of slot widths indexed by the bit position of the material.
+    :param C_max: Maximum allowed slot width for any group.
+    :return: A valid combination of the PCBs in pcb_list.
+    '''
+    kept = set(pcb_list)
+    groups = [[pcb for pcb in group if pcb in kept] for group in combination]
+    groups = [group for group in groups if group]                       # removing PCBs keeps a group valid
+    placed = {pcb for group in groups for pcb in group}
+    return best_fit([pcb for pcb in pcb_list if pcb not in placed], pcb_masks, material_widths, C_max, groups)
+
+
+def call_list_incremental(input_pcb_list, previous, time_limit=None, progress=None, dataset_path=DEFAULT_DATASET_PATH):
+    """
+    This function takes a list of PCB numbers and the result of an earlier optimization of a similar list, and returns
+    the optimal grouping for the list of PCBs in the format of the hybrid optimizer.
+    If a time limit in seconds is given, the best grouping found until then is returned together with the proven
+    lower bound on the number of groups and whether the grouping is proven optimal.
+    The search reports to progress ( a SearchProgress ) if given. The PCBs are read from the dataset directory dataset_path.
+    """
+    assert len(input_pcb_list) > 0, "Error: empty input list."
+    assert has_pcbs(input_pcb_list, dataset_path), "Error: PCB numbers must be PCBs of the dataset."
+
+    C_max = 15  # maximum slot size
+    pcb_list, pcb_data_dict, pcb_masks, material_widths = load_pcbs(input_pcb_list, dataset_path)
+
+    combination, previous_optimal = previous_grouping(previous)
+    removed = {pcb for group in combination for pcb in group}.difference(pcb_list)
+    known_lower = len(combination) - len(removed) if previous_optimal else 0
+    incumbent = warm_start(combination, pcb_list, pcb_masks, material_widths, C_max)
+
+    search_bound = SearchBound(pcb_list, pcb_masks, material_widths, C_max)
+    try:
+        best_combination = find_minimum_groups(pcb_list, pcb_masks, material_widths, C_max, search_bound, incumbent,
+                                               deadline_after(time_limit), progress, known_lower)
+        lower, optimal = len(best_combination), True
+    except DeadlineExceeded as exceeded:                # answer with the best combination found in time
+        best_combination, lower, optimal = exceeded.combination, exceeded.lower_bound, False
+
+    # groups in the order of their first PCB and PCBs in the order of pcb_list, like the combinations of the hybrid optimizer
+    position = {pcb: i for i, pcb in enumerate(pcb_list)}
+    best_combination = sorted((sorted(group, key=position.get) for group in best_combination), key=lambda group: position[group[0]])
+
+    json_data = {"groups": [{"group_id": group_id, "PCBs": group} for group_id, group in enumerate(best_combination, start=1)]}
+    if time_limit is not None:
+        json_data.update({"lower_bound": lower, "optimal": optimal})
+    return json_data
@@ -0,0 +1,130 @@
+"""
+This module searches for the minimum number of groups of a valid combination by testing candidate group counts k
+in separate processes. At most a fixed number of processes runs at once. The candidates are chosen by bisection of the
+range of undecided k, and as soon as a k is decided, every running test that can no longer change the answer is
+terminated: all larger k once a k is feasible, all smaller k once a k is infeasible.
+"""
+import multiprocessing
+import time
+from multiprocessing import freeze_support
+from multiprocessing.connection import wait
+
+from algorithms.bounds import lower_bound
+from algorithms.bruteforce.common import DeadlineExceeded, generate_combinations
+from algorithms.heuristics import greedy_combination
+from algorithms.progress import release_locks_on_terminate
+
+
+def worker(min_group, pcb_list, pcb_masks, material_widths, C_max, connection, progress=None):
+    """
+    Worker function to find the first valid combination of PCBs with a specific minimum number of groups.
+
+    :param min_group: Minimum number of groups to test.
+    :param pcb_list: List of PCBs.
+    :param pcb_masks: Dictionary with PCB identifiers as keys and their material bitmasks as values.
+    :param material_widths: List of slot widths indexed by the bit position of the material.
+    :param C_max: Maximum allowed slot width for any group.
+    :param connection: Connection used to send back a valid combination with at most min_group groups, or None if
+                       there is none.
+    :param progress: SearchProgress the explored nodes are added to.
+    """
+    release_locks_on_terminate()                                                    # the tests that can no longer change the result are terminated
+    combination = next(generate_combinations(pcb_list, pcb_masks, material_widths, C_max, current_groups=[], min_groups=[min_group], progress=progress), None)    # attempt to generate combinations with the given min_group
+    connection.send(combination)
+    connection.close()
+
+
+def _next_candidate(infeasible_below, feasible_from, running):
+    """
+    Chooses the undecided k that lies in the middle of the largest gap between the decided and the running k.
+    """
+    points = [infeasible_below - 1] + sorted(running) + [feasible_from]
+    gap, start = max((points[j + 1] - points[j], points[j]) for j in range(len(points) - 1))
+    if gap <= 1:
+        return None
+    return start + gap // 2
+
+
+def find_best_combination(max_num_group, pcb_list, pcb_masks, material_widths, C_max, processes=None, deadline=None, progress=None):
+    """
+    Finds a valid combination of PCBs with the minimum number of groups, testing several group counts concurrently.
+
+    :param max_num_group: Maximum number of groups to test.
+    :param pcb_list: List of PCBs.
+    :param pcb_masks: Dictionary with PCB identifiers as keys and their material bitmasks as values.
+    :param material_widths: List of slot widths indexed by the bit position of the material.
+    :param C_max: Maximum allowed slot width for any group.
+    :param processes: Maximum number of concurrently running tests. Defaults to the number of CPUs.
+    :param deadline: time.monotonic() value after which the running tests are terminated. DeadlineExceeded is raised
+                     with the best combination found so far and the number of groups proven to be needed.
+    :param progress: SearchProgress receiving the explored nodes and the decided numbers of groups, and the running
+                     tests if it is instrumented.
+    :return: Combination with the minimum number of groups, or every PCB on its own if no number of groups up to
+             max_num_group is feasible.
+    """
+    freeze_support()
+    processes = processes or multiprocessing.cpu_count()
+
+    infeasible_below = lower_bound(pcb_list, pcb_masks, material_widths, C_max)    # every k below is proven infeasible
+    feasible_from = max_num_group + 1                                               # every k from here on is known to be feasible ( or not tested )
+    best_combination = greedy_combination(pcb_list, pcb_masks, material_widths, C_max)
+    if len(best_combination) <= max_num_group:                                      # the heuristic combination proves its k feasible
+        feasible_from = len(best_combination)
+    running = {}                                                                    # k -> (process, connection)
+    if progress is not None:
+        progress.report(len(best_combination), infeasible_below)
+
+    try:
+        while infeasible_below < feasible_from:
+            while len(running) < processes:                                         # fill the free slots with undecided k
+                min_group = _next_candidate(infeasible_below, feasible_from, running)
+                if min_group is None:
+                    break
+                receiver, sender = multiprocessing.Pipe(duplex=False)
+                p = multiprocessing.Process(target=worker, args=(min_group, pcb_list, pcb_masks, material_widths, C_max, sender, progress), daemon=True)
+                p.start()
+                sender.close()                                                      # only the worker writes, so a dead worker shows up as EOF
+                running[min_group] = (p, receiver)
+            if progress is not None and progress.instrumented:
+                progress.set_running(running)
+
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            ready = wait([receiver for _, receiver in running.values()], timeout)
+            if not ready:                                                           # the deadline passed, the running tests are terminated below
+                raise DeadlineExceeded(best_combination, infeasible_below)
+            for min_group, (p, receiver) in list(running.items()):
+                if receiver not in ready:
+                    continue
+                try:
+                    combination = receiver.recv()
+                except EOFError:
+                    raise RuntimeError(f"The test of {min_group} groups terminated without a result.")
+                receiver.close()
+                p.join()
+                del running[min_group]
+
+                if combination is not None:                                         # feasibility is monotone in k: every larger k is feasible as well
+                    if len(combination) < len(best_combination):
+                        best_combination = combination
+                    feasible_from = min(feasible_from, len(combination))
+                else:
+                    infeasible_below = max(infeasible_below, min_group + 1)
+                if progress is not None:
+                    progress.report(len(best_combination), infeasible_below)
+
+            for min_group in [k for k in running if k >= feasible_from or k < infeasible_below]:   # cancel the tests that can no longer change the result
+                p, receiver = running.pop(min_group)
+                p.terminate()
+                p.join()
+                receiver.close()
+    finally:
+        for p, receiver in running.values():
+            p.terminate()
+            p.join()
+            receiver.close()
+        if progress is not None and progress.instrumented:
+            progress.set_running([])
+
+    if feasible_from > max_num_group:
+        return [[pcb] for pcb in pcb_list]
+    return best_combination
@@ -3,257 +3,200 @@ This script is designed to optimize the grouping of Printed Circuit Boards (PCBs
 and slot widths using a parallel brute forcing optimization algorithm. It generates optimal valid combinations
 while adhering to a maximum slot width constraint (C_max).
 """
-
-import copy
-import pandas as pd
-import time
-import psutil
-import os
-import sys
 import multiprocessing
+import queue
+import time
 from multiprocessing import freeze_support
-import copy
-def is_valid_group(group, pcb_data_dict, material_catalogue_dict, C_max):
-    '''
-    This function checks if a group of PCBs is valid based on their total required slot width.
-
-    :param group: List of PCB identifiers forming a group.
-    :param pcb_data_dict: Dictionary with PCB identifiers as keys and lists of required materials as values.
-    :param material_catalogue_dict: Dictionary with material identifiers as keys and their respective slot widths as values.
-    :param C_max: Maximum allowed slot width for any group.
-    :return: True if the group is valid, otherwise False.
-    '''
-
-
-    if len(group) == 1:    # a group consisting of only one PCB is always valid
-        return True
-
-    used_material = set()  # set to keep track of materials already counted
-    total_capacity = 0
-
-    for pcb in group:      # iterating over each PCB in the group
-
-        for material in pcb_data_dict[pcb]:             # iterating over the materials required by the PCB
-
-            if material not in used_material:            # only add new materials that haven't been counted yet
-
-                used_material.add(material)
-                total_capacity += material_catalogue_dict[material]
-                if total_capacity > C_max:                # if total capacity exceeds the allowed maximum, the group is invalid
-
-                    return False
-
-    return True                                            # if the total capacity is within the allowed maximum, the group is valid
 
-def generate_combinations(pcbs, pcb_data_dict, material_catalogue_dict, C_max, current_groups, min_groups):
-    '''
-    This function generates combinations of PCBs based on their total required slot width.
-    It aims to find the minimum number of groups such that the combined slot width of PCBs in each group does not exceed C_max.
-
-    :param pcbs: List of PCB identifiers to be grouped.
-    :param pcb_data_dict: Dictionary with PCB identifiers as keys and their respective materials as values.
-    :param material_catalogue_dict: Dictionary with material identifiers as keys and their respective slot widths as values.
-    :param C_max: Maximum allowed slot width for any group.
-    :param current_groups: List of current groups of PCBs being formed. Defaults to an empty list.
-    :param min_groups: A list containing a single element which is the minimum number of groups found so far. Defaults to infinity.
-    :return: Generator yielding valid combinations of groups.
-    '''
-
-    if not pcbs:                                                        # base case: If there are no PCBs left to group, yield the current grouping and return
-        yield current_groups
-        return
-
-    if len(current_groups) > min_groups[0]:                              # pruning: If the current number of groups exceeds the minimum found so far, stop further exploration
-        return
-
-    for i, group in enumerate(current_groups):                          # try to add the first PCB to each of the existing groups and recurse
-        new_group = group + [pcbs[0]]
-        if is_valid_group(new_group, pcb_data_dict, material_catalogue_dict, C_max):
-            new_groups = current_groups[:i] + [new_group] + current_groups[i + 1:]
-            yield from generate_combinations(pcbs[1:], pcb_data_dict, material_catalogue_dict, C_max, new_groups,
-                                             min_groups)
-
-    if is_valid_group([pcbs[0]], pcb_data_dict, material_catalogue_dict, C_max) and len(current_groups) + 1 <= min_groups[0]:   # try to create a new group with the first PCB and recurse if valid
-
-        for combination in generate_combinations(pcbs[1:], pcb_data_dict, material_catalogue_dict, C_max,
-                                                 current_groups + [[pcbs[0]]], min_groups):
-
-            min_groups[0] = min(min_groups[0], len(combination))                                            # update the minimum number of groups found
-            yield combination
-
-def worker(min_group, pcb_list, pcb_data_dict, material_catalogue_dict, C_max, shared_mingp, lock):
-    """
-    Worker function to find the first valid combination of PCBs with a specific minimum number of groups.
-
-    :param min_group: Minimum number of groups to test.
-    :param pcb_list: List of PCBs.
-    :param pcb_data_dict: Dictionary with PCB identifiers as keys and their respective materials as values.
-    :param material_catalogue_dict: Dictionary with material identifiers as keys and their respective slot widths as values.
-    :param C_max: Maximum allowed slot width for any group.
-    :param shared_mingp: Multiprocessing.Value to store the minimum number of groups found.
-    :param lock: Lock object to ensure thread-safe access to shared_mingp.
-    """
-    try:
-        if next(generate_combinations(pcb_list, pcb_data_dict, material_catalogue_dict, C_max, current_groups=[], min_groups=[min_group])):    # attempt to generate combinations with the given min_group
+from algorithms.bounds import SearchBound
+from algorithms.bruteforce.common import DeadlineExceeded, Subtree, deadline_after, load_pcbs, generate_combinations
+from algorithms.bruteforce.ksearch import find_best_combination
+from algorithms.dataset import DEFAULT_DATASET_PATH, has_pcbs
+from algorithms.heuristics import greedy_combination
+from algorithms.progress import release_locks_on_terminate
 
-            with lock:                                                              # If a valid combination is found, update the shared_mingp if the current min_group is smaller
-                if min_group < shared_mingp.value:
-                    shared_mingp.value = min_group
-    except StopIteration:                                                           # handle the case where no valid combinations are found
+SPLIT_DEPTH = 4             # number of PCBs placed by the parent before the subtrees are handed to the workers
+STEAL_DEPTH = 6             # subtrees with fewer PCBs left are always searched by the worker that took them
+TASKS_PER_PROCESS = 2       # subtrees are split further while fewer tasks than this per worker are outstanding
+RESULT_CHUNK_SIZE = 1000    # combinations sent back to the parent per message
 
-        pass
 
-def find_first_combination(max_num_group, pcb_list, pcb_data_dict, material_catalogue_dict, C_max):
+class SharedMinimum:
     """
-    Finds the only first valid combination of PCBs using multiple processes to test different minimum group sizes concurrently.
-
-    :param max_num_group: Maximum number of groups to test.
-    :param pcb_list: List of PCBs.
-    :param pcb_data_dict: Dictionary with PCB identifiers as keys and their respective materials as values.
-    :param material_catalogue_dict: Dictionary with material identifiers as keys and their respective slot widths as values.
-    :param C_max: Maximum allowed slot width for any group.
-    :return: Minimum number of groups needed to create a valid combination of PCBs.
+    Minimum number of groups found so far, shared by all workers. It is used in place of the min_groups list of
+    generate_combinations, so every worker prunes with the best count found by any of them. Assignments only ever
+    lower the value.
     """
-    freeze_support()
-    manager = multiprocessing.Manager()
-    shared_mingp = multiprocessing.Value('i', len(pcb_list))    # shared integer value to store the minimum number of groups found, initialized to number_of_data - 1
-
-    lock = manager.Lock()                                        # lock object to ensure thread-safe access to shared_mingp
-    processes = []                                               # list to store the process objects
-
-    for min_group in range(1, max_num_group + 1):                     # create and start processes for each min_group value from 1 to k
 
-        p = multiprocessing.Process(target=worker, args=(min_group, pcb_list, pcb_data_dict, material_catalogue_dict, C_max, shared_mingp, lock))
-        processes.append(p)
-        p.start()
+    def __init__(self, value):
+        self.value = multiprocessing.RawValue("i", value)     # read without locking on every node of the search
+        self.lock = multiprocessing.Lock()
 
-    for p in processes:
-        p.join()
+    def __getitem__(self, index):
+        return self.value.value
 
-    return shared_mingp.value
+    def __setitem__(self, index, value):
+        with self.lock:
+            if value < self.value.value:
+                self.value.value = value
 
-def find_permute(pcb_list, pcb_data_dict, material_catalogue_dict, C_max):
-    """
-    This function calculates permutations of the first PCB with other PCBs in the list and returns possible valid groups of size 2.
 
-    :param pcb_list: List of PCBs.
-    :param pcb_data_dict: Dictionary with PCB identifiers as keys and their respective materials as values.
-    :param material_catalogue_dict: Dictionary with material identifiers as keys and their respective slot widths as values.
-    :param C_max: Maximum allowed slot width for any group.
-    :return: List of valid groups, each containing 2 PCBs.
+def subtree_worker(tasks, results, pcb_list, pcb_masks, material_widths, C_max, incumbent, outstanding, processes, progress=None):
     """
-    pair_list = []
-    for i in range(len(pcb_list) - 1):
-        possible_group = []
-        possible_group.append(pcb_list[0])
-        possible_group.append(pcb_list[i + 1])
-        if is_valid_group(possible_group, pcb_data_dict, material_catalogue_dict, C_max):
-            pair_list.append(possible_group)
-    return pair_list
+    Worker function searching the subtrees taken from the task queue until it receives None.
+    A subtree with many PCBs left is split one level further and put back on the queue while the queue runs low,
+    so idle workers can take over parts of it. Otherwise it is searched and its combinations with no more groups than
+    the incumbent are sent back in chunks.
 
-def process_pair(pair, pcb_list, pcb_data_dict, material_catalogue_dict, C_max, min_gp, output_list, i):
-    """
-    This function processes pairs generated by the find_permute function.
-    It starts to find possible combinations starting with a given pair, checks if it is already generated,
-    and if not, appends the valid combination into the output_list.
-
-    :param pair: Pair of PCBs to start the combination.
+    :param tasks: Queue of Subtree tasks.
+    :param results: Queue receiving lists of combinations, and None once the worker stops.
     :param pcb_list: List of PCBs.
-    :param pcb_data_dict: Dictionary with PCB identifiers as keys and their respective data (e.g., materials) as values.
-    :param material_catalogue_dict: Dictionary containing material data.
+    :param pcb_masks: Dictionary with PCB identifiers as keys and their material bitmasks as values.
+    :param material_widths: List of slot widths indexed by the bit position of the material.
     :param C_max: Maximum allowed slot width for any group.
-    :param min_gp: Minimum number of groups for a valid combination.
-    :param output_list: List to store the valid combinations.
-    :param i: Index used to filter the PCB list.
+    :param incumbent: SharedMinimum with the minimum number of groups found so far.
+    :param outstanding: Shared counter of the tasks put on the queue and not finished yet.
+    :param processes: Number of workers.
+    :param progress: SearchProgress the explored nodes are added to.
     """
-    filtered_list = copy.copy(pcb_list)                   # create a copy of the PCB list and remove the elements in the pair
-    for sub_element in pair:
-        filtered_list.remove(sub_element)
-
-    for j in range(i):                                     # remove the first i elements from the filtered_list to avoid duplicates
-        filtered_list.remove(pcb_list[j])
-
-    current_groups = [pair]                                # initialize current groups with the pair
-    for combination in generate_combinations(filtered_list, pcb_data_dict, material_catalogue_dict, C_max,current_groups=current_groups, min_groups=[min_gp]):     # generate combinations starting with the current_groups
-
-        for j in range(i):                                  # append the first i elements as separate groups (already counted in previous iteraion)
-            combination.append([pcb_list[j]])
-
-        if len(combination) == min_gp:                      # if the combination has the desired number of groups, add it to the output list (checks for duplications)
-            combination_frozenset = frozenset(frozenset(group) for group in combination)
-            output_list.append(combination_frozenset)
-
-
-def main(pcb_list, pcb_data_dict, material_catalogue_dict, C_max, min_gp):
+    release_locks_on_terminate()                        # the workers are terminated at the deadline
+    search_bound = SearchBound(pcb_list, pcb_masks, material_widths, C_max)
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            results.put(None)
+            return
+
+        pcbs = pcb_list[task.depth:]
+        if len(pcbs) > STEAL_DEPTH and outstanding.value < TASKS_PER_PROCESS * processes:
+            for child in generate_combinations(pcbs, pcb_masks, material_widths, C_max, task.groups, incumbent,
+                                               search_bound=search_bound, group_excluded=task.blocked, split_depth=1):
+                with outstanding.get_lock():
+                    outstanding.value += 1
+                tasks.put(Subtree(task.depth + child.depth, child.groups, child.blocked))
+        else:
+            chunk = []
+            for combination in generate_combinations(pcbs, pcb_masks, material_widths, C_max, task.groups, incumbent,
+                                                     search_bound=search_bound, group_excluded=task.blocked, progress=progress):
+                if len(combination) <= incumbent[0]:
+                    incumbent[0] = len(combination)
+                    chunk.append(combination)
+                    if len(chunk) == RESULT_CHUNK_SIZE:
+                        results.put(chunk)
+                        chunk = []
+            if chunk:
+                results.put(chunk)
+
+        with outstanding.get_lock():
+            outstanding.value -= 1
+
+
+def main(pcb_list, pcb_masks, material_widths, C_max, min_gp=None, processes=None, split_depth=SPLIT_DEPTH, deadline=None, progress=None):
     """
     Finds the best combinations of PCBs (Printed Circuit Boards) based on given constraints.
+    The search tree of generate_combinations is split after split_depth PCBs and the subtrees are searched by a set of
+    worker processes taking them from a shared queue. The number of groups of the best combination found so far is
+    kept in shared memory, so every worker prunes with it immediately.
     Parameters:
     :param pcb_list: List of PCBs.
-    :param pcb_data_dict: Dictionary with PCB identifiers as keys and their respective data (e.g., materials) as values.
-    :param material_catalogue_dict: Dictionary containing material data.
+    :param pcb_masks: Dictionary with PCB identifiers as keys and their material bitmasks as values.
+    :param material_widths: List of slot widths indexed by the bit position of the material.
     :param C_max: Maximum allowed slot width for any group.
-    :param min_gp: Minimum number of groups for a valid combination.
+    :param min_gp: Minimum number of groups for a valid combination, if already known. Otherwise it is found by the
+                   search, starting from the number of groups of the greedy heuristic.
+    :param processes: Number of worker processes. Defaults to the number of CPUs.
+    :param split_depth: Number of PCBs placed before the search tree is split into subtrees.
+    :param deadline: time.monotonic() value after which the workers are terminated and DeadlineExceeded is raised with
+                     the best combination received so far.
+    :param progress: SearchProgress the workers add their explored nodes to.
     :return List of best combinations of PCBs with minimum number of groups needed to create a valid combination of PCBs.
     """
-    freeze_support()
-    manager = multiprocessing.Manager()             # set up multiprocessing manager and shared list for output
-    output_list = manager.list()
-    best_combinations_set = set()
-
-    cpu_count = multiprocessing.cpu_count()
-    pool = multiprocessing.Pool(processes=cpu_count)
+    if min_gp is None:
+        min_gp = len(greedy_combination(pcb_list, pcb_masks, material_widths, C_max))   # no optimal combination has more groups than the heuristic one
+    elif min_gp >= len(pcb_list):                                                       # only every PCB on its own is left
+        return [[[pcb] for pcb in pcb_list]]
 
-    for i in range(len(pcb_list)):
-        pairs = find_permute(pcb_list[i:], pcb_data_dict, material_catalogue_dict, C_max)                   # find all permissible pairs of PCBs starting from the current index
-        all_pairs = [(pair, pcb_list, pcb_data_dict, material_catalogue_dict, C_max, min_gp, output_list, i) for pair in
-                     pairs]                                                             # create a list of arguments for each pair to be processed in parallel
+    freeze_support()
+    processes = processes or multiprocessing.cpu_count()
 
-        pool.starmap_async(process_pair, all_pairs).get()
+    incumbent = SharedMinimum(min_gp)
+    outstanding = multiprocessing.Value("i", 0)
+    tasks = multiprocessing.Queue()
+    results = multiprocessing.Queue()
 
-    pool.close()
-    pool.join()
+    workers = [multiprocessing.Process(target=subtree_worker, daemon=True,
+                                       args=(tasks, results, pcb_list, pcb_masks, material_widths, C_max, incumbent, outstanding, processes, progress))
+               for _ in range(processes)]
+    for p in workers:
+        p.start()
 
-    for combination in output_list:                                                     # collect results from the output list and add to the set to ensure uniqueness
-        best_combinations_set.add(combination)
+    try:
+        search_bound = SearchBound(pcb_list, pcb_masks, material_widths, C_max)
+        for subtree in generate_combinations(pcb_list, pcb_masks, material_widths, C_max, [], incumbent,
+                                             search_bound=search_bound, split_depth=split_depth, deadline=deadline):
+            with outstanding.get_lock():
+                outstanding.value += 1
+            tasks.put(subtree)
+
+        best_combinations_total = []
+        stopped = 0
+        sentinels_sent = False
+        while stopped < processes:
+            if deadline is not None and time.monotonic() > deadline:
+                raise DeadlineExceeded(best_combinations_total[0] if best_combinations_total else None)
+            try:
+                combinations = results.get(timeout=0.1)
+            except queue.Empty:
+                if not sentinels_sent and outstanding.value == 0:                       # every subtree is searched, let the workers stop
+                    for _ in workers:
+                        tasks.put(None)
+                    sentinels_sent = True
+                elif not all(p.is_alive() for p in workers):
+                    raise RuntimeError("A worker of the parallel search terminated unexpectedly.")
+                continue
+
+            if combinations is None:
+                stopped += 1
+                continue
+            for combination in combinations:                                            # keep only the combinations with the fewest groups
+                if best_combinations_total and len(combination) > len(best_combinations_total[0]):
+                    continue
+                if best_combinations_total and len(combination) < len(best_combinations_total[0]):
+                    best_combinations_total = []
+                best_combinations_total.append(combination)
+    finally:
+        for p in workers:
+            p.terminate()
+            p.join()
 
-    best_combinations_total = list(best_combinations_set)                                   # convert the set to a list to return the unique best combinations
     return best_combinations_total
 
 
-def call_list_parallel(input_pcb_list):
+def call_list_parallel(input_pcb_list, time_limit=None, progress=None, dataset_path=DEFAULT_DATASET_PATH):
     """
     This function takes a list of PCB numbers and returns the optimal grouping for the list of PCBs.
     It uses the parallel brute force approach to find the minimal groupings.
+    If a time limit in seconds is given, the best grouping found until then is returned together with the proven
+    lower bound on the number of groups and whether the grouping is proven optimal.
+    The search reports to progress ( a SearchProgress ) if given. The PCBs are read from the dataset directory dataset_path.
     """
     assert len(input_pcb_list) > 0, "Error: empty input list."
-    assert min(input_pcb_list) >= 1 and max(input_pcb_list) <= 50, "Error: PCB numbers must be between 1 and 50."
+    assert has_pcbs(input_pcb_list, dataset_path), "Error: PCB numbers must be PCBs of the dataset."
     
     C_max = 15  # maximum slot size
-    dataset_path = "./50_entry_dataset/"  # path to dataset
-    material_catalogue_path = f"{dataset_path}Material_catalogue.csv"  # path to csv file of Material_catalogue
-    material_catalogue = pd.read_csv(material_catalogue_path)  # read csv file of Material_catalogue
-    material_catalogue = material_catalogue.to_numpy()
-    material_catalogue = material_catalogue[:, :2]
-    material_catalogue_dict = {key: value for key, value in material_catalogue}  # setup dictionary of materials
-    
-    pcb_data_dict = {}
-    for pcb_number in input_pcb_list:
-        each_file = f"{dataset_path}PCB{pcb_number:03d}.csv"
-        pcb = pd.read_csv(each_file)
-        pcb_data_dict[f'PCB{pcb_number:03d}'] = pcb["Material Index"].values  # preparing dictionary of PCBs
-    
-    pcb_list = list(pcb_data_dict.keys())  # list of all PCBs
-    pcb_list = sorted(pcb_list, key=lambda x: sum(material_catalogue_dict[key] for key in pcb_data_dict[x]), reverse=True)  # sorting PCBs by total slot width
-    
-    min_group = find_first_combination(len(pcb_list) - 1, pcb_list, pcb_data_dict, material_catalogue_dict, C_max)
-
+    pcb_list, pcb_data_dict, pcb_masks, material_widths = load_pcbs(input_pcb_list, dataset_path)   # PCBs sorted by their total slot width and their materials as bitmasks over the Material_catalogue index
     
-    best_combinations = main(pcb_list, pcb_data_dict, material_catalogue_dict, C_max, min_group)
-    #print(f'best combinations: {best_combinations}')
+    deadline = deadline_after(time_limit)
+    try:                                                # only one combination with the minimum number of groups is returned
+        best_combination = find_best_combination(len(pcb_list) - 1, pcb_list, pcb_masks, material_widths, C_max, deadline=deadline, progress=progress)
+        lower, optimal = len(best_combination), True
+    except DeadlineExceeded as exceeded:                # answer with the best combination found in time
+        best_combination, lower, optimal = exceeded.combination, exceeded.lower_bound, False
     
     
     json_data = {"groups": []}
-    for group_id, group in enumerate(best_combinations[0], start=1): # just taking the first combination
+    for group_id, group in enumerate(best_combination, start=1):
         group_pcbs = []
         group_materials = set()  #
         for pcb_group in group:
@@ -268,4 +211,6 @@ def call_list_parallel(input_pcb_list):
             # "materials": list(group_materials)  
         })
     
+    if time_limit is not None:
+        json_data.update({"lower_bound": lower, "optimal": optimal})
     return json_data
\ No newline at end of file
@@ -10,126 +10,94 @@ import os
 import sys
 import json
 
-    
-def is_valid_group(group, pcb_data_dict, material_catalogue_dict, C_max):
-    '''
-    This function checks if a group of PCBs is valid based on their total required slot width.
 
-    :param group: List of PCB identifiers forming a group.
-    :param pcb_data_dict: Dictionary with PCB identifiers as keys and lists of required materials as values.
-    :param material_catalogue_dict: Dictionary with material identifiers as keys and their respective slot widths as values.
-    :param C_max: Maximum allowed slot width for any group.
-    :return: True if the group is valid, otherwise False.
-    '''
+from algorithms.bounds import SearchBound
+from algorithms.bruteforce.common import DeadlineExceeded, deadline_after, load_pcbs, is_valid_group, generate_combinations, find_minimum_groups
+from algorithms.dataset import DEFAULT_DATASET_PATH, has_pcbs
+from algorithms.heuristics import greedy_combination
 
 
-    if len(group) == 1:    # a group consisting of only one PCB is always valid
-        return True
+STREAM_CHUNK_SIZE = 1000    # combinations collected before they are written to the output file
+MAX_COMBINATIONS_IN_MEMORY = 10000      # combinations returned without an output file, the rest only fits into a file
 
-    used_material = set()  # set to keep track of materials already counted
-    total_capacity = 0
 
-    for pcb in group:      # iterating over each PCB in the group
+def create_grouping(combi, pcb_data_dict):
+    grouping = []
+    # Loop through each group of the combination
+    for group_id, group in enumerate(combi, start=1):
+        group_pcbs = []
+        group_materials = set()  # Use a set to avoid duplicate materials
+        # Collect PCBs and their materials from the current group
+        for pcb_group in group:
+            if pcb_group in pcb_data_dict:
+                group_pcbs.append(pcb_group)
+                group_materials.update(pcb_data_dict[pcb_group])
 
-        for material in pcb_data_dict[pcb]:             # iterating over the materials required by the PCB
-
-            if material not in used_material:            # only add new materials that haven't been counted yet
-
-                used_material.add(material)
-                total_capacity += material_catalogue_dict[material]
-                if total_capacity > C_max:                # if total capacity exceeds the allowed maximum, the group is invalid
-
-                    return False
-
-    return True                                            # if the total capacity is within the allowed maximum, the group is valid
-
-
-
-def generate_combinations(pcbs, pcb_data_dict, material_catalogue_dict, C_max, current_groups, min_groups):
-    '''
-    This function generates combinations of PCBs based on their total required slot width.
-    It aims to find the minimum number of groups such that the combined slot width of PCBs in each group does not exceed C_max.
-
-    :param pcbs: List of PCB identifiers to be grouped.
-    :param pcb_data_dict: Dictionary with PCB identifiers as keys and their respective materials as values.
-    :param material_catalogue_dict: Dictionary with material identifiers as keys and their respective slot widths as values.
-    :param C_max: Maximum allowed slot width for any group.
-    :param current_groups: List of current groups of PCBs being formed. Defaults to an empty list.
-    :param min_groups: A list containing a single element which is the minimum number of groups found so far. Defaults to infinity.
-    :return: Generator yielding valid combinations of groups.
-    '''
-
-    if not pcbs:                                                        # base case: If there are no PCBs left to group, yield the current grouping and return
-        yield current_groups
-        return
-
-    if len(current_groups) > min_groups[0]:                              # pruning: If the current number of groups exceeds the minimum found so far, stop further exploration
-        return
-
-    for i, group in enumerate(current_groups):                          # try to add the first PCB to each of the existing groups and recurse
-        new_group = group + [pcbs[0]]
-        if is_valid_group(new_group, pcb_data_dict, material_catalogue_dict, C_max):
-            new_groups = current_groups[:i] + [new_group] + current_groups[i + 1:]
-            yield from generate_combinations(pcbs[1:], pcb_data_dict, material_catalogue_dict, C_max, new_groups,
-                                             min_groups)
-
-    if is_valid_group([pcbs[0]], pcb_data_dict, material_catalogue_dict, C_max) and len(current_groups) + 1 <= min_groups[0]:   # try to create a new group with the first PCB and recurse if valid
-
-        for combination in generate_combinations(pcbs[1:], pcb_data_dict, material_catalogue_dict, C_max,
-                                                 current_groups + [[pcbs[0]]], min_groups):
-
-            min_groups[0] = min(min_groups[0], len(combination))                                            # update the minimum number of groups found
-            yield combination
+        # Add the group information to the JSON structure
+        grouping.append({
+            "group_id": group_id,
+            "PCBs": group_pcbs#,
+            #"materials": list(group_materials)  # Convert set to list
+        })
+    return grouping
 
 
 def create_json_data(best_combinations, pcb_data_dict):
     json_data = {"combinations": []}
     for combination_id, combi in enumerate(best_combinations, start=1):
-        grouping = []
-        # Loop through each group in best_combinations
-        for group_id, group in enumerate(combi, start=1):
-            group_pcbs = []
-            group_materials = set()  # Use a set to avoid duplicate materials
-            # Collect PCBs and their materials from the current group
-            for pcb_group in group:
-                if pcb_group in pcb_data_dict:
-                    group_pcbs.append(pcb_group)
-                    group_materials.update(pcb_data_dict[pcb_group])
-
-            # Add the group information to the JSON structure
-            grouping.append({
-                "group_id": group_id,
-                "PCBs": group_pcbs#,
-                #"materials": list(group_materials)  # Convert set to list
-            })
-        json_data["combinations"].append({f"combination{combination_id}": grouping})
+        json_data["combinations"].append({f"combination{combination_id}": create_grouping(combi, pcb_data_dict)})
 
     # Return the JSON data as a Python dictionary
     return json_data
 
 
+class CombinationWriter():
+    """
+    Writes the combinations with the fewest groups to a file while they are generated, one JSON object per line
+    ( NDJSON ) in the format of the entries of create_json_data. Only one chunk of combinations is held in memory at
+    a time. If a combination with fewer groups comes up, everything written so far is truncated.
+
+    :param file: Text file opened for writing, positioned at its start.
+    :param pcb_data_dict: Dictionary with PCB identifiers as keys and their materials as values.
+    """
+
+    def __init__(self, file, pcb_data_dict):
+        self.file = file
+        self.pcb_data_dict = pcb_data_dict
+        self.chunk = []
+        self.n_combinations = 0
+        self.min_comb_len = float('inf')
+        self.first_combination = None
+
+    def write(self, combination):
+        if len(combination) < self.min_comb_len:    # a better group count makes everything written so far obsolete
+            self.min_comb_len = len(combination)
+            self.chunk.clear()
+            self.file.seek(0)
+            self.file.truncate()
+            self.n_combinations = 0
+            self.first_combination = combination
+        if len(combination) == self.min_comb_len:
+            self.n_combinations += 1
+            self.chunk.append(json.dumps({f"combination{self.n_combinations}": create_grouping(combination, self.pcb_data_dict)}))
+            if len(self.chunk) == STREAM_CHUNK_SIZE:
+                self.flush()
+
+    def flush(self):
+        if self.chunk:
+            self.file.write("\n".join(self.chunk) + "\n")
+            self.chunk.clear()
+
+
 def call(number_of_data):
     C_max = 15  # maximum slot size
-    dataset_path = "./50_entry_dataset/"  # path to dataset
-    material_catalogue_path = f"{dataset_path}Material_catalogue.csv"  # path to csv file of Material_catelogue
-    material_catalogue = pd.read_csv(material_catalogue_path)  # read csv file of Material_catelogue
-    material_catalogue = material_catalogue.to_numpy()
-    material_catalogue = material_catalogue[:, :2]
-    material_catalogue_dict = {key: value for key, value in
-                               material_catalogue}  # setup dictonary of materials ( key: Material Index , value: Slot Width ) using Material_catelogue
-    pcb_data_dict = {}
-    pcb_files = [f"{dataset_path}PCB{i:03d}.csv" for i in range(1, number_of_data + 1)]
-    for pcb_number, each_file in enumerate(pcb_files):  # read every PCBs in pcb_files
-        pcb = pd.read_csv(each_file)
-        pcb_data_dict[f'PCB{pcb_number + 1:03d}'] = pcb[
-            "Material Index"].values  # preparing dictionary of PCBs (key: Name of PCB, value: Material Index)
-    pcb_list = list(pcb_data_dict.keys())  # list of all PCBs
-    pcb_list = sorted(pcb_list, key=lambda x: sum(material_catalogue_dict[key] for key in pcb_data_dict[x]),reverse=True)  # sorting PCBS basing on their total slot width in descending order
+    pcb_list, pcb_data_dict, pcb_masks, material_widths = load_pcbs(range(1, number_of_data + 1))   # PCBs sorted by their total slot width and their materials as bitmasks over the Material_catelogue index
 # -----------------------------------------------------
 # Generating Combinations
     best_combinations = []        # initialize a list to store the best combinations
     min_comb_len = float('inf')   # initialize a variable to store the length of the smallest combination found
-    for combination in generate_combinations(pcb_list, pcb_data_dict, material_catalogue_dict, C_max, [], [float('inf')]):            # iterate over each valid combination generated by the generate_combinations function
+    max_groups = len(greedy_combination(pcb_list, pcb_masks, material_widths, C_max))     # no optimal combination has more groups than the heuristic one
+    for combination in generate_combinations(pcb_list, pcb_masks, material_widths, C_max, [], [max_groups]):            # iterate over each valid combination generated by the generate_combinations function
         if len(combination) < min_comb_len:    # if the current combination has fewer groups than the previously found minimum, update the minimum and clear the best_combinations list
             min_comb_len = len(combination)
             best_combinations.clear()          # less efficient combinations ( combinations with larger number of groups are deleted )
@@ -139,46 +107,83 @@ def call(number_of_data):
     return create_json_data(best_combinations, pcb_data_dict)
 
 
-def call_list(input_pcb_list):
+def call_list(input_pcb_list, output_path=None, time_limit=None, progress=None, dataset_path=DEFAULT_DATASET_PATH):
     """
     This function takes a list of PCBs and returns the optimal grouping for the list of PCBs.
 
     :param list or number of PCBs
-    :return json dictionary containing the groups and materials required for the production process
+    :param output_path: If given, the optimal combinations are streamed to this NDJSON file instead of being kept in
+                        memory, so the memory use does not grow with the number of optimal combinations.
+    :param time_limit: If given, the search stops after this many seconds and returns what it found so far.
+    :param progress: SearchProgress the search reports to while it runs.
+    :param dataset_path: Directory containing Material_catalogue.csv and the PCB###.csv files.
+    :return json dictionary containing the groups and materials required for the production process. When streaming,
+            it only contains the first combination, the number of combinations and the path of the file. Otherwise it
+            contains at most MAX_COMBINATIONS_IN_MEMORY combinations.
+            With a time limit it also contains the proven lower bound on the number of groups and whether the
+            combinations are proven optimal. "complete" tells whether all of them were returned, it is contained with a
+            time limit and whenever some are missing.
     """
     print(input_pcb_list)
     if type(input_pcb_list)==type(1):
         input_pcb_list = [input_pcb_list]
     if len(input_pcb_list) <= 0: 
         return {"Error": "empty input list"}
-    if min(input_pcb_list) < 1 or max(input_pcb_list) > 50: 
-        return {"Error": "the input PCBs must be between 1 and 50"}
+    if not has_pcbs(input_pcb_list, dataset_path):
+        return {"Error": "the input PCBs must be PCBs of the dataset"}
     C_max = 15  # maximum slot size
-    dataset_path = "./50_entry_dataset/"  # path to dataset
-    material_catalogue_path = f"{dataset_path}Material_catalogue.csv"  # path to csv file of Material_catelogue
-    material_catalogue = pd.read_csv(material_catalogue_path)  # read csv file of Material_catelogue
-    material_catalogue = material_catalogue.to_numpy()
-    material_catalogue = material_catalogue[:, :2]
-    material_catalogue_dict = {key: value for key, value in
-                               material_catalogue}  # setup dictonary of materials ( key: Material Index , value: Slot Width ) using Material_catelogue
-    pcb_data_dict = {}
-    for pcb_number in input_pcb_list:
-        each_file = f"{dataset_path}PCB{pcb_number:03d}.csv"
-        pcb = pd.read_csv(each_file)
-        pcb_data_dict[f'PCB{pcb_number:03d}'] = pcb[
-            "Material Index"].values  # preparing dictionary of PCBs (key: Name of PCB, value: Material Index)
-    
-    pcb_list = list(pcb_data_dict.keys())  # list of all PCBs
-    pcb_list = sorted(pcb_list, key=lambda x: sum(material_catalogue_dict[key] for key in pcb_data_dict[x]),reverse=True)  # sorting PCBS basing on their total slot width in descending order
+    deadline = deadline_after(time_limit)
+    pcb_list, pcb_data_dict, pcb_masks, material_widths = load_pcbs(input_pcb_list, dataset_path)   # PCBs sorted by their total slot width and their materials as bitmasks over the Material_catelogue index
+    search_bound = SearchBound(pcb_list, pcb_masks, material_widths, C_max)                # pairwise incompatibilities used for the lower bounds of the search
+    incumbent = greedy_combination(pcb_list, pcb_masks, material_widths, C_max)                # warm start, often already optimal
+    try:
+        best_combination = find_minimum_groups(pcb_list, pcb_masks, material_widths, C_max, search_bound, incumbent, deadline, progress)   # stops as soon as a combination matches the lower bound
+    except DeadlineExceeded as exceeded:                                                     # answer with the best combination found in time
+        json_data = create_json_data([exceeded.combination], pcb_data_dict)
+        json_data.update({"lower_bound": exceeded.lower_bound, "optimal": False, "complete": False})
+        return json_data
+    min_group = len(best_combination)
 # -----------------------------------------------------
 # Generating Combinations
-    best_combinations = []
-    min_comb_len = float('inf')   # initialize a variable to store the length of the smallest combination found
-    for combination in generate_combinations(pcb_list, pcb_data_dict, material_catalogue_dict, C_max, [], [float('inf')]):            # iterate over each valid combination generated by the generate_combinations function
-        if len(combination) < min_comb_len:    # if the current combination has fewer groups than the previously found minimum, update the minimum and clear the best_combinations list
-            min_comb_len = len(combination)
-            best_combinations.clear()          # less efficient combinations ( combinations with larger number of groups are deleted )
-        if len(combination) == min_comb_len:    # if the current combination has the same number of groups as the minimum, add it to the best_combinations list
-            best_combinations.append(combination)
-
-    return create_json_data(best_combinations, pcb_data_dict)
\ No newline at end of file
+    combinations = generate_combinations(pcb_list, pcb_masks, material_widths, C_max, [], [min_group], search_bound=search_bound, deadline=deadline, progress=progress)
+    complete = True
+    if output_path is not None:
+        with open(output_path, "w") as file:
+            writer = CombinationWriter(file, pcb_data_dict)
+            try:
+                for combination in combinations:
+                    writer.write(combination)
+            except DeadlineExceeded:
+                complete = False
+                if writer.first_combination is None:
+                    writer.write(best_combination)
+            writer.flush()
+        json_data = create_json_data([writer.first_combination], pcb_data_dict)
+        json_data["n_combinations"] = writer.n_combinations
+        json_data["combinations_file"] = output_path
+    else:
+        json_data = {"combinations": []}    # built while the combinations are generated, so the deadline covers the conversion
+        best_combinations = json_data["combinations"]
+        min_comb_len = float('inf')   # initialize a variable to store the length of the smallest combination found
+        try:
+            for combination in combinations:            # iterate over each valid combination generated by the generate_combinations function
+                if len(combination) < min_comb_len:    # if the current combination has fewer groups than the previously found minimum, update the minimum and clear the best_combinations list
+                    min_comb_len = len(combination)
+                    best_combinations.clear()          # less efficient combinations ( combinations with larger number of groups are deleted )
+                if len(combination) == min_comb_len:    # if the current combination has the same number of groups as the minimum, add it to the best_combinations list
+                    if len(best_combinations) == MAX_COMBINATIONS_IN_MEMORY:
+                        complete = False
+                        break
+                    best_combinations.append({f"combination{len(best_combinations) + 1}": create_grouping(combination, pcb_data_dict)})
+                    if deadline is not None and time.monotonic() > deadline:
+                        raise DeadlineExceeded()
+        except DeadlineExceeded:                       # the minimum is proven, but not every optimal combination was found
+            complete = False
+            if not best_combinations:
+                best_combinations.append({"combination1": create_grouping(best_combination, pcb_data_dict)})
+
+    if time_limit is not None:
+        json_data.update({"lower_bound": min_group, "optimal": True})
+    if time_limit is not None or not complete:
+        json_data["complete"] = complete
+    return json_data
@@ -0,0 +1,128 @@
+"""
+This module provides a NumPy-backed compatibility index of the PCBs of a dataset. It holds the material incidence
+matrix, the merged slot width of every pair of PCBs and a batch API which validates many candidate groups of PCBs
+in one vectorized call. The index is built once per dataset and slot width limit and rebuilt when the dataset changes.
+"""
+import threading
+
+import numpy as np
+
+from algorithms.dataset import DEFAULT_DATASET_PATH, get_dataset
+
+BATCH_CHUNK_SIZE = 8192     # candidate groups evaluated per vectorized step, bounds the size of the temporaries
+
+
+class CompatibilityIndex:
+    """
+    Pairwise and k-wise compatibility of a set of PCBs.
+
+    :param pcbs: PCB identifiers covered by the index.
+    :param incidence: Boolean matrix (PCBs x materials), True if the PCB requires the material.
+    :param material_widths: Slot width of every material column.
+    :param C_max: Maximum allowed slot width for any group.
+    """
+
+    def __init__(self, pcbs: list[str], incidence: np.ndarray, material_widths: np.ndarray, C_max: int):
+        self.pcbs = list(pcbs)
+        self.position = {pcb: i for i, pcb in enumerate(self.pcbs)}
+        self.C_max = C_max
+
+        # an additional all-false row, so groups of different sizes can be padded with -1
+        self.incidence = np.vstack([incidence.astype(bool), np.zeros((1, incidence.shape[1]), dtype=bool)])
+        self.material_widths = np.asarray(material_widths, dtype=np.int32)
+
+        weighted = self.incidence[:-1].astype(np.int32) * self.material_widths
+        self.widths = weighted.sum(axis=1)                                              # slot width of every single PCB
+        shared = weighted @ self.incidence[:-1].T.astype(np.int32)                      # slot width of the materials both PCBs require
+        self.pair_widths = self.widths[:, None] + self.widths[None, :] - shared          # merged slot width of every pair
+
+        # an additional row and column compatible with everything, so padding (-1) never rejects a group
+        self._compatible = np.ones((len(self.pcbs) + 1, len(self.pcbs) + 1), dtype=bool)
+        self._compatible[:-1, :-1] = self.pair_widths <= C_max
+        np.fill_diagonal(self._compatible, True)                                        # a group consisting of only one PCB is always valid
+        self.compatible = self._compatible[:-1, :-1]
+
+    def positions(self, groups) -> np.ndarray:
+        """
+        Converts candidate groups to a padded 2-D array of PCB positions.
+
+        :param groups: 2-D integer array of positions (padded with -1) or a list of groups of PCB identifiers.
+        """
+        if isinstance(groups, np.ndarray):
+            return groups.astype(np.intp, copy=False)
+
+        size = max((len(group) for group in groups), default=0)
+        positions = np.full((len(groups), size), -1, dtype=np.intp)
+        for row, group in enumerate(groups):
+            positions[row, :len(group)] = [self.position[pcb] for pcb in group]
+        return positions
+
+    def group_widths(self, groups) -> np.ndarray:
+        """
+        Computes the slot width of many candidate groups, counting shared materials once.
+        """
+        positions = self.positions(groups)
+        widths = np.empty(len(positions), dtype=np.int64)
+        for start in range(0, len(positions), BATCH_CHUNK_SIZE):
+            chunk = positions[start:start + BATCH_CHUNK_SIZE]
+            union = self.incidence[chunk].any(axis=1)                                   # -1 selects the all-false row
+            widths[start:start + len(chunk)] = union @ self.material_widths
+        return widths
+
+    def valid_groups(self, groups) -> np.ndarray:
+        """
+        Checks many candidate groups at once.
+
+        :param groups: 2-D integer array of positions (padded with -1) or a list of groups of PCB identifiers.
+        :return: Boolean array, True for every group whose slot width does not exceed C_max.
+        """
+        positions = self.positions(groups)
+        if positions.shape[1] == 0:
+            return np.ones(len(positions), dtype=bool)
+
+        # every pair of a valid group has to be compatible, which rejects most candidates without building the union
+        valid = np.ones(len(positions), dtype=bool)
+        for i in range(positions.shape[1]):
+            for j in range(i + 1, positions.shape[1]):
+                valid &= self._compatible[positions[:, i], positions[:, j]]
+        if positions.shape[1] <= 2:
+            return valid
+
+        candidates = np.flatnonzero(valid & ((positions >= 0).sum(axis=1) > 2))
+        if len(candidates) > 0:
+            valid[candidates] = self.group_widths(positions[candidates]) <= self.C_max
+        return valid
+
+    def compatible_with(self, pcb: str, others) -> list[str]:
+        """
+        Returns the PCBs of others that can share a group with pcb.
+        """
+        others = list(others)
+        if not others:
+            return []
+        row = self.compatible[self.position[pcb], [self.position[other] for other in others]]
+        return [other for other, valid in zip(others, row) if valid]
+
+
+_indices: dict[tuple[str, int], tuple[int, CompatibilityIndex]] = {}
+_indices_lock = threading.Lock()
+
+
+def get_compatibility_index(C_max: int, dataset_path: str = DEFAULT_DATASET_PATH) -> CompatibilityIndex:
+    """
+    Returns the compatibility index over all PCBs of a dataset, building it only if the dataset changed since the last call.
+    """
+    dataset = get_dataset(dataset_path)
+    with dataset.lock:
+        pcbs = dataset.available_pcbs()
+        dataset.refresh(pcbs)
+        key = (dataset.dataset_path, C_max)
+        with _indices_lock:
+            version, index = _indices.get(key, (None, None))
+            if version != dataset.version:
+                incidence = np.zeros((len(pcbs), len(dataset.material_widths)), dtype=bool)
+                for i, pcb in enumerate(pcbs):
+                    incidence[i, dataset.pcb_materials[pcb]] = True
+                index = CompatibilityIndex(pcbs, incidence, dataset.material_widths, C_max)
+                _indices[key] = (dataset.version, index)
+            return index
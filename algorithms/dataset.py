@@ -0,0 +1,231 @@
+"""
+This module keeps the material catalogue and the PCB bills of material resident in memory, so that the optimizers
+do not parse the CSV files of the dataset on every call. Materials are interned to their row in the material
+catalogue and every PCB is stored as an integer array of those rows. A file is only read again once its
+modification time changes.
+
+A dataset directory can also hold a packed dataset file ( written by algorithms.pack_dataset ), an Arrow IPC file
+with the catalogue and all bills of material in CSR form. It is memory-mapped instead of parsed, so loading a
+dataset of thousands of PCBs costs next to nothing. The CSV files stay authoritative: the packed file is only used
+while it is newer than Material_catalogue.csv, and a PCB whose CSV file changed after it is read from the CSV file.
+"""
+import os
+import threading
+from collections.abc import Collection
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_DATASET_PATH = os.path.abspath(os.path.join(
+    __file__,
+    os.path.pardir,
+    os.path.pardir,
+    "50_entry_dataset"
+))
+MATERIAL_CATALOGUE_FILE = "Material_catalogue.csv"
+PACKED_DATASET_FILE = "dataset.arrow"
+
+
+def pcb_name(pcb_number: int) -> str:
+    return f"PCB{pcb_number:03d}"
+
+
+def has_pcbs(pcb_numbers, dataset_path: str = DEFAULT_DATASET_PATH) -> bool:
+    """ True if every PCB number has a bill of material in the dataset directory or its packed dataset file. """
+    packed_pcbs = None
+    for pcb_number in pcb_numbers:
+        if pcb_number < 1:
+            return False
+        if os.path.isfile(os.path.join(dataset_path, f"{pcb_name(pcb_number)}.csv")):
+            continue
+        if packed_pcbs is None:
+            packed_pcbs = get_dataset(dataset_path).packed_pcbs()
+        if pcb_name(pcb_number) not in packed_pcbs:
+            return False
+    return True
+
+
+class PackedDataset:
+    """
+    Memory-mapped packed dataset file. The file is an Arrow IPC file with a single row, whose list columns hold the
+    catalogue ( material_index, slot_width, material_type ) and the bills of material ( pcb, pcb_materials ). The
+    catalogue rows of the materials of PCB i are indices[indptr[i]:indptr[i + 1]], numpy views on the mapped file.
+
+    :param path: Path of the packed dataset file.
+    """
+
+    def __init__(self, path: str):
+        import pyarrow as pa    # only datasets with a packed file need pyarrow
+
+        self.path = path
+        table = pa.ipc.open_file(pa.memory_map(path, "r")).read_all()
+        row = {name: table.column(name).chunk(0).flatten() for name in table.column_names}
+
+        self.material_names = row["material_index"].to_numpy(zero_copy_only=False)
+        self.material_widths = row["slot_width"].to_numpy()
+        self.pcb_positions = {pcb: i for i, pcb in enumerate(row["pcb"].to_pylist())}
+        self.indptr = row["pcb_materials"].offsets.to_numpy()
+        self.indices = row["pcb_materials"].values.to_numpy()
+
+    def pcb_materials(self, pcb: str) -> np.ndarray:
+        """ Catalogue rows of the materials of a PCB. """
+        i = self.pcb_positions[pcb]
+        return self.indices[self.indptr[i]:self.indptr[i + 1]]
+
+
+class Dataset:
+    """
+    Material catalogue and PCB bills of material of one dataset directory.
+
+    :param dataset_path: Directory containing Material_catalogue.csv and the PCB###.csv files, or the packed dataset file.
+    """
+
+    def __init__(self, dataset_path: str):
+        self.dataset_path = dataset_path
+        self.material_names = np.empty(0, dtype=object)     # Material Index of every catalogue row
+        self.material_widths = np.empty(0, dtype=np.int32)  # Slot Width of every catalogue row
+        self.material_rows: dict[str, int] = {}             # Material Index -> catalogue row ( bit position in the PCB masks )
+        self.pcb_materials: dict[str, np.ndarray] = {}      # PCB -> catalogue rows of its materials
+        self.pcb_masks: dict[str, int] = {}                 # PCB -> bitmask of its catalogue rows
+
+        self.version = 0                                    # incremented on every (re)load, so derived data can be invalidated
+
+        self._material_width_list: list[int] = []
+        self._mtimes: dict[str, float] = {}
+        self._packed: PackedDataset | None = None
+        self._catalogue_file: str | None = None             # file the catalogue was loaded from
+        self._pcb_files: dict[str, str] = {}                # PCB -> file its bill of material was loaded from
+        self.lock = threading.RLock()
+
+    def _path(self, file_name: str) -> str:
+        return os.path.join(self.dataset_path, file_name)
+
+    def _is_stale(self, file_name: str) -> bool:
+        return self._mtimes.get(file_name) != os.stat(self._path(file_name)).st_mtime
+
+    def _catalogue_source(self) -> str:
+        # the packed file replaces the CSV files unless the catalogue was edited after the file was packed
+        packed_path, catalogue_path = self._path(PACKED_DATASET_FILE), self._path(MATERIAL_CATALOGUE_FILE)
+        if os.path.isfile(packed_path) and (not os.path.isfile(catalogue_path) or
+                                            os.stat(packed_path).st_mtime >= os.stat(catalogue_path).st_mtime):
+            return PACKED_DATASET_FILE
+        return MATERIAL_CATALOGUE_FILE
+
+    def _pcb_source(self, pcb: str) -> str:
+        # a packed PCB is read from its CSV file only if that file was edited after the file was packed
+        file_name = f"{pcb}.csv"
+        if self._packed is not None and pcb in self._packed.pcb_positions:
+            try:
+                if os.stat(self._path(file_name)).st_mtime <= self._mtimes[PACKED_DATASET_FILE]:
+                    return PACKED_DATASET_FILE
+            except FileNotFoundError:
+                return PACKED_DATASET_FILE
+        return file_name
+
+    def _load_catalogue(self, file_name: str) -> None:
+        mtime = os.stat(self._path(file_name)).st_mtime
+        if file_name == PACKED_DATASET_FILE:
+            self._packed = PackedDataset(self._path(file_name))
+            self.material_names = self._packed.material_names
+            self.material_widths = self._packed.material_widths
+        else:
+            self._packed = None
+            material_catalogue = pd.read_csv(self._path(file_name))
+            self.material_names = material_catalogue["Material Index"].to_numpy(dtype=object)
+            self.material_widths = material_catalogue["Slot Width"].to_numpy(dtype=np.int32)
+        self.material_rows = {material: row for row, material in enumerate(self.material_names)}
+        self._material_width_list = self.material_widths.tolist()
+        self._mtimes[file_name] = mtime
+        self._catalogue_file = file_name
+        self.version += 1
+
+        # the rows of the catalogue might have moved, so every PCB has to be interned again
+        for pcb in list(self.pcb_materials):
+            self._load_pcb(pcb, self._pcb_source(pcb))
+
+    def _load_pcb(self, pcb: str, file_name: str) -> None:
+        mtime = os.stat(self._path(file_name)).st_mtime
+        if file_name == PACKED_DATASET_FILE:
+            rows = self._packed.pcb_materials(pcb)
+        else:
+            materials = pd.read_csv(self._path(file_name))["Material Index"]
+            rows = np.fromiter((self.material_rows[material] for material in materials), dtype=np.int32, count=len(materials))
+
+        mask = 0
+        for row in rows.tolist():
+            mask |= 1 << row
+
+        self.pcb_materials[pcb] = rows
+        self.pcb_masks[pcb] = mask
+        self._mtimes[file_name] = mtime
+        self._pcb_files[pcb] = file_name
+        self.version += 1
+
+    def refresh(self, pcbs=()) -> None:
+        """
+        Loads the given PCBs if they are not resident yet and reloads every file whose modification time changed.
+
+        :param pcbs: PCB identifiers (e.g. "PCB001") that have to be available afterwards.
+        """
+        with self.lock:
+            file_name = self._catalogue_source()
+            if file_name != self._catalogue_file or self._is_stale(file_name):
+                self._load_catalogue(file_name)
+            for pcb in pcbs:
+                file_name = self._pcb_source(pcb)
+                if pcb not in self.pcb_materials or file_name != self._pcb_files[pcb] or self._is_stale(file_name):
+                    self._load_pcb(pcb, file_name)
+
+    def packed_pcbs(self) -> Collection[str]:
+        """ Identifiers of the PCBs in the packed dataset file, empty if the dataset is not packed. """
+        with self.lock:
+            if not os.path.isfile(self._path(PACKED_DATASET_FILE)):
+                return frozenset()
+            self.refresh()
+            return self._packed.pcb_positions.keys() if self._packed is not None else frozenset()
+
+    def available_pcbs(self) -> list[str]:
+        """ Identifiers of all PCBs that have a bill of material in the dataset directory or its packed dataset file. """
+        return sorted(set(self.packed_pcbs()).union(
+            file_name[:-len(".csv")] for file_name in os.listdir(self.dataset_path)
+            if file_name.startswith("PCB") and file_name.endswith(".csv")
+        ))
+
+    def encode(self, pcbs) -> tuple[dict[str, int], list[int]]:
+        """
+        Returns the material bitmasks of the given PCBs together with the slot width of every bit position.
+        """
+        with self.lock:
+            self.refresh(pcbs)
+            return {pcb: self.pcb_masks[pcb] for pcb in pcbs}, self._material_width_list
+
+    def pcb_width(self, pcb: str) -> int:
+        """ Total slot width of the materials of a PCB. """
+        return int(self.material_widths[self.pcb_materials[pcb]].sum())
+
+    def pcb_data_dict(self, pcbs) -> dict[str, np.ndarray]:
+        """ Dictionary of the given PCBs with their Material Index values, as read from the PCB files. """
+        with self.lock:
+            self.refresh(pcbs)
+            return {pcb: self.material_names[self.pcb_materials[pcb]] for pcb in pcbs}
+
+    def material_catalogue_dict(self) -> dict[str, int]:
+        """ Dictionary of the materials ( key: Material Index, value: Slot Width ). """
+        with self.lock:
+            self.refresh()
+            return dict(zip(self.material_names, self._material_width_list))
+
+
+_datasets: dict[str, Dataset] = {}
+_datasets_lock = threading.Lock()
+
+
+def get_dataset(dataset_path: str = DEFAULT_DATASET_PATH) -> Dataset:
+    """
+    Returns the process-wide resident dataset of a dataset directory.
+    """
+    dataset_path = os.path.abspath(dataset_path)
+    with _datasets_lock:
+        if dataset_path not in _datasets:
+            _datasets[dataset_path] = Dataset(dataset_path)
+        return _datasets[dataset_path]
@@ -0,0 +1,206 @@
+"""
+This module computes the minimum number of groups of a set of PCBs and the number of optimal combinations by dynamic
+programming over subsets of the PCBs, without enumerating the combinations. Subsets are integer bitsets over the
+positions of the PCBs in the list sorted by their total slot width.
+
+Every combination of a subset S is counted once by choosing the group of the first PCB of S first:
+    min_groups(S) = 1 + min over the feasible groups G of the first PCB of S, G within S, of min_groups(S \\ G)
+and the number of optimal combinations of S sums the numbers of the S \\ G that reach that minimum.
+"""
+import os
+import tempfile
+import time
+
+from algorithms.bounds import SearchBound
+from algorithms.bruteforce.common import CHECK_INTERVAL, deadline_after, load_pcbs, mask_width
+from algorithms.bruteforce.serial import call_list, create_json_data
+from algorithms.dataset import DEFAULT_DATASET_PATH, has_pcbs
+
+DEFAULT_MAX_SUBSETS = 250000    # solved subsets kept in the memo, about 170 bytes each
+
+
+class BudgetExceeded(Exception):
+    """
+    Raised by SubsetDP when its deadline passed or its memo holds more subsets than its budget.
+    """
+
+
+def group_trees(pcb_list, pcb_masks, material_widths, C_max, search_bound=None):
+    '''
+    This function builds one tree per PCB of the valid groups whose first PCB it is. A node is a tuple of the bitset
+    ( over the positions in pcb_list ) of a valid group and the list of its children, each a tuple of the bit of the
+    PCB added to the group and the node of the larger group. Every valid group appears exactly once in the trees.
+
+    :param pcb_list: List of PCB identifiers.
+    :param pcb_masks: Dictionary with PCB identifiers as keys and their material bitmasks as values.
+    :param material_widths: List of slot widths indexed by the bit position of the material.
+    :param C_max: Maximum allowed slot width for any group.
+    :param search_bound: SearchBound covering pcb_list. Built from it if not given.
+    :return: List of the root nodes, one per PCB.
+    '''
+    if search_bound is None:
+        search_bound = SearchBound(pcb_list, pcb_masks, material_widths, C_max)
+    incompatible = [search_bound.incompatible[pcb] for pcb in pcb_list]
+
+    def extend(group, materials, width, blocked, start):
+        children = []
+        for j in range(start, len(pcb_list)):
+            if (blocked >> j) & 1:                                      # incompatible with a member of the group
+                continue
+            new_width = width + mask_width(pcb_masks[pcb_list[j]] & ~materials, material_widths)
+            if new_width <= C_max:                                      # every subset of a valid group is valid, so larger groups only grow from valid ones
+                children.append((1 << j, extend(group | (1 << j), materials | pcb_masks[pcb_list[j]], new_width, blocked | incompatible[j], j + 1)))
+        return group, children
+
+    roots = []
+    for i, pcb in enumerate(pcb_list):
+        width = mask_width(pcb_masks[pcb], material_widths)
+        if width > C_max:                                               # a group consisting of only one PCB is always valid
+            roots.append((1 << i, []))
+        else:
+            roots.append(extend(1 << i, pcb_masks[pcb], width, incompatible[i], i + 1))
+    return roots
+
+
+def groups_within(node, subset):
+    '''
+    This function yields the valid groups of a tree that only contain PCBs of the subset, assuming its root group does.
+    '''
+    group, children = node
+    yield group
+    for bit, child in children:
+        if subset & bit:
+            yield from groups_within(child, subset)
+
+
+class SubsetDP:
+    """
+    Minimum number of groups and number of optimal combinations of the subsets of a list of PCBs.
+
+    :param pcb_list: List of PCB identifiers.
+    :param pcb_masks: Dictionary with PCB identifiers as keys and their material bitmasks as values.
+    :param material_widths: List of slot widths indexed by the bit position of the material.
+    :param C_max: Maximum allowed slot width for any group.
+    :param progress: SearchProgress the number of solved subsets is added to.
+    :param deadline: time.monotonic() value after which BudgetExceeded is raised, None for no limit.
+    :param max_subsets: Number of solved subsets after which BudgetExceeded is raised, None for no limit.
+    """
+
+    def __init__(self, pcb_list, pcb_masks, material_widths, C_max, progress=None, deadline=None, max_subsets=None):
+        self.pcb_list = list(pcb_list)
+        self.progress = progress
+        self.deadline = deadline
+        self.max_subsets = max_subsets
+        self.roots = group_trees(self.pcb_list, pcb_masks, material_widths, C_max)
+        self.memo: dict[int, tuple[int, int]] = {0: (0, 1)}            # subset -> (minimum number of groups, number of optimal combinations)
+
+    def _first_groups(self, subset: int):
+        first = (subset & -subset).bit_length() - 1                     # every combination of the subset has exactly one group containing its first PCB
+        return groups_within(self.roots[first], subset)
+
+    def solve(self, subset: int) -> tuple[int, int]:
+        '''
+        Returns the minimum number of groups of a subset and the number of its combinations with that many groups.
+        '''
+        result = self.memo.get(subset)
+        if result is not None:
+            return result
+
+        first = subset & -subset                                        # every combination of the subset has exactly one group containing its first PCB
+        best = [len(self.pcb_list) + 1, 0]
+        self._visit(self.roots[first.bit_length() - 1], subset & ~first, best)
+
+        result = self.memo[subset] = tuple(best)
+        if len(self.memo) % CHECK_INTERVAL == 0:
+            if self.progress is not None:
+                self.progress.add_nodes(CHECK_INTERVAL)
+            if (self.deadline is not None and time.monotonic() > self.deadline) or \
+                    (self.max_subsets is not None and len(self.memo) > self.max_subsets):
+                raise BudgetExceeded()
+        return result
+
+    def _visit(self, node, rest, best):
+        # rest holds the PCBs of the subset outside of the group of the node
+        group, children = node
+        n_groups, n_combinations = self.solve(rest)
+        if n_groups + 1 < best[0]:
+            best[0], best[1] = n_groups + 1, n_combinations
+        elif n_groups + 1 == best[0]:
+            best[1] += n_combinations
+        for bit, child in children:
+            if rest & bit:
+                self._visit(child, rest & ~bit, best)
+
+    def witness(self, subset: int) -> list[list[str]]:
+        '''
+        Returns one combination of a subset with the minimum number of groups.
+        '''
+        combination = []
+        while subset:
+            n_groups, _ = self.solve(subset)
+            group = next(group for group in self._first_groups(subset) if self.solve(subset & ~group)[0] == n_groups - 1)
+            combination.append([pcb for i, pcb in enumerate(self.pcb_list) if (group >> i) & 1])
+            subset &= ~group
+        return combination
+
+
+def count_optimal_combinations(pcb_list, pcb_masks, material_widths, C_max, progress=None, deadline=None, max_subsets=None):
+    '''
+    This function computes the minimum number of groups of the PCBs and the number of optimal combinations.
+
+    :param pcb_list: List of PCB identifiers.
+    :param pcb_masks: Dictionary with PCB identifiers as keys and their material bitmasks as values.
+    :param material_widths: List of slot widths indexed by the bit position of the material.
+    :param C_max: Maximum allowed slot width for any group.
+    :param progress: SearchProgress receiving the number of solved subsets and the minimum once it is known.
+    :param deadline: time.monotonic() value after which BudgetExceeded is raised, None for no limit.
+    :param max_subsets: Number of solved subsets after which BudgetExceeded is raised, None for no limit.
+    :return: Tuple of the minimum number of groups, the number of combinations with that many groups and one of them.
+    '''
+    dp = SubsetDP(pcb_list, pcb_masks, material_widths, C_max, progress, deadline, max_subsets)
+    everything = (1 << len(pcb_list)) - 1
+    min_groups, n_combinations = dp.solve(everything)
+    if progress is not None:
+        progress.add_nodes(len(dp.memo) % CHECK_INTERVAL)
+        progress.report(min_groups, min_groups)
+    return min_groups, n_combinations, dp.witness(everything)
+
+
+def call_list_dp(input_pcb_list, time_limit=None, max_subsets=DEFAULT_MAX_SUBSETS, progress=None, dataset_path=DEFAULT_DATASET_PATH):
+    """
+    This function takes a list of PCB numbers and returns one optimal grouping together with the number of optimal
+    groupings, which are counted without being generated. If the dynamic programming exceeds its time limit or its
+    subset budget, the optimal groupings are counted by enumerating them with the serial optimizer for the rest of
+    the time limit instead.
+
+    :param input_pcb_list: List of PCB numbers.
+    :param time_limit: Time limit in seconds, None for no limit.
+    :param max_subsets: Number of subsets the dynamic programming may keep in memory, None for no limit.
+    :param progress: SearchProgress the dynamic programming reports to while it runs.
+    :param dataset_path: Directory containing Material_catalogue.csv and the PCB###.csv files.
+    :return: json dictionary in the format of the serial optimizer with a single combination and "n_combinations".
+             If the enumeration did not finish, it also contains "complete": False and n_combinations is the number
+             of optimal groupings found in time.
+    """
+    if isinstance(input_pcb_list, int):
+        input_pcb_list = [input_pcb_list]
+    if len(input_pcb_list) <= 0:
+        return {"Error": "empty input list"}
+    if not has_pcbs(input_pcb_list, dataset_path):
+        return {"Error": "the input PCBs must be PCBs of the dataset"}
+
+    C_max = 15  # maximum slot size
+    deadline = deadline_after(time_limit)
+    pcb_list, pcb_data_dict, pcb_masks, material_widths = load_pcbs(input_pcb_list, dataset_path)
+    try:
+        min_groups, n_combinations, combination = count_optimal_combinations(pcb_list, pcb_masks, material_widths, C_max, progress, deadline, max_subsets)
+    except BudgetExceeded:
+        remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+        with tempfile.TemporaryDirectory() as directory:         # only the number of the streamed combinations is kept
+            json_data = call_list(input_pcb_list, os.path.join(directory, "combinations.ndjson"), remaining, progress, dataset_path)
+        json_data.pop("combinations_file", None)
+        return json_data
+
+    json_data = create_json_data([combination], pcb_data_dict)
+    json_data["n_combinations"] = n_combinations
+    return json_data
@@ -0,0 +1,38 @@
+"""
+This module lists the grouping engines under a short name, for the scripts that run any of them such as the benchmark
+suite and the profiler. Every engine is called as function(pcb_numbers, progress=..., dataset_path=...) and returns
+a json dictionary in the format of one of the optimizers.
+"""
+from collections import namedtuple
+
+from algorithms.bruteforce.hybrid import call_list_hybrid
+from algorithms.bruteforce.parallel import call_list_parallel
+from algorithms.bruteforce.serial import call_list
+from algorithms.dp.subset import call_list_dp
+from algorithms.heuristics import call_list_greedy
+from algorithms.sat.solver import call_list_sat
+
+# Only exact engines find the minimum number of groups, and max_pcbs is the largest number of PCBs an engine is
+# practical for.
+Engine = namedtuple("Engine", ["function", "exact", "max_pcbs"])
+
+ENGINES = {
+    "serial": Engine(call_list, True, 15),
+    "hybrid": Engine(call_list_hybrid, True, 30),
+    "parallel": Engine(call_list_parallel, True, 15),
+    "sat": Engine(call_list_sat, True, 50),
+    "dp": Engine(call_list_dp, True, 20),
+    "greedy": Engine(lambda pcb_numbers, progress, dataset_path: call_list_greedy(pcb_numbers, dataset_path), False, 1000),
+}
+
+
+def parse_range(pcb_range: str) -> list[int]:
+    # "1-15" -> [1, 2, ..., 15], "7" -> [7]
+    first, _, last = pcb_range.partition("-")
+    return list(range(int(first), int(last or first) + 1))
+
+
+def n_groups(json_data: dict) -> int:
+    # number of groups of the ( first ) combination of a result in the format of any of the optimizers
+    groups = json_data["groups"] if "groups" in json_data else next(iter(json_data["combinations"][0].values()))
+    return len(groups)
@@ -0,0 +1,141 @@
+"""
+This module contains constructive heuristics that find a valid combination of PCBs quickly. The number of groups of
+such a combination is an upper bound for the exact engines, which start from it instead of from every PCB on its own.
+"""
+from algorithms.bounds import lower_bound
+from algorithms.bruteforce.common import group_mask, load_pcbs, mask_width
+from algorithms.dataset import DEFAULT_DATASET_PATH, has_pcbs
+
+
+def first_fit(pcb_list, pcb_masks, material_widths, C_max):
+    '''
+    This function puts every PCB into the first group that can take it. The width a PCB adds to a group only counts its
+    materials that are not loaded for the group yet, so PCBs sharing materials end up together.
+
+    :param pcb_list: List of PCB identifiers, usually sorted by their total slot width in descending order.
+    :param pcb_masks: Dictionary with PCB identifiers as keys and their material bitmasks as values.
+    :param material_widths: List of slot widths indexed by the bit position of the material.
+    :param C_max: Maximum allowed slot width for any group.
+    :return: A valid combination as a list of groups of PCB identifiers.
+    '''
+    groups, masks, widths = [], [], []
+    for pcb in pcb_list:
+        pcb_mask = pcb_masks[pcb]
+        for i in range(len(groups)):
+            new_width = widths[i] + mask_width(pcb_mask & ~masks[i], material_widths)
+            if new_width <= C_max:
+                groups[i].append(pcb)
+                masks[i] |= pcb_mask
+                widths[i] = new_width
+                break
+        else:                                                           # a group consisting of only one PCB is always valid
+            groups.append([pcb])
+            masks.append(pcb_mask)
+            widths.append(mask_width(pcb_mask, material_widths))
+    return groups
+
+
+def best_fit(pcb_list, pcb_masks, material_widths, C_max, groups=None):
+    '''
+    This function puts every PCB into the group to which it adds the least slot width, that is the group sharing the
+    most of its materials. A new group is only opened if no group can take the PCB.
+
+    :param pcb_list: List of PCB identifiers, usually sorted by their total slot width in descending order.
+    :param pcb_masks: Dictionary with PCB identifiers as keys and their material bitmasks as values.
+    :param material_widths: List of slot widths indexed by the bit position of the material.
+    :param C_max: Maximum allowed slot width for any group.
+    :param groups: Groups the PCBs are added to. Starts with no groups if not given.
+    :return: A valid combination as a list of groups of PCB identifiers.
+    '''
+    groups = [list(group) for group in groups or []]
+    masks = [group_mask(group, pcb_masks) for group in groups]
+    widths = [mask_width(mask, material_widths) for mask in masks]
+    for pcb in pcb_list:
+        pcb_mask = pcb_masks[pcb]
+        best, best_added = None, None
+        for i in range(len(groups)):
+            added = mask_width(pcb_mask & ~masks[i], material_widths)
+            if widths[i] + added <= C_max and (best is None or added < best_added):
+                best, best_added = i, added
+        if best is None:                                                # a group consisting of only one PCB is always valid
+            groups.append([pcb])
+            masks.append(pcb_mask)
+            widths.append(mask_width(pcb_mask, material_widths))
+        else:
+            groups[best].append(pcb)
+            masks[best] |= pcb_mask
+            widths[best] += best_added
+    return groups
+
+
+def dissolve_groups(combination, pcb_list, pcb_masks, material_widths, C_max):
+    '''
+    This function improves a combination by dissolving groups: starting with the smallest group, the PCBs of a group
+    are moved into the other groups if all of them fit. This is repeated until no group can be dissolved.
+
+    :param combination: Valid combination as a list of groups of PCB identifiers.
+    :param pcb_list: List of PCB identifiers, the PCBs of a group are moved in this order.
+    :param pcb_masks: Dictionary with PCB identifiers as keys and their material bitmasks as values.
+    :param material_widths: List of slot widths indexed by the bit position of the material.
+    :param C_max: Maximum allowed slot width for any group.
+    :return: A valid combination with at most as many groups.
+    '''
+    position = {pcb: i for i, pcb in enumerate(pcb_list)}
+    combination = [list(group) for group in combination]
+    improved = True
+    while improved:
+        improved = False
+        for group in sorted(combination, key=len):
+            others = [other for other in combination if other is not group]
+            moved = best_fit(sorted(group, key=position.get), pcb_masks, material_widths, C_max, others)
+            if len(moved) == len(others):                               # every PCB of the group found a place in another group
+                combination = moved
+                improved = True
+                break
+    return combination
+
+
+def greedy_combination(pcb_list, pcb_masks, material_widths, C_max):
+    '''
+    This function finds a good valid combination in milliseconds: the better of first fit and best fit over the PCBs
+    in the given order, improved by dissolving groups. Its groups are in the order of their first PCB in pcb_list and
+    the PCBs of every group are in the order of pcb_list, like the combinations of the brute force engines.
+
+    :param pcb_list: List of PCB identifiers, usually sorted by their total slot width in descending order.
+    :param pcb_masks: Dictionary with PCB identifiers as keys and their material bitmasks as values.
+    :param material_widths: List of slot widths indexed by the bit position of the material.
+    :param C_max: Maximum allowed slot width for any group.
+    :return: A valid combination as a list of groups of PCB identifiers.
+    '''
+    candidates = [first_fit(pcb_list, pcb_masks, material_widths, C_max), best_fit(pcb_list, pcb_masks, material_widths, C_max)]
+    combination = min((dissolve_groups(candidate, pcb_list, pcb_masks, material_widths, C_max) for candidate in candidates), key=len)
+
+    position = {pcb: i for i, pcb in enumerate(pcb_list)}
+    combination = [sorted(group, key=position.get) for group in combination]
+    return sorted(combination, key=lambda group: position[group[0]])
+
+
+def call_list_greedy(input_pcb_list, dataset_path=DEFAULT_DATASET_PATH):
+    """
+    This function takes a list of PCB numbers and returns a provisional grouping found by the greedy heuristic, together
+    with whether its number of groups is already proven to be minimal by the lower bound.
+
+    :param input_pcb_list: List of PCB numbers.
+    :param dataset_path: Directory containing Material_catalogue.csv and the PCB###.csv files.
+    :return: json dictionary with the groups, the lower bound and whether the grouping is proven optimal.
+    """
+    if isinstance(input_pcb_list, int):
+        input_pcb_list = [input_pcb_list]
+    assert len(input_pcb_list) > 0, "Error: empty input list."
+    assert has_pcbs(input_pcb_list, dataset_path), "Error: PCB numbers must be PCBs of the dataset."
+
+    C_max = 15  # maximum slot size
+    pcb_list, pcb_data_dict, pcb_masks, material_widths = load_pcbs(input_pcb_list, dataset_path)
+    combination = greedy_combination(pcb_list, pcb_masks, material_widths, C_max)
+    lower = lower_bound(pcb_list, pcb_masks, material_widths, C_max)
+
+    return {
+        "groups": [{"group_id": group_id, "PCBs": group} for group_id, group in enumerate(combination, start=1)],
+        "lower_bound": lower,
+        "optimal": len(combination) <= lower
+    }
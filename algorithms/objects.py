@@ -1,7 +1,12 @@
 import json
 from typing import Optional
+from collections.abc import Sequence
 from dataclasses import dataclass
 
+import numpy as np
+
+NO_GROUP = np.iinfo(np.uint8).max   # label of a PCB that is not part of a combination
+
 @dataclass
 class PCB():
     name: str
@@ -111,6 +116,170 @@ class Combinations():
         return f"Combinations({self.combinations})"
 
 
+class CombinationTable():
+    """
+    Compact storage of a set of combinations over the same PCBs: a 2-D array of group labels ( one uint8 per PCB per
+    combination, the index of the group in the combination ) and one interned table of the PCB names.
+    The PCBs of a group are listed in the order of the name table.
+
+    :param pcb_names: Array of the PCB names, one per column of labels.
+    :param labels: Array (combinations x PCBs) of group labels.
+    """
+
+    def __init__(self, pcb_names, labels):
+        self.pcb_names = np.asarray(pcb_names, dtype=object)
+        self.labels = np.asarray(labels, dtype=np.uint8)
+        self.position = {name: i for i, name in enumerate(self.pcb_names)}
+
+    @staticmethod
+    def _group_names(group):
+        if isinstance(group, list):
+            return [pcb["name"] for pcb in group]
+        return group["PCBs"]
+
+    @staticmethod
+    def _groups(entry):
+        if "groups" in entry:
+            return entry["groups"]
+        return next(iter(entry.values()))
+
+    @classmethod
+    def from_entries(cls, entries, chunk_size: int = 4096):
+        """
+        Builds the table from combination entries, as in the "combinations" list of the optimizer output or in a
+        streamed NDJSON file. The entries are consumed one at a time, so an iterator never has to be held in memory.
+        """
+        names, position = [], {}
+        chunks, chunk = [], []
+        for entry in entries:
+            groups = cls._groups(entry)
+            if not names:                                       # the name table is interned from the first combination
+                names = [name for group in groups for name in cls._group_names(group)]
+                position = {name: i for i, name in enumerate(names)}
+            if len(groups) >= NO_GROUP:
+                raise ValueError(f"A combination has {len(groups)} groups, at most {NO_GROUP - 1} are supported.")
+
+            row = np.full(len(names), NO_GROUP, dtype=np.uint8)
+            for label, group in enumerate(groups):
+                for name in cls._group_names(group):
+                    if name not in position:
+                        raise ValueError(f"{name} is not part of the first combination.")
+                    row[position[name]] = label
+            chunk.append(row)
+            if len(chunk) == chunk_size:
+                chunks.append(np.vstack(chunk))
+                chunk = []
+        if chunk:
+            chunks.append(np.vstack(chunk))
+
+        labels = np.vstack(chunks) if chunks else np.empty((0, len(names)), dtype=np.uint8)
+        return cls(names, labels)
+
+    @classmethod
+    def from_json(cls, json_data):
+        if "combinations" in json_data:
+            return cls.from_entries(json_data["combinations"])
+        return cls.from_entries([json_data])
+
+    def __len__(self):
+        return len(self.labels)
+
+    def n_groups(self) -> np.ndarray:
+        """ Number of groups of every combination. """
+        used = np.where(self.labels == NO_GROUP, 0, self.labels.astype(np.int16) + 1)
+        return used.max(axis=1, initial=0)
+
+    def group_of(self, pcb: str) -> np.ndarray:
+        """ Group label of a PCB in every combination. """
+        return self.labels[:, self.position[pcb]]
+
+    def select(self, rows) -> "CombinationTable":
+        """ Table of the combinations selected by an index array or a boolean mask. """
+        return CombinationTable(self.pcb_names, self.labels[rows])
+
+    def groups(self, row: int) -> list[list[str]]:
+        """ Groups of the combination in a row as lists of PCB names. """
+        labels = self.labels[row]
+        return [self.pcb_names[labels == label].tolist() for label in range(self.n_groups_of(row))]
+
+    def n_groups_of(self, row: int) -> int:
+        labels = self.labels[row]
+        labels = labels[labels != NO_GROUP]
+        return int(labels.max()) + 1 if len(labels) else 0
+
+    def mapping(self, row: int) -> dict[str, int]:
+        """ Dictionary of the PCBs of the combination in a row with their group labels. """
+        return {name: int(label) for name, label in zip(self.pcb_names, self.labels[row]) if label != NO_GROUP}
+
+    def to_json(self):
+        def entry(row):
+            return [{"group_id": group_id, "PCBs": names} for group_id, names in enumerate(self.groups(row), start=1)]
+
+        if len(self) == 1:
+            return {"groups": entry(0)}
+        return {
+            "combinations": [{f"combination{row + 1}": entry(row)} for row in range(len(self))]
+        }
+
+
+class CombinationView(Combination):
+    """
+    Combination whose groups are built from one row of a CombinationTable when they are accessed.
+    """
+
+    def __init__(self, table: CombinationTable, row: int):
+        self.table = table
+        self.row = row
+
+    @property
+    def groups(self) -> list[Group]:
+        return [Group(pcbs=[PCB(name=name) for name in names]) for names in self.table.groups(self.row)]
+
+    def mapping(self) -> dict[str, int]:
+        return self.table.mapping(self.row)
+
+
+class _CombinationViews(Sequence):
+
+    def __init__(self, table: CombinationTable):
+        self.table = table
+
+    def __len__(self):
+        return len(self.table)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [CombinationView(self.table, row) for row in range(len(self.table))[index]]
+        if index < 0:
+            index += len(self.table)
+        if not 0 <= index < len(self.table):
+            raise IndexError(index)
+        return CombinationView(self.table, index)
+
+
+class CompactCombinations(Combinations):
+    """
+    Combinations backed by a CombinationTable. The Combination objects are only created as views when they are accessed.
+    """
+
+    def __init__(self, table: CombinationTable):
+        self.table = table
+
+    @property
+    def combinations(self) -> Sequence[Combination]:
+        return _CombinationViews(self.table)
+
+    def to_json(self):
+        return self.table.to_json()
+
+    @classmethod
+    def from_json(cls, json_data):
+        return cls(CombinationTable.from_json(json_data))
+
+    def __str__(self):
+        return f"CompactCombinations({len(self.table)} combinations of {len(self.table.pcb_names)} PCBs)"
+
+
 if __name__ == "__main__":
     output_5 = r"C:\buff\production-advice\output\5.json"
     output_0 = r"C:\buff\production-advice\output\0.json"
@@ -0,0 +1,78 @@
+"""
+This script packs the material catalogue and all PCB bills of material of a dataset directory into the packed dataset
+file of algorithms.dataset, so that the optimizers and their worker processes memory-map a single file instead of
+parsing one CSV file per PCB. Material indices are interned to their row in the catalogue and the bills of material
+are stored CSR-style: one array of catalogue rows for all PCBs and the offset of every PCB into it.
+
+    python -m algorithms.pack_dataset ./50_entry_dataset
+    python -m algorithms.pack_dataset ./synthetic_1000
+
+Run it again after editing the CSV files. Until then, the edited files are read from the CSV files.
+"""
+import argparse
+import os
+import tempfile
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from algorithms.dataset import DEFAULT_DATASET_PATH, MATERIAL_CATALOGUE_FILE, PACKED_DATASET_FILE
+
+
+def pack_dataset(dataset_path=DEFAULT_DATASET_PATH, output_path=None) -> str:
+    '''
+    This function writes the packed dataset file of a dataset directory.
+
+    :param dataset_path: Directory containing Material_catalogue.csv and the PCB###.csv files.
+    :param output_path: Path of the packed file, by default the packed dataset file in the dataset directory.
+    :return: The path of the packed file.
+    '''
+    output_path = output_path or os.path.join(dataset_path, PACKED_DATASET_FILE)
+
+    material_catalogue = pd.read_csv(os.path.join(dataset_path, MATERIAL_CATALOGUE_FILE))
+    material_rows = {material: row for row, material in enumerate(material_catalogue["Material Index"])}
+
+    pcbs = sorted(
+        file_name[:-len(".csv")] for file_name in os.listdir(dataset_path)
+        if file_name.startswith("PCB") and file_name.endswith(".csv")
+    )
+    indptr = np.zeros(len(pcbs) + 1, dtype=np.int32)       # PCB i has the catalogue rows indices[indptr[i]:indptr[i + 1]]
+    indices = []
+    for i, pcb in enumerate(pcbs):
+        materials = pd.read_csv(os.path.join(dataset_path, f"{pcb}.csv"), usecols=["Material Index"])["Material Index"]
+        indices.extend(material_rows[material] for material in materials)
+        indptr[i + 1] = len(indices)
+
+    # one row of list columns, so the catalogue and the bills of material of different lengths fit into one file
+    def one_row(values):
+        return pa.ListArray.from_arrays(pa.array([0, len(values)], type=pa.int32()), values)
+
+    table = pa.Table.from_arrays([
+        one_row(pa.array(material_catalogue["Material Index"].astype(str), type=pa.string())),
+        one_row(pa.array(material_catalogue["Slot Width"], type=pa.int32())),
+        one_row(pa.array(material_catalogue["Material Type"].astype(str), type=pa.string())),
+        one_row(pa.array(pcbs, type=pa.string())),
+        one_row(pa.ListArray.from_arrays(pa.array(indptr), pa.array(np.array(indices, dtype=np.int32)))),
+    ], names=["material_index", "slot_width", "material_type", "pcb", "pcb_materials"])
+
+    # written next to the target and renamed, so a running optimizer never maps a partial file
+    file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_path)), suffix=".tmp")
+    try:
+        with os.fdopen(file_descriptor, "wb") as file, pa.ipc.new_file(file, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(temporary_path, output_path)
+    except BaseException:
+        os.remove(temporary_path)
+        raise
+    return output_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pack a PCB dataset directory into a single memory-mappable file.")
+    parser.add_argument("dataset_path", nargs="?", default=DEFAULT_DATASET_PATH)
+    parser.add_argument("--output", help=f"packed file, by default {PACKED_DATASET_FILE} in the dataset directory")
+    args = parser.parse_args()
+
+    output_path = pack_dataset(args.dataset_path, args.output)
+    print(f"Packed {args.dataset_path} into {output_path} ({os.path.getsize(output_path) / 1024:.1f} KiB)")
@@ -0,0 +1,79 @@
+"""
+This script runs one grouping engine on a list of PCBs under cProfile and with an instrumented SearchProgress, to find
+out why a request is slow. It dumps the profile to a file, prints the most expensive functions, the search counters
+and the nodes and time per depth of the search tree.
+
+    python -m algorithms.profiling hybrid 1-20 --output hybrid.prof
+    python -m algorithms.profiling serial 1,3,5-12 --sort tottime --limit 15
+
+Only the calling process is profiled: the work of the worker processes of the hybrid and parallel engines only shows
+up in the search counters, which are collected from every process.
+"""
+import argparse
+import cProfile
+import json
+import pstats
+import time
+
+from algorithms.dataset import DEFAULT_DATASET_PATH
+from algorithms.engines import ENGINES, parse_range
+from algorithms.progress import SearchProgress
+
+
+def parse_pcbs(text: str) -> list[int]:
+    # "1,3,5-12" -> [1, 3, 5, 6, ..., 12]
+    return [pcb_number for part in text.split(",") for pcb_number in parse_range(part)]
+
+
+def profile_engine(engine_name, pcb_numbers, output_path=None, dataset_path=DEFAULT_DATASET_PATH):
+    '''
+    This function runs an engine under cProfile with an instrumented SearchProgress.
+
+    :param engine_name: Name of the engine in ENGINES.
+    :param pcb_numbers: List of PCB numbers.
+    :param output_path: If given, the profile is dumped to this file, to be read with pstats or snakeviz.
+    :param dataset_path: Directory containing Material_catalogue.csv and the PCB###.csv files.
+    :return: Tuple of the pstats.Stats of the run, the statistics of the search and the wall time in seconds.
+    '''
+    progress = SearchProgress(instrumented=True)
+    profiler = cProfile.Profile()
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        ENGINES[engine_name].function(pcb_numbers, progress=progress, dataset_path=dataset_path)
+    finally:
+        profiler.disable()
+    wall = time.perf_counter() - start
+
+    if output_path is not None:
+        profiler.dump_stats(output_path)
+    return pstats.Stats(profiler), progress.statistics(), wall
+
+
+def format_statistics(statistics: dict) -> str:
+    '''
+    This function formats the statistics of a search as a summary and a table of the nodes and time per depth.
+    '''
+    lines = [f"{name}: {value}" for name, value in statistics.items() if name not in ("depth_nodes", "depth_seconds")]
+    if statistics.get("depth_nodes"):
+        lines.append(f"{'depth':>6}{'nodes':>14}{'seconds':>12}")
+        for depth, (nodes, seconds) in enumerate(zip(statistics["depth_nodes"], statistics["depth_seconds"])):
+            lines.append(f"{depth:>6}{nodes:>14}{seconds:>12.4f}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Profile a PCB grouping engine.")
+    parser.add_argument("engine", choices=list(ENGINES))
+    parser.add_argument("pcbs", type=parse_pcbs, help="PCB numbers, e.g. 1-15 or 1,3,5-12")
+    parser.add_argument("--output", help="file the cProfile stats are dumped to")
+    parser.add_argument("--sort", default="cumulative", help="pstats sort key, e.g. cumulative or tottime")
+    parser.add_argument("--limit", type=int, default=25, help="number of functions printed")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET_PATH)
+    parser.add_argument("--json", action="store_true", help="print the search statistics as JSON")
+    args = parser.parse_args()
+
+    stats, statistics, wall = profile_engine(args.engine, args.pcbs, args.output, args.dataset)
+    stats.sort_stats(args.sort).print_stats(args.limit)
+    print(f"wall time: {wall:.3f} s")
+    print(json.dumps(statistics) if args.json else format_statistics(statistics))
@@ -0,0 +1,113 @@
+"""
+This module provides the progress counters an optimization reports while it runs: the number of search nodes explored,
+the number of groups of the best combination found and the proven lower bound. The counters live in shared memory, so
+they can be read from another process while the search runs, including searches spread over worker processes.
+
+An instrumented SearchProgress additionally counts the validity checks, the prunes by the bound and the solutions of
+the search, the nodes and the time spent at every depth of the search tree, and the numbers of groups k the k-search
+is still checking. Instrumentation slows the search down a little, so it is opt-in.
+"""
+import multiprocessing
+import signal
+
+MAX_DEPTH = 1024            # depths beyond are counted at the last depth
+MAX_RUNNING_SEARCHES = 64   # number of running k-searches that are tracked
+
+
+def _exit(signum, frame):
+    raise SystemExit(1)
+
+
+def release_locks_on_terminate() -> None:
+    """
+    Makes Process.terminate() raise SystemExit in the calling worker process instead of killing it on the spot, so a
+    worker terminated while it updates a counter still releases the lock of the counter.
+    """
+    signal.signal(signal.SIGTERM, _exit)
+
+
+class SearchProgress:
+    """
+    Shared progress counters of one optimization. A value of 0 for best or lower_bound means not known yet.
+
+    :param instrumented: If True, the searches also collect the counters of SearchProgress.statistics.
+    """
+
+    def __init__(self, instrumented=False):
+        self._nodes = multiprocessing.Value("q", 0)
+        self._best = multiprocessing.Value("i", 0)
+        self._lower_bound = multiprocessing.Value("i", 0)
+
+        self.instrumented = instrumented
+        if instrumented:
+            self._checks = multiprocessing.Value("q", 0)
+            self._prunes = multiprocessing.Value("q", 0)
+            self._solutions = multiprocessing.Value("q", 0)
+            self._depth_nodes = multiprocessing.Array("q", MAX_DEPTH)
+            self._depth_seconds = multiprocessing.Array("d", MAX_DEPTH)
+            self._running = multiprocessing.Array("i", MAX_RUNNING_SEARCHES)
+
+    @property
+    def nodes(self) -> int:
+        return self._nodes.value
+
+    @property
+    def best(self) -> int:
+        return self._best.value
+
+    @property
+    def lower_bound(self) -> int:
+        return self._lower_bound.value
+
+    def add_nodes(self, nodes: int) -> None:
+        with self._nodes.get_lock():
+            self._nodes.value += nodes
+
+    def report(self, best=None, lower_bound=None) -> None:
+        """ Reports a combination with best groups and a proven lower bound, keeping the best value of each. """
+        if best is not None:
+            with self._best.get_lock():
+                if self._best.value == 0 or best < self._best.value:
+                    self._best.value = best
+        if lower_bound is not None:
+            with self._lower_bound.get_lock():
+                self._lower_bound.value = max(self._lower_bound.value, lower_bound)
+
+    def add_counts(self, checks: int, prunes: int, solutions: int, depth_nodes, depth_seconds) -> None:
+        """ Adds the counters a search collected since its last report. Only for instrumented progress. """
+        for value, count in ((self._checks, checks), (self._prunes, prunes), (self._solutions, solutions)):
+            with value.get_lock():
+                value.value += count
+        with self._depth_nodes.get_lock():
+            for depth, count in enumerate(depth_nodes):
+                self._depth_nodes[min(depth, MAX_DEPTH - 1)] += count
+        with self._depth_seconds.get_lock():
+            for depth, seconds in enumerate(depth_seconds):
+                self._depth_seconds[min(depth, MAX_DEPTH - 1)] += seconds
+
+    def set_running(self, ks) -> None:
+        """ Sets the numbers of groups the k-search is still checking. Only for instrumented progress. """
+        ks = sorted(ks)[:MAX_RUNNING_SEARCHES]
+        with self._running.get_lock():
+            self._running[:] = ks + [0] * (MAX_RUNNING_SEARCHES - len(ks))
+
+    def statistics(self) -> dict:
+        """
+        Returns the counters as a dictionary. An instrumented progress adds the number of validity checks, of prunes
+        by the bound and of solutions, the number of nodes and the seconds spent ( excluding the deeper nodes ) per
+        depth of the search tree, and the numbers of groups the k-search is still checking.
+        """
+        statistics = {"nodes": self.nodes, "best": self.best, "lower_bound": self.lower_bound}
+        if self.instrumented:
+            depth_nodes = self._depth_nodes[:]
+            depth_seconds = self._depth_seconds[:]
+            deepest = max((depth for depth, count in enumerate(depth_nodes) if count), default=-1)
+            statistics.update({
+                "validity_checks": self._checks.value,
+                "bound_prunes": self._prunes.value,
+                "solutions": self._solutions.value,
+                "depth_nodes": depth_nodes[:deepest + 1],
+                "depth_seconds": [round(seconds, 6) for seconds in depth_seconds[:deepest + 1]],
+                "running_k": [k for k in self._running[:] if k],
+            })
+        return statistics
@@ -0,0 +1,222 @@
+"""
+This module optimizes the grouping of the PCBs and the production schedule of the upcoming orders together, with the
+CP-SAT solver of OR-Tools. Instead of enumerating every combination with the minimum number of groups and checking
+each of them against the delivery dates, the delivery dates are constraints of a single model.
+
+The grouping is the GroupingModel of algorithms.sat.solver. On top of it, for order o and production day t:
+    - q_ot is the amount of the order produced on day t, only for the days up to its delivery date,
+    - w_ot marks that the order is produced on day t, z_gt that group g is set up on day t,
+    - a day holds at most TIME_PER_DAY seconds of TIME_PER_PCB per PCB and TIME_PER_SETUP_CHANGE per group set up.
+The number of groups is minimized first and the number of setup changes second.
+"""
+import sys, os.path as path
+sys.path.append(path.abspath(path.join(__file__, path.pardir, path.pardir, path.pardir)))
+
+from ortools.sat.python import cp_model
+import datetime as dt
+import math
+
+import pandas as pd
+
+from algorithms.bounds import lower_bound
+from algorithms.bruteforce.common import load_pcbs
+from algorithms.dataset import DEFAULT_DATASET_PATH, has_pcbs, pcb_name
+from algorithms.heuristics import greedy_combination
+from algorithms.sat.solver import DEFAULT_TIME_LIMIT, DEFAULT_WORKERS, GroupingModel, _ordered, _split_oversized
+from algorithms.scheduling import SETUP_CHANGE, TIME_PER_DAY, TIME_PER_PCB, TIME_PER_SETUP_CHANGE, delivery_plan
+
+
+class ScheduleReporter(cp_model.CpSolverSolutionCallback):
+    """
+    Solution callback reporting the number of groups of every improving solution and the bound on it.
+
+    :param progress: SearchProgress reported to.
+    :param n_groups: Linear expression of the number of groups in the model.
+    :param weight: Weight of a group in the objective, which adds the number of setup changes.
+    :param offset: Number of groups outside of the model, added to every reported value.
+    """
+
+    def __init__(self, progress, n_groups, weight, offset):
+        super().__init__()
+        self.progress = progress
+        self.n_groups = n_groups
+        self.weight = weight
+        self.offset = offset
+
+    def on_solution_callback(self):
+        self.progress.report(self.Value(self.n_groups) + self.offset, math.floor(self.BestObjectiveBound() / self.weight + 1e-9) + self.offset)
+
+
+def _orders(sap_plan, start_date):
+    # ( PCB, amount, last production day ) of every order with a positive amount
+    return [
+        (pcb, int(amount), (pd.Timestamp(date).to_pydatetime() - start_date).days)
+        for date, pcbs, amounts in sap_plan
+        for pcb, amount in zip(pcbs, amounts)
+        if amount > 0
+    ]
+
+
+def solve_scheduled(pcb_list, pcb_masks, material_widths, C_max, sap_plan, start_date, time_limit=DEFAULT_TIME_LIMIT,
+                    workers=DEFAULT_WORKERS, progress=None, max_groups=None):
+    '''
+    This function searches for the combination with the minimum number of groups whose orders can all be produced by
+    their delivery dates, together with the production schedule with the fewest setup changes.
+
+    :param pcb_list: List of PCB identifiers, sorted by their total slot width in descending order.
+    :param pcb_masks: Dictionary with PCB identifiers as keys and their material bitmasks as values.
+    :param material_widths: List of slot widths indexed by the bit position of the material.
+    :param C_max: Maximum allowed slot width for any group.
+    :param sap_plan: List of tuples of a delivery date, the PCBs due on it and their amounts, as returned by delivery_plan.
+    :param start_date: First production day.
+    :param time_limit: Time limit of the solver in seconds.
+    :param workers: Number of parallel search workers.
+    :param progress: SearchProgress receiving the number of groups while the solver runs and its branches when it finished.
+    :param max_groups: Upper bound on the number of groups of the PCBs that fit into a group together, by default the
+                       number of groups of the greedy heuristic.
+    :return: Tuple of the combination, a dictionary with the amount of every order ( by its position in the plan ) and
+             group ( by its position in the combination ) produced on every day, and the CP-SAT status. The
+             combination is None if no schedule was found.
+    '''
+    regular, oversized = _split_oversized(pcb_list, pcb_masks, material_widths, C_max)
+    orders = _orders(sap_plan, start_date)
+    n_days = max((deadline for _, _, deadline in orders), default=-1) + 1
+
+    heuristic = greedy_combination(regular, pcb_masks, material_widths, C_max) if regular else []
+    lower = lower_bound(regular, pcb_masks, material_widths, C_max) if regular else 0
+    max_groups = max_groups or len(heuristic)
+
+    # the regular PCBs are grouped by the model, every oversized PCB is a group of its own after them
+    model_groups = max(max_groups, 1)
+    grouping = GroupingModel(regular, pcb_masks, material_widths, C_max, model_groups) if regular else None
+    model = grouping.model if regular else cp_model.CpModel()
+    if regular:
+        model.Add(grouping.n_groups() >= lower)
+        grouping.hint(heuristic)
+    position = {pcb: p for p, pcb in enumerate(regular)}
+    groups = range(model_groups + len(oversized))
+
+    q_ot, w_ot = {}, {}
+    for o, (pcb, amount, deadline) in enumerate(orders):
+        for t in range(deadline + 1):
+            q_ot[o, t] = model.NewIntVar(0, amount, f'q_{o}_{t}')
+            w_ot[o, t] = model.NewBoolVar(f'w_{o}_{t}')
+            model.Add(q_ot[o, t] <= amount * w_ot[o, t])
+        # Constraint 6: Every order is produced completely by its delivery date
+        model.Add(sum(q_ot[o, t] for t in range(deadline + 1)) == amount)
+    z_gt = {(g, t): model.NewBoolVar(f'z_{g}_{t}') for g in groups for t in range(n_days)}
+
+    # Constraint 7: A group is set up on every day one of its orders is produced
+    for (o, t), w in w_ot.items():
+        pcb = orders[o][0]
+        if pcb in position:
+            for g, x in grouping.group_vars(position[pcb]).items():
+                model.AddBoolOr([w.Not(), x.Not(), z_gt[g, t]])
+        else:
+            model.AddImplication(w, z_gt[model_groups + oversized.index(pcb), t])
+
+    # Constraint 8: Production time and setup changes of a day
+    for t in range(n_days):
+        model.Add(sum(TIME_PER_PCB * q for (o, day), q in q_ot.items() if day == t) +
+                  sum(TIME_PER_SETUP_CHANGE * z_gt[g, t] for g in groups) <= TIME_PER_DAY)
+
+    n_groups = grouping.n_groups() if regular else 0
+    weight = len(z_gt) + 1                                              # one group more outweighs all setup changes
+    model.Minimize(weight * n_groups + sum(z_gt.values()))
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_workers = workers
+    status = solver.Solve(model, None if progress is None or not regular else ScheduleReporter(progress, n_groups, weight, len(oversized)))
+    if progress is not None:
+        progress.add_nodes(solver.NumBranches())
+
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None, {}, status
+
+    combination = (grouping.combination(solver) if regular else []) + [[pcb] for pcb in oversized]
+    group_of = {pcb: g for g, group in enumerate(combination) for pcb in group}
+    schedule = {t: [(o, group_of[orders[o][0]], solver.Value(q)) for (o, day), q in q_ot.items() if day == t and solver.Value(q) > 0]
+                for t in range(n_days)}
+    return combination, schedule, status
+
+
+def format_schedule(schedule, sap_plan, start_date):
+    '''
+    This function writes a schedule in the format of the production plans of algorithms.scheduling.production_plan:
+    on every production day, the groups in the order of the delivery dates of their orders, separated by setup changes.
+
+    :param schedule: Dictionary with the production days as keys and lists of tuples of the order, its group and the
+                     amount produced as values, as returned by solve_scheduled.
+    :param sap_plan: List of tuples of a delivery date, the PCBs due on it and their amounts, as returned by delivery_plan.
+    :param start_date: First production day.
+    :return: List with the date and the order of the PCBs and setup changes of every production day.
+    '''
+    orders = _orders(sap_plan, start_date)
+    ordering = []
+    for t, produced in sorted(schedule.items()):
+        if not produced:
+            continue
+        day_groups: dict[int, dict[str, int]] = {}
+        for o, group, amount in sorted(produced, key=lambda entry: (orders[entry[0]][2], entry[0])):
+            pcb_dict = day_groups.setdefault(group, dict())
+            pcb_dict[orders[o][0]] = pcb_dict.get(orders[o][0], 0) + amount
+        order = []
+        for pcbs in day_groups.values():
+            order += ([SETUP_CHANGE] if order else []) + [*pcbs.items()]
+        ordering.append({
+            "date": (start_date + dt.timedelta(days=t)).strftime("%Y-%m-%d"),
+            "order": order
+        })
+    return ordering
+
+
+def call_list_scheduled(input_pcb_list, vbap_df, start_date, time_limit=DEFAULT_TIME_LIMIT, workers=DEFAULT_WORKERS,
+                        progress=None, dataset_path=DEFAULT_DATASET_PATH):
+    """
+    This function takes a list of PCB numbers and the SAP plan, and returns the grouping with the minimum number of
+    groups whose upcoming orders can all be produced by their delivery dates, together with its production plan.
+
+    :param input_pcb_list: List of PCB numbers, including every PCB with an upcoming order.
+    :param vbap_df: DataFrame of the VBAP table with the columns MATNR, KWMENG and EDATU.
+    :param start_date: First production day, the orders of the following seven days are planned.
+    :param time_limit: Time limit of the solver in seconds.
+    :param workers: Number of parallel search workers.
+    :param progress: SearchProgress the solver reports to while it runs.
+    :param dataset_path: Directory containing Material_catalogue.csv and the PCB###.csv files.
+    :return: json dictionary with the groups, the production plan, the proven lower bound on the number of groups and
+             whether the grouping is proven to be the best one meeting the delivery dates, marked as scheduled, or an
+             error if no grouping meets the delivery dates.
+    """
+    if isinstance(input_pcb_list, int):
+        input_pcb_list = [input_pcb_list]
+    assert len(input_pcb_list) > 0, "Error: empty input list."
+    assert has_pcbs(input_pcb_list, dataset_path), "Error: PCB numbers must be PCBs of the dataset."
+
+    sap_plan = delivery_plan(vbap_df, start_date)
+    pcbs = {pcb_name(pcb_number) for pcb_number in input_pcb_list}
+    missing = sorted({pcb for _, ordered, _ in sap_plan for pcb in ordered}.difference(pcbs))
+    assert not missing, f"Error: the upcoming orders contain PCBs that are not in the list: {missing}."
+
+    C_max = 15  # maximum slot size
+    pcb_list, pcb_data_dict, pcb_masks, material_widths = load_pcbs(input_pcb_list, dataset_path)
+    combination, schedule, status = solve_scheduled(pcb_list, pcb_masks, material_widths, C_max, sap_plan, start_date,
+                                                    time_limit, workers, progress)
+    if status == cp_model.INFEASIBLE:                                   # more groups might need fewer setup changes on a day
+        combination, schedule, status = solve_scheduled(pcb_list, pcb_masks, material_widths, C_max, sap_plan, start_date,
+                                                        time_limit, workers, progress, max_groups=len(pcb_list))
+    if combination is None:
+        return {"Error": "No grouping meets the delivery dates of the upcoming orders." if status == cp_model.INFEASIBLE
+                else "No grouping meeting the delivery dates was found within the time limit."}
+
+    ordered = _ordered(combination, [], pcb_list)
+    renumbered = {g: ordered.index(group) for g, group in enumerate(combination)}
+    schedule = {t: [(o, renumbered[g], amount) for o, g, amount in produced] for t, produced in schedule.items()}
+    lower = lower_bound(pcb_list, pcb_masks, material_widths, C_max)
+    return {
+        "groups": [{"group_id": group_id, "PCBs": group} for group_id, group in enumerate(ordered, start=1)],
+        "production_plan": format_schedule(schedule, sap_plan, start_date),
+        "lower_bound": len(ordered) if status == cp_model.OPTIMAL else lower,
+        "optimal": status == cp_model.OPTIMAL,
+        "scheduled": True,      # optimal only under the delivery dates, it may need more groups than the plain grouping
+    }
@@ -1,92 +1,353 @@
+"""
+This module optimizes the grouping of Printed Circuit Boards (PCBs) with the CP-SAT solver of OR-Tools.
+PCB p is assigned to group g by the boolean x_pg, material m is loaded for group g by x_mg and y_g marks the used groups.
+
+The model is kept compact:
+    - a material is only modelled if one of the PCBs requires it, and x_pg only implies x_mg for the materials of p,
+    - the number of groups is bounded by the result of the greedy heuristic, which is also the solution hint,
+    - PCBs wider than C_max on their own can only be produced alone and are not part of the model,
+    - groups are numbered in the order of their first PCB, so every partition has exactly one assignment.
+"""
+import sys, os.path as path
+sys.path.append(path.abspath(path.join(__file__, path.pardir, path.pardir, path.pardir)))
+
 from ortools.sat.python import cp_model
-import pandas as pd
+import math
 import os
+import time
 import psutil
-import sys
-
-
-number_of_data = int(sys.argv[1])
-g_init = 14             #maximum number of groups
-C_max = 15              #maximum slot width
-
-
-## Creating the model
-model = cp_model.CpModel()
-
-X_mp = {}
-# Slot width of materials: Format-Material index m: slot width s_m
-s_m = {}
-# If material m in group g: Format-Material index m: group g (Binary)
-x_mg = {}
-# If PCB p contains material m: Format-PCBx Material index m(Binary)
-x_pg = {}
-# If g-th group is used(Binary)
-y_g = {}
-
-## Reading PCBs data
-pcb_data = []
-pcb_files = [f"50_entry_dataset/PCB{i:03d}.csv" for i in range(1, number_of_data+1)]
-for pcb_number, each_file in enumerate(pcb_files):
-    pcb = pd.read_csv(each_file)
-    pcb['PCB_Index'] = f'PCB{pcb_number+1:03d}'
-    pcb_data.append(pcb)
-material_catalogue = pd.read_csv(f"50_entry_dataset/Material_catalogue.csv")
-## Preparing variables
-#s_m
-s_m = dict(zip(material_catalogue['Material Index'], material_catalogue['Slot Width']))
-#x_mp
-for pcb in pcb_data:
-    for materials in s_m.keys():
-        X_mp[pcb["PCB_Index"][0], materials] = materials in pcb["Material Index"].values
-#x_pg
-for pcb in pcb_data:
-    pcb_name = pcb["PCB_Index"][0]
-    for group in range(1, g_init+1):
-        x_pg[pcb_name, group] = model.NewBoolVar( f'x_{pcb_name}_{group}')
-#x_mg
-for group in range(1, g_init+1):
-    for materials in s_m.keys():
-        x_mg[materials, group] = model.NewBoolVar(f'x_{materials}_{group}')
-#y_g
-for group in range(1, g_init+1):
-    y_g[group] = model.NewBoolVar( f'y_{group}')
-
-# Adding Constraints
-# Constraint 1: Each PCB to exactly 1 setup group
-for pcb in pcb_data:
-    pcb_name = pcb["PCB_Index"][0]
-    model.Add(sum(x_pg[pcb_name, group] for group in range(1, g_init + 1)) == 1)
-pcb_index = []
-for pcb in pcb_data:
-    name = pcb["PCB_Index"][0]
-    pcb_index.append(name)
-# Constraint 2: Activation condition
-for group in range(1, g_init+1):
-    for pcb in pcb_index:
-        model.Add(x_pg[pcb, group] <= y_g[group])
-# Constraint 3: Capacity condition
-for group in range(1, g_init+1):
-    model.Add(sum(s_m[materials] * x_mg[materials, group] for materials in s_m.keys()) <= C_max)
-# Constraint 4: Combination condition
-for pcb in pcb_index:
-    for group in range(1, g_init+1):
-        for materials in s_m.keys():
-            model.Add(x_pg[pcb, group] + int(X_mp[pcb, materials]) - x_mg[materials, group] <= 1)
-
-## Solving the model
-model.Minimize(sum(y_g[g]*10*g for g in range(1, g_init+1)))
-solver = cp_model.CpSolver()
-status = solver.Solve(model)
-
-## Reporting the results
-print(f"Solve status: {solver.StatusName(status)}")
-print(f"Optimal objective value: {solver.ObjectiveValue()}")
-print("Statistics")
-print(f"  - conflicts : {solver.NumConflicts()}")
-print(f"  - branches  : {solver.NumBranches()}")
-print(f"  - wall time : {solver.WallTime()}s")
-process = psutil.Process(os.getpid())
-memory_usage = process.memory_info().rss
-print(f"Memory usage: {memory_usage / (1024 * 1024)} MB")
-for g in range(1, g_init+1):
-    print("Group " + str(g) + " is used: " + str(solver.Value(y_g[g])))
\ No newline at end of file
+
+from algorithms.bounds import lower_bound
+from algorithms.bruteforce.common import load_pcbs, mask_width
+from algorithms.bruteforce.serial import MAX_COMBINATIONS_IN_MEMORY, CombinationWriter, create_json_data
+from algorithms.dataset import DEFAULT_DATASET_PATH, has_pcbs
+from algorithms.heuristics import greedy_combination
+
+DEFAULT_TIME_LIMIT = 60.0   # seconds
+DEFAULT_WORKERS = 8         # parallel search workers of CP-SAT
+
+
+class GroupingModel:
+    """
+    CP-SAT model assigning a list of PCBs to at most max_groups groups.
+
+    :param pcb_list: List of PCB identifiers, none of them wider than C_max.
+    :param pcb_masks: Dictionary with PCB identifiers as keys and their material bitmasks as values.
+    :param material_widths: List of slot widths indexed by the bit position of the material.
+    :param C_max: Maximum allowed slot width for any group.
+    :param max_groups: Upper bound on the number of groups.
+    """
+
+    def __init__(self, pcb_list, pcb_masks, material_widths, C_max, max_groups):
+        self.pcb_list = list(pcb_list)
+        self.model = cp_model.CpModel()
+        groups = range(max_groups)
+
+        # If PCB p is in group g: Format-PCB index p, group g (Binary), groups are numbered in the order of their first PCB
+        self.x_pg = {}
+        for p, pcb in enumerate(self.pcb_list):
+            for g in range(min(p + 1, max_groups)):
+                self.x_pg[p, g] = self.model.NewBoolVar(f'x_{pcb}_{g}')
+
+        # If g-th group is used (Binary)
+        self.y_g = [self.model.NewBoolVar(f'y_{g}') for g in groups]
+
+        # If material m in group g: Format-bit position m, group g (Binary), only for materials required by any PCB
+        used_materials = 0
+        for pcb in self.pcb_list:
+            used_materials |= pcb_masks[pcb]
+        materials = [m for m in range(used_materials.bit_length()) if (used_materials >> m) & 1]
+        x_mg = {(m, g): self.model.NewBoolVar(f'x_m{m}_{g}') for m in materials for g in groups}
+
+        # Constraint 1: Each PCB to exactly 1 setup group
+        for p in range(len(self.pcb_list)):
+            self.model.AddExactlyOne(self.group_vars(p).values())
+
+        # Constraint 2: Activation condition, a group is used if and only if it holds a PCB
+        for g in groups:
+            members = [self.x_pg[p, g] for p in range(g, len(self.pcb_list))]
+            for x in members:
+                self.model.AddImplication(x, self.y_g[g])
+            self.model.AddBoolOr(members).OnlyEnforceIf(self.y_g[g])
+
+        # Constraint 3: Capacity condition
+        for g in groups:
+            self.model.Add(sum(material_widths[m] * x_mg[m, g] for m in materials) <= C_max)
+
+        # Constraint 4: Combination condition, only for the materials the PCB requires
+        for (p, g), x in self.x_pg.items():
+            mask = pcb_masks[self.pcb_list[p]]
+            for m in materials:
+                if (mask >> m) & 1:
+                    self.model.AddImplication(x, x_mg[m, g])
+
+        # Constraint 4b: A material is only loaded for a group if one of its PCBs requires it, so every partition has exactly one solution
+        for (m, g), loaded in x_mg.items():
+            users = [x for (p, group), x in self.x_pg.items() if group == g and (pcb_masks[self.pcb_list[p]] >> m) & 1]
+            self.model.AddBoolOr(users + [loaded.Not()])
+
+        # Constraint 5: Symmetry breaking, PCB p only opens group g if an earlier PCB is in group g - 1
+        for (p, g), x in self.x_pg.items():
+            if g > 0:
+                self.model.AddBoolOr([self.x_pg[q, g - 1] for q in range(g - 1, p)] + [x.Not()])
+        for g in range(1, max_groups):
+            self.model.AddImplication(self.y_g[g], self.y_g[g - 1])
+
+    def group_vars(self, p):
+        """ Assignment variables of the PCB at position p, by group. """
+        return {g: x for (q, g), x in self.x_pg.items() if q == p}
+
+    def hint(self, combination):
+        """ Uses a combination as the starting solution of the search, its groups have to be in the order of their first PCB. """
+        group_of = {pcb: g for g, group in enumerate(combination) for pcb in group}
+        for (p, g), x in self.x_pg.items():
+            self.model.AddHint(x, group_of[self.pcb_list[p]] == g)
+        for g, y in enumerate(self.y_g):
+            self.model.AddHint(y, g < len(combination))
+
+    def n_groups(self):
+        """ Linear expression of the number of used groups. """
+        return sum(self.y_g)
+
+    def combination(self, solver):
+        """ Combination of the current solution of a solver ( or solution callback ) as a list of groups. """
+        groups = {}
+        for (p, g), x in self.x_pg.items():
+            if solver.Value(x):
+                groups.setdefault(g, []).append(self.pcb_list[p])
+        return [groups[g] for g in sorted(groups)]
+
+
+class CombinationStreamer(cp_model.CpSolverSolutionCallback):
+    """
+    Solution callback passing the combination of every solution found to a sink, so the solutions never have to be
+    held in memory.
+
+    :param grouping: GroupingModel that is solved.
+    :param sink: Function called with every combination as a list of groups.
+    :param max_combinations: The search is stopped after this many combinations, if given.
+    """
+
+    def __init__(self, grouping, sink, max_combinations=None):
+        super().__init__()
+        self.grouping = grouping
+        self.sink = sink
+        self.max_combinations = max_combinations
+        self.n_combinations = 0
+
+    def on_solution_callback(self):
+        self.n_combinations += 1
+        self.sink(self.grouping.combination(self))
+        if self.n_combinations == self.max_combinations:
+            self.StopSearch()
+
+
+class ProgressReporter(cp_model.CpSolverSolutionCallback):
+    """
+    Solution callback reporting the number of groups of every improving solution and the current objective bound.
+
+    :param progress: SearchProgress reported to.
+    :param offset: Number of groups outside of the model, added to every reported value.
+    """
+
+    def __init__(self, progress, offset):
+        super().__init__()
+        self.progress = progress
+        self.offset = offset
+
+    def on_solution_callback(self):
+        self.progress.report(round(self.ObjectiveValue()) + self.offset, math.ceil(self.BestObjectiveBound() - 1e-6) + self.offset)
+
+
+def _split_oversized(pcb_list, pcb_masks, material_widths, C_max):
+    oversized = [pcb for pcb in pcb_list if mask_width(pcb_masks[pcb], material_widths) > C_max]     # a group consisting of only one PCB is always valid
+    regular = [pcb for pcb in pcb_list if mask_width(pcb_masks[pcb], material_widths) <= C_max]
+    return regular, oversized
+
+
+def _ordered(combination, oversized, pcb_list):
+    # groups in the order of their first PCB in pcb_list, as generated by the brute force engines
+    position = {pcb: i for i, pcb in enumerate(pcb_list)}
+    return sorted(combination + [[pcb] for pcb in oversized], key=lambda group: position[group[0]])
+
+
+def solve(pcb_list, pcb_masks, material_widths, C_max, time_limit=DEFAULT_TIME_LIMIT, workers=DEFAULT_WORKERS, progress=None):
+    '''
+    This function searches for a combination with the minimum number of groups with CP-SAT.
+
+    :param pcb_list: List of PCB identifiers, sorted by their total slot width in descending order.
+    :param pcb_masks: Dictionary with PCB identifiers as keys and their material bitmasks as values.
+    :param material_widths: List of slot widths indexed by the bit position of the material.
+    :param C_max: Maximum allowed slot width for any group.
+    :param time_limit: Time limit of the solver in seconds.
+    :param workers: Number of parallel search workers.
+    :param progress: SearchProgress receiving the bounds while the solver runs and its branches when it finished.
+    :return: Tuple of the best combination found and the proven lower bound on the number of groups. The combination
+             is optimal if it has no more groups than the lower bound.
+    '''
+    regular, oversized = _split_oversized(pcb_list, pcb_masks, material_widths, C_max)
+    if not regular:
+        return _ordered([], oversized, pcb_list), len(oversized)
+
+    heuristic = greedy_combination(regular, pcb_masks, material_widths, C_max)
+    lower = lower_bound(regular, pcb_masks, material_widths, C_max)
+    if progress is not None:
+        progress.report(len(heuristic) + len(oversized), lower + len(oversized))
+    if len(heuristic) <= lower:                                         # the heuristic already matches the lower bound
+        return _ordered(heuristic, oversized, pcb_list), lower + len(oversized)
+
+    grouping = GroupingModel(regular, pcb_masks, material_widths, C_max, len(heuristic))
+    grouping.model.Add(grouping.n_groups() >= lower)
+    grouping.hint(heuristic)
+    grouping.model.Minimize(grouping.n_groups())
+
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = time_limit
+    solver.parameters.num_workers = workers
+    status = solver.Solve(grouping.model, None if progress is None else ProgressReporter(progress, len(oversized)))
+    if progress is not None:
+        progress.add_nodes(solver.NumBranches())
+
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):             # no solution within the time limit, the heuristic is still valid
+        return _ordered(heuristic, oversized, pcb_list), lower + len(oversized)
+    lower = max(lower, math.ceil(solver.BestObjectiveBound() - 1e-6))
+    if progress is not None:
+        progress.report(lower_bound=lower + len(oversized))
+    return _ordered(grouping.combination(solver), oversized, pcb_list), lower + len(oversized)
+
+
+def enumerate_optimal(pcb_list, pcb_masks, material_widths, C_max, sink, time_limit=DEFAULT_TIME_LIMIT, workers=DEFAULT_WORKERS,
+                      progress=None, max_combinations=None):
+    '''
+    This function passes every combination with the minimum number of groups to a sink, each exactly once.
+    The minimum is found first, then the model is solved again with the number of groups fixed to it and every
+    solution is streamed from a solution callback. CP-SAT enumerates solutions with a single worker only.
+
+    :param pcb_list: List of PCB identifiers, sorted by their total slot width in descending order.
+    :param pcb_masks: Dictionary with PCB identifiers as keys and their material bitmasks as values.
+    :param material_widths: List of slot widths indexed by the bit position of the material.
+    :param C_max: Maximum allowed slot width for any group.
+    :param sink: Function called with every optimal combination as a list of groups.
+    :param time_limit: Time limit in seconds for the optimization and the enumeration together.
+    :param workers: Number of parallel search workers used to find the minimum.
+    :param progress: SearchProgress receiving the number of groups while the minimum is searched and the branches of both solves.
+    :param max_combinations: The enumeration stops after this many combinations, if given.
+    :return: Tuple of the number of combinations passed to the sink, the proven lower bound on the number of groups
+             and True if all of them were enumerated ( the minimum was proven and the enumeration finished ).
+    '''
+    deadline = time.monotonic() + time_limit
+    best, lower = solve(pcb_list, pcb_masks, material_widths, C_max, time_limit, workers, progress)
+    optimal = len(best) <= lower
+    regular, oversized = _split_oversized(pcb_list, pcb_masks, material_widths, C_max)
+    if not regular:                                                     # every PCB is a group of its own
+        sink(best)
+        return 1, lower, optimal
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:                                                  # no time is left to enumerate, the best combination is still valid
+        sink(best)
+        return 1, lower, False
+
+    grouping = GroupingModel(regular, pcb_masks, material_widths, C_max, len(best) - len(oversized))
+    grouping.model.Add(grouping.n_groups() == len(best) - len(oversized))
+
+    streamer = CombinationStreamer(grouping, lambda combination: sink(_ordered(combination, oversized, pcb_list)), max_combinations)
+    solver = cp_model.CpSolver()
+    solver.parameters.max_time_in_seconds = remaining
+    solver.parameters.enumerate_all_solutions = True
+    solver.parameters.num_workers = 1
+    status = solver.Solve(grouping.model, streamer)
+    if progress is not None:
+        progress.add_nodes(solver.NumBranches())
+    if streamer.n_combinations == 0:                                    # stopped before the first solution
+        sink(best)
+        return 1, lower, False
+
+    return streamer.n_combinations, lower, optimal and status == cp_model.OPTIMAL
+
+
+def call_list_sat(input_pcb_list, time_limit=DEFAULT_TIME_LIMIT, workers=DEFAULT_WORKERS, progress=None, dataset_path=DEFAULT_DATASET_PATH):
+    """
+    This function takes a list of PCB numbers and returns the optimal grouping for the list of PCBs.
+    It uses the CP-SAT solver, which scales to all 50 PCBs of the dataset.
+
+    :param input_pcb_list: List of PCB numbers.
+    :param time_limit: Time limit of the solver in seconds.
+    :param workers: Number of parallel search workers.
+    :param progress: SearchProgress the solver reports to while it runs.
+    :param dataset_path: Directory containing Material_catalogue.csv and the PCB###.csv files.
+    :return: json dictionary with the groups, the proven lower bound on the number of groups and whether the number of
+             groups is proven to be minimal.
+    """
+    if isinstance(input_pcb_list, int):
+        input_pcb_list = [input_pcb_list]
+    assert len(input_pcb_list) > 0, "Error: empty input list."
+    assert has_pcbs(input_pcb_list, dataset_path), "Error: PCB numbers must be PCBs of the dataset."
+
+    C_max = 15  # maximum slot size
+    pcb_list, pcb_data_dict, pcb_masks, material_widths = load_pcbs(input_pcb_list, dataset_path)   # PCBs sorted by their total slot width and their materials as bitmasks over the Material_catalogue index
+    combination, lower = solve(pcb_list, pcb_masks, material_widths, C_max, time_limit, workers, progress)
+
+    return {
+        "groups": [{"group_id": group_id, "PCBs": group} for group_id, group in enumerate(combination, start=1)],
+        "lower_bound": lower,
+        "optimal": len(combination) <= lower
+    }
+
+
+def call_list_sat_all(input_pcb_list, output_path=None, time_limit=DEFAULT_TIME_LIMIT, workers=DEFAULT_WORKERS, progress=None,
+                      dataset_path=DEFAULT_DATASET_PATH):
+    """
+    This function takes a list of PCB numbers and returns all optimal groupings for the list of PCBs, in the format
+    of the serial brute force optimizer.
+
+    :param input_pcb_list: List of PCB numbers.
+    :param output_path: If given, the combinations are streamed to this NDJSON file as by call_list of the serial
+                        optimizer, and only the first of them is returned. Otherwise at most MAX_COMBINATIONS_IN_MEMORY
+                        combinations are returned.
+    :param time_limit: Time limit in seconds for the optimization and the enumeration together.
+    :param workers: Number of parallel search workers used to find the minimum.
+    :param progress: SearchProgress the solver reports to while it runs.
+    :param dataset_path: Directory containing Material_catalogue.csv and the PCB###.csv files.
+    :return: json dictionary with the combinations, the proven lower bound on the number of groups, whether the
+             combinations are proven optimal and whether all optimal combinations were enumerated.
+    """
+    if isinstance(input_pcb_list, int):
+        input_pcb_list = [input_pcb_list]
+    assert len(input_pcb_list) > 0, "Error: empty input list."
+    assert has_pcbs(input_pcb_list, dataset_path), "Error: PCB numbers must be PCBs of the dataset."
+
+    C_max = 15  # maximum slot size
+    pcb_list, pcb_data_dict, pcb_masks, material_widths = load_pcbs(input_pcb_list, dataset_path)
+
+    if output_path is None:
+        combinations = []
+        n_combinations, lower, complete = enumerate_optimal(pcb_list, pcb_masks, material_widths, C_max, combinations.append, time_limit,
+                                                            workers, progress, MAX_COMBINATIONS_IN_MEMORY + 1)
+        complete = complete and n_combinations <= MAX_COMBINATIONS_IN_MEMORY
+        json_data = create_json_data(combinations[:MAX_COMBINATIONS_IN_MEMORY], pcb_data_dict)
+    else:
+        with open(output_path, "w") as file:
+            writer = CombinationWriter(file, pcb_data_dict)
+            n_combinations, lower, complete = enumerate_optimal(pcb_list, pcb_masks, material_widths, C_max, writer.write, time_limit,
+                                                                workers, progress)
+            writer.flush()
+        json_data = create_json_data([writer.first_combination], pcb_data_dict)
+        json_data["n_combinations"] = n_combinations
+        json_data["combinations_file"] = output_path
+
+    json_data.update({"lower_bound": lower, "optimal": len(next(iter(json_data["combinations"][0].values()))) <= lower, "complete": complete})
+    return json_data
+
+
+if __name__ == "__main__":
+    number_of_data = int(sys.argv[1])
+    json_data = call_list_sat(list(range(1, number_of_data + 1)))
+
+    ## Reporting the results
+    print(f"Optimal: {json_data['optimal']}")
+    print(f"Number of groups: {len(json_data['groups'])}")
+    for group in json_data["groups"]:
+        print(f"Group {group['group_id']}: {group['PCBs']}")
+    process = psutil.Process(os.getpid())
+    memory_usage = process.memory_info().rss
+    print(f"Memory usage: {memory_usage / (1024 * 1024)} MB")
@@ -0,0 +1,162 @@
+"""
+This module schedules the production of the upcoming orders of the SAP plan ( VBAP table ) for a grouping of the PCBs.
+A working day has TIME_PER_DAY seconds, producing one PCB takes TIME_PER_PCB seconds and every group produced on a
+day costs one setup change of TIME_PER_SETUP_CHANGE seconds. The orders are produced in the order of their delivery
+dates, the PCBs of one date in the order of their groups, and each order has to be produced by its delivery date.
+
+The time spent depends only on how much of each group is demanded on each delivery date, so score_combinations
+simulates the schedule for all combinations of a CombinationTable at once, over arrays of per-date, per-group demand.
+production_plan builds the plan of a single combination.
+"""
+import datetime as dt
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+from algorithms.objects import NO_GROUP, CombinationTable
+
+TIME_PER_SETUP_CHANGE = 2 * 60 * 60
+TIME_PER_PCB = 10
+TIME_PER_DAY = 8 * 60 * 60
+SETUP_CHANGE = "SETUP_CHANGE"
+
+
+def delivery_plan(vbap_df: pd.DataFrame, start_date: dt.datetime, days: int = 7) -> list[tuple]:
+    '''
+    This function takes the orders due in the days after start_date from the SAP plan.
+
+    :param vbap_df: DataFrame of the VBAP table with the columns MATNR, KWMENG and EDATU.
+    :param start_date: First production day.
+    :param days: Number of days after start_date whose orders are taken.
+    :return: List of tuples of a delivery date, the PCBs due on it and their amounts, sorted by the delivery date.
+    '''
+    upcoming_orders = vbap_df[(vbap_df["EDATU"] > start_date) & (vbap_df["EDATU"] <= start_date + dt.timedelta(days=days))]
+    upcoming_orders_sorted = upcoming_orders.sort_values(by="EDATU")
+    return [*upcoming_orders_sorted.groupby("EDATU", as_index=False)[["MATNR", "KWMENG"]].agg(list).itertuples(index=False, name=None)]
+
+
+def production_plan(mapping: dict[str, int], sap_plan: list[tuple], start_date: dt.datetime):
+    '''
+    This function plans the production of the orders day by day for one combination.
+
+    :param mapping: Dictionary of the PCBs with their group labels.
+    :param sap_plan: List of tuples of a delivery date, the PCBs due on it and their amounts, as returned by delivery_plan.
+    :param start_date: First production day.
+    :return: Tuple of the production plan, a list with the date and the order of the PCBs and setup changes of every
+             day, and whether every order is produced by its delivery date.
+    '''
+    cur_date = start_date
+    cur_deadline = start_date + dt.timedelta(days=1)
+
+    ordering = []
+    cur_group_to_pcbs: dict[int, dict[str, int]] = dict()
+    cur_working_time = 0
+
+    def push_in_ordering():
+        nonlocal cur_group_to_pcbs, cur_working_time, cur_date
+        ordering.append({
+            "date": cur_date.strftime("%Y-%m-%d"),
+            "order": reduce(lambda x, y: x + [SETUP_CHANGE] + y, ([*entry.items()] for entry in cur_group_to_pcbs.values()), [])
+        })
+        cur_group_to_pcbs = dict()
+        cur_working_time = 0
+        cur_date += dt.timedelta(days=1)
+
+    for date, pcbs, number in sap_plan:
+        cur_deadline = pd.Timestamp(date).to_pydatetime()
+
+        for pcb, amount in sorted(zip(pcbs, number), key=lambda x: mapping[x[0]]):
+            group = mapping[pcb]
+            while amount > 0:
+                if cur_date > cur_deadline:
+                    return ordering, False
+
+                possible_amount = max(0, min(amount, (TIME_PER_DAY - cur_working_time - (group not in cur_group_to_pcbs) * TIME_PER_SETUP_CHANGE) // TIME_PER_PCB))
+                if possible_amount > 0:
+                    cur_working_time += possible_amount * TIME_PER_PCB + (group not in cur_group_to_pcbs) * TIME_PER_SETUP_CHANGE
+                    pcb_dict = cur_group_to_pcbs.setdefault(group, dict())
+                    pcb_dict[pcb] = pcb_dict.get(pcb, 0) + possible_amount
+                    amount -= possible_amount
+                else:
+                    push_in_ordering()
+
+    if cur_group_to_pcbs != dict():
+        push_in_ordering()
+    return ordering, True
+
+
+def group_demand(table: CombinationTable, sap_plan: list[tuple]) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    This function sums the demanded amounts per delivery date and group for every combination of a table.
+
+    :param table: CombinationTable of the combinations.
+    :param sap_plan: List of tuples of a delivery date, the PCBs due on it and their amounts, as returned by delivery_plan.
+    :return: Tuple of an array of shape ( combinations, dates, groups ) with the demanded amounts and a boolean array
+             of the combinations that are missing a demanded PCB.
+    '''
+    n_groups = int(table.n_groups().max(initial=0))
+    demanded = sorted({pcb for _, pcbs, _ in sap_plan for pcb in pcbs})
+    # PCBs that are not in the table at all are missing from every combination
+    labels = np.full((len(table), len(demanded)), NO_GROUP, dtype=np.int64)
+    known = [i for i, pcb in enumerate(demanded) if pcb in table.position]
+    labels[:, known] = table.labels[:, [table.position[demanded[i]] for i in known]]
+    missing = (labels == NO_GROUP).any(axis=1)
+
+    # a bincount over ( combination, group ) pairs per date, with the PCBs missing from a combination in a spare group
+    labels = np.minimum(labels, n_groups) + (n_groups + 1) * np.arange(len(table))[:, None]
+    column = {pcb: i for i, pcb in enumerate(demanded)}
+    demand = np.zeros((len(table), len(sap_plan), n_groups), dtype=np.int64)
+    for d, (_, pcbs, number) in enumerate(sap_plan):
+        amounts = np.zeros(len(demanded))
+        np.add.at(amounts, [column[pcb] for pcb in pcbs], number)
+        counts = np.bincount(labels.ravel(), weights=np.broadcast_to(amounts, labels.shape).ravel(), minlength=(n_groups + 1) * len(table))
+        demand[:, d, :] = counts.reshape(len(table), n_groups + 1)[:, :n_groups].round().astype(np.int64)
+    return demand, missing
+
+
+def score_combinations(table: CombinationTable, sap_plan: list[tuple], start_date: dt.datetime) -> tuple[np.ndarray, np.ndarray]:
+    '''
+    This function simulates the schedule of production_plan for all combinations of a table at once.
+
+    :param table: CombinationTable of the combinations.
+    :param sap_plan: List of tuples of a delivery date, the PCBs due on it and their amounts, as returned by delivery_plan.
+    :param start_date: First production day.
+    :return: Tuple of a boolean array of the combinations that meet every delivery date and an array of their slack,
+             the production time in seconds left until the last delivery date ( 0 for the other combinations ).
+    '''
+    demand, missing = group_demand(table, sap_plan)
+    n_combinations, _, n_groups = demand.shape
+    deadlines = [(pd.Timestamp(date).to_pydatetime() - start_date).days for date, _, _ in sap_plan]
+
+    feasible = ~missing
+    day = np.zeros(n_combinations, dtype=np.int64)                  # current production day after start_date
+    working_time = np.zeros(n_combinations, dtype=np.int64)         # seconds used on the current day
+    set_up = np.zeros((n_combinations, n_groups), dtype=bool)       # groups already set up on the current day
+
+    for d, deadline in enumerate(deadlines):
+        for group in range(n_groups):                               # the PCBs of a date are produced in the order of their groups
+            remaining = demand[:, d, group].copy()
+            while True:
+                active = feasible & (remaining > 0)
+                late = active & (day > deadline)
+                feasible &= ~late
+                active &= ~late
+                if not active.any():
+                    break
+
+                setup = np.where(set_up[:, group], 0, TIME_PER_SETUP_CHANGE)
+                possible = np.clip(np.minimum(remaining, (TIME_PER_DAY - working_time - setup) // TIME_PER_PCB), 0, None)
+                produce = active & (possible > 0)
+                working_time[produce] += possible[produce] * TIME_PER_PCB + setup[produce]
+                remaining[produce] -= possible[produce]
+                set_up[produce, group] = True
+
+                next_day = active & (possible == 0)                 # the day is full
+                day[next_day] += 1
+                working_time[next_day] = 0
+                set_up[next_day] = False
+
+    last_deadline = deadlines[-1] if deadlines else 0
+    slack = (last_deadline - day) * TIME_PER_DAY + (TIME_PER_DAY - working_time)
+    return feasible, np.where(feasible, slack, 0)
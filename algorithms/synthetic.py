@@ -0,0 +1,116 @@
+"""
+This module generates synthetic datasets in the layout of the 50_entry_dataset, so that the engines can be measured on
+instances beyond 50 PCBs and a larger material catalogue. A dataset directory holds Material_catalogue.csv and one
+PCB###.csv file per PCB, all with the columns Material Index, Slot Width and Material Type.
+
+The material sharing is controlled by the popularity of the materials: the PCBs draw their materials with probabilities
+following a Zipf law with exponent sharing over the catalogue. With sharing 0 every material is equally likely and PCBs
+rarely share materials, larger values make a few common materials appear on most PCBs.
+
+    python -m algorithms.synthetic ./synthetic_1000 --pcbs 1000 --materials 500 --sharing 1.2
+"""
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+from algorithms.dataset import MATERIAL_CATALOGUE_FILE, pcb_name
+
+MATERIAL_TYPES = ["Capacitor", "Conductor", "Diode", "IC", "Inductor", "LED", "Resistor", "Transistor"]
+DEFAULT_WIDTH_WEIGHTS = {1: 18, 2: 11, 3: 21}       # slot widths of the materials of the 50_entry_dataset
+COLUMNS = ["Material Index", "Slot Width", "Material Type"]
+
+
+def generate_catalogue(n_materials, width_weights=None, rng=None) -> pd.DataFrame:
+    '''
+    This function generates a material catalogue with unique material indices.
+
+    :param n_materials: Number of materials in the catalogue.
+    :param width_weights: Dictionary with slot widths as keys and their relative frequencies as values.
+    :param rng: numpy random Generator.
+    :return: DataFrame with the columns Material Index, Slot Width and Material Type.
+    '''
+    rng = rng or np.random.default_rng()
+    width_weights = width_weights or DEFAULT_WIDTH_WEIGHTS
+    widths = np.array(list(width_weights), dtype=np.int32)
+    probabilities = np.array(list(width_weights.values()), dtype=float)
+
+    numbers = rng.choice(10 ** 7, size=n_materials, replace=False)     # Material Index values look like B7F0070144
+    return pd.DataFrame({
+        "Material Index": [f"B7F{number:07d}" for number in numbers],
+        "Slot Width": rng.choice(widths, size=n_materials, p=probabilities / probabilities.sum()),
+        "Material Type": rng.choice(MATERIAL_TYPES, size=n_materials),
+    }, columns=COLUMNS)
+
+
+def generate_pcbs(catalogue, n_pcbs, sharing=1.0, materials_per_pcb=(1, 5), rng=None) -> list[pd.DataFrame]:
+    '''
+    This function generates the bills of material of the PCBs from a material catalogue.
+
+    :param catalogue: DataFrame of the material catalogue.
+    :param n_pcbs: Number of PCBs.
+    :param sharing: Exponent of the Zipf law the materials are drawn with, 0 for uniformly drawn materials.
+    :param materials_per_pcb: Tuple of the minimum and maximum number of materials of a PCB.
+    :param rng: numpy random Generator.
+    :return: List of DataFrames with the rows of the catalogue each PCB requires.
+    '''
+    rng = rng or np.random.default_rng()
+    popularity = 1.0 / np.arange(1, len(catalogue) + 1) ** sharing
+    popularity = popularity[rng.permutation(len(catalogue))]           # the popular materials are spread over the catalogue
+    popularity /= popularity.sum()
+
+    lowest, highest = materials_per_pcb
+    pcbs = []
+    for n_materials in rng.integers(lowest, highest + 1, size=n_pcbs):
+        rows = rng.choice(len(catalogue), size=min(n_materials, len(catalogue)), replace=False, p=popularity)
+        pcbs.append(catalogue.iloc[np.sort(rows)])
+    return pcbs
+
+
+def generate_dataset(dataset_path, n_pcbs, n_materials, sharing=1.0, width_weights=None, materials_per_pcb=(1, 5), seed=None) -> str:
+    '''
+    This function writes a synthetic dataset directory that can be passed as dataset_path to the optimizers.
+
+    :param dataset_path: Directory the dataset is written to. It is created if it does not exist.
+    :param n_pcbs: Number of PCBs, numbered from 1.
+    :param n_materials: Number of materials in the catalogue.
+    :param sharing: Exponent of the Zipf law the materials are drawn with, 0 for uniformly drawn materials.
+    :param width_weights: Dictionary with slot widths as keys and their relative frequencies as values.
+    :param materials_per_pcb: Tuple of the minimum and maximum number of materials of a PCB.
+    :param seed: Seed of the random generator, so a dataset can be generated again.
+    :return: The dataset path.
+    '''
+    rng = np.random.default_rng(seed)
+    catalogue = generate_catalogue(n_materials, width_weights, rng)
+    pcbs = generate_pcbs(catalogue, n_pcbs, sharing, materials_per_pcb, rng)
+
+    os.makedirs(dataset_path, exist_ok=True)
+    catalogue.to_csv(os.path.join(dataset_path, MATERIAL_CATALOGUE_FILE), index=False)
+    for pcb_number, materials in enumerate(pcbs, start=1):
+        materials.to_csv(os.path.join(dataset_path, f"{pcb_name(pcb_number)}.csv"), index=False)
+    return dataset_path
+
+
+def _width_weights(text: str) -> dict[int, float]:
+    # "1:18,2:11,3:21" -> {1: 18.0, 2: 11.0, 3: 21.0}
+    return {int(width): float(weight) for width, weight in (pair.split(":") for pair in text.split(","))}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a synthetic PCB dataset.")
+    parser.add_argument("dataset_path")
+    parser.add_argument("--pcbs", type=int, default=1000, help="number of PCBs")
+    parser.add_argument("--materials", type=int, default=500, help="number of materials in the catalogue")
+    parser.add_argument("--sharing", type=float, default=1.0, help="Zipf exponent of the material popularity, 0 for uniform")
+    parser.add_argument("--widths", type=_width_weights, default=DEFAULT_WIDTH_WEIGHTS, help="slot width weights, e.g. 1:18,2:11,3:21")
+    parser.add_argument("--materials-per-pcb", type=int, nargs=2, default=(1, 5), metavar=("MIN", "MAX"))
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--pack", action="store_true", help="also write the packed dataset file")
+    args = parser.parse_args()
+
+    generate_dataset(args.dataset_path, args.pcbs, args.materials, args.sharing, args.widths, tuple(args.materials_per_pcb), args.seed)
+    print(f"Wrote {args.pcbs} PCBs and {args.materials} materials to {args.dataset_path}")
+    if args.pack:
+        from algorithms.pack_dataset import pack_dataset    # only packing needs pyarrow
+        print(f"Packed the dataset into {pack_dataset(args.dataset_path)}")
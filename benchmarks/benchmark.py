@@ -0,0 +1,173 @@
+"""
+This script benchmarks the grouping engines on ranges of PCBs of the dataset. Every run is made in a fresh Python
+process, so that its wall time, CPU time ( including the worker processes of the engine ), peak RSS and number of
+search nodes are measured on their own. It checks that all exact engines agree on the minimum number of groups and
+writes the results as JSON, so the results of two commits can be compared.
+
+    python benchmarks/benchmark.py --ranges 1-10 1-15 --engines serial hybrid sat --output results.json
+    python benchmarks/benchmark.py --compare old.json new.json
+    python benchmarks/benchmark.py --dataset ./synthetic_1000 --ranges 1-100 1-1000 --engines hybrid sat greedy
+
+The number of search nodes is counted in steps of CHECK_INTERVAL nodes ( for SAT: the branches of the solver ).
+"""
+import sys, os.path as path
+sys.path.append(path.abspath(path.join(__file__, path.pardir, path.pardir)))
+
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import tempfile
+import time
+
+from algorithms.dataset import DEFAULT_DATASET_PATH
+from algorithms.engines import ENGINES, n_groups, parse_range
+from algorithms.progress import SearchProgress
+
+DEFAULT_RANGES = ["1-10", "1-12", "1-15", "1-20", "1-30", "1-50"]
+DEFAULT_TIMEOUT = 600     # seconds a single run may take
+
+
+def run_single(engine_name: str, pcb_range: str, dataset_path: str = DEFAULT_DATASET_PATH) -> dict:
+    '''
+    This function runs one engine on one range of PCBs in the current process and measures it.
+    '''
+    engine = ENGINES[engine_name]
+    progress = SearchProgress()
+
+    wall_start = time.perf_counter()
+    cpu_start = time.process_time()
+    json_data = engine.function(parse_range(pcb_range), progress=progress, dataset_path=dataset_path)
+    cpu = time.process_time() - cpu_start
+    wall = time.perf_counter() - wall_start
+
+    children = resource.getrusage(resource.RUSAGE_CHILDREN)         # worker processes that were started and joined by the engine
+    peak_rss_kb = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, children.ru_maxrss)
+
+    return {
+        "status": "ok",
+        "wall_s": round(wall, 4),
+        "cpu_s": round(cpu + children.ru_utime + children.ru_stime, 4),
+        "peak_rss_mb": round(peak_rss_kb / 1024, 1),
+        "nodes": progress.nodes,
+        "n_groups": n_groups(json_data),
+        "n_combinations": json_data.get("n_combinations", len(json_data.get("combinations", [None]))),
+        "optimal": json_data.get("optimal", True),
+    }
+
+
+def run_isolated(engine_name: str, pcb_range: str, timeout: float, dataset_path: str = DEFAULT_DATASET_PATH) -> dict:
+    '''
+    This function runs one engine on one range of PCBs in a fresh Python process, so the measurements of different
+    runs do not influence each other.
+    '''
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as file:
+        result_path = file.name
+    try:
+        subprocess.run(
+            [sys.executable, __file__, "--dataset", dataset_path, "--single", engine_name, pcb_range, result_path],
+            stdout=subprocess.DEVNULL,                                  # the engines print their progress
+            timeout=timeout,
+            check=True,
+        )
+        with open(result_path) as file:
+            return json.load(file)
+    except subprocess.TimeoutExpired:
+        return {"status": "timeout"}
+    except subprocess.CalledProcessError as e:
+        return {"status": "error", "returncode": e.returncode}
+    finally:
+        os.remove(result_path)
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True,
+                              cwd=path.dirname(path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def run_suite(engine_names, pcb_ranges, timeout=DEFAULT_TIMEOUT, dataset_path=DEFAULT_DATASET_PATH) -> dict:
+    '''
+    This function runs every engine on every range of PCBs and checks that the exact engines agree.
+
+    :param engine_names: Names of the engines in ENGINES.
+    :param pcb_ranges: Ranges of PCB numbers such as "1-15".
+    :param timeout: Seconds a single run may take.
+    :param dataset_path: Directory containing Material_catalogue.csv and the PCB###.csv files.
+    :return: json dictionary with the environment, the results of every run and the ranges the engines disagree on.
+    '''
+    results = []
+    disagreements = []
+    for pcb_range in pcb_ranges:
+        n_pcbs = len(parse_range(pcb_range))
+        group_counts = {}
+        for engine_name in engine_names:
+            if n_pcbs > ENGINES[engine_name].max_pcbs:
+                continue
+            result = {"engine": engine_name, "range": pcb_range, "n_pcbs": n_pcbs}
+            result.update(run_isolated(engine_name, pcb_range, timeout, dataset_path))
+            results.append(result)
+            print(json.dumps(result), flush=True)
+            if result["status"] == "ok" and ENGINES[engine_name].exact and result["optimal"]:
+                group_counts[engine_name] = result["n_groups"]
+        if len(set(group_counts.values())) > 1:
+            disagreements.append({"range": pcb_range, "n_groups": group_counts})
+
+    return {
+        "commit": git_commit(),
+        "dataset": path.abspath(dataset_path),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "results": results,
+        "disagreements": disagreements,
+    }
+
+
+def compare(old: dict, new: dict) -> list[str]:
+    '''
+    This function lists the runs of two benchmark results side by side, with the ratio of their wall times.
+    '''
+    old_results = {(result["engine"], result["range"]): result for result in old["results"]}
+    lines = [f"{'engine':<10}{'range':<8}{'old wall s':>12}{'new wall s':>12}{'ratio':>8}{'old nodes':>14}{'new nodes':>14}"]
+    for result in new["results"]:
+        previous = old_results.get((result["engine"], result["range"]))
+        if previous is None or result["status"] != "ok" or previous["status"] != "ok":
+            continue
+        ratio = result["wall_s"] / previous["wall_s"] if previous["wall_s"] else float("nan")
+        lines.append(f"{result['engine']:<10}{result['range']:<8}{previous['wall_s']:>12.3f}{result['wall_s']:>12.3f}"
+                     f"{ratio:>8.2f}{previous['nodes']:>14}{result['nodes']:>14}")
+    return lines
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the PCB grouping engines.")
+    parser.add_argument("--engines", nargs="+", default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument("--ranges", nargs="+", default=DEFAULT_RANGES, help="ranges of PCB numbers, e.g. 1-15")
+    parser.add_argument("--timeout", type=float, default=DEFAULT_TIMEOUT, help="seconds a single run may take")
+    parser.add_argument("--dataset", default=DEFAULT_DATASET_PATH, help="dataset directory, e.g. generated by algorithms.synthetic")
+    parser.add_argument("--output", default="benchmark_results.json")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="compare two result files")
+    parser.add_argument("--single", nargs=3, metavar=("ENGINE", "RANGE", "RESULT"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        engine_name, pcb_range, result_path = args.single
+        result = run_single(engine_name, pcb_range, args.dataset)
+        with open(result_path, "w") as file:
+            json.dump(result, file)
+    elif args.compare:
+        with open(args.compare[0]) as old_file, open(args.compare[1]) as new_file:
+            print("\n".join(compare(json.load(old_file), json.load(new_file))))
+    else:
+        suite = run_suite(args.engines, args.ranges, args.timeout, args.dataset)
+        with open(args.output, "w") as file:
+            json.dump(suite, file, indent=2)
+        for disagreement in suite["disagreements"]:
+            print(f"Engines disagree on {disagreement['range']}: {disagreement['n_groups']}")
+        sys.exit(1 if suite["disagreements"] else 0)
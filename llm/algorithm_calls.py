@@ -6,11 +6,83 @@ from langchain.agents import tool
 from algorithms.bruteforce.serial import call_list
 from algorithms.bruteforce.parallel import call_list_parallel
 from algorithms.bruteforce.hybrid import call_list_hybrid
+from algorithms.bruteforce.incremental import call_list_incremental, changed_pcbs
+from algorithms.dp.subset import call_list_dp
+from algorithms.sat.solver import call_list_sat, call_list_sat_all
 from llm.prompt_utils import *
+from utils.jobs import get_job_manager
+from utils.result_cache import cached_call, get_result_cache
+from utils.solution_store import SessionSolutions
 
 MAX_PCBS_FOR_SERIAL = 10
+C_MAX = 15              # maximum slot size used by the optimizers
+MAX_CHANGED_PCBS_FOR_INCREMENTAL = 3
+CHAT_TIME_LIMIT = 30    # seconds the fallback optimizer may take before it answers with the best grouping found
+
+INCORRECT_PARAMETERS = "Incorrect function parameters are provided: PCBnumber: this should either be a a list of PCBs or a single int for one PCBs"
+
+solutions_memory = SessionSolutions(current_session)     # the solutions of the session a tool is called from
+
+
+def present_solutions(json_data):
+    # Stores the result of an optimizer and returns the answer for the user
+    solutions_memory['current_solutions'] = json_data
+    solutions_memory.pop('compact_solutions', None)
+    solutions_memory['result_file'] = save_output(json_data)
+    provisional = check_optimality(json_data)
+    if provisional:
+        return provisional
+    try:
+        return check_n_of_combinations(json_data)
+    except:
+        return json_data
+
+
+def run_optimizer(name, function, ListOfPCBsNumbers, mode=None, streamed=False, **kwargs):
+    # Identical requests are answered from the result cache, across sessions and restarts
+    cache = get_result_cache()
+    key = cache.key(ListOfPCBsNumbers, C_MAX, mode or function.__name__)
+    json_data = cache.get(key)
+    if json_data is not None:
+        print(F"Cached result of the {name} is used")
+        return present_solutions(json_data)
+    if streamed:        # the optimizer writes its combinations next to the cached result instead of returning all of them
+        kwargs["output_path"] = cache.combinations_path(key)
+
+    # Inside of the app the optimizer runs as a background job, whose result main.py posts in the chat when it is done
+    session = current_session()
+    if session is None:
+        try:
+            json_data = cached_call(cache, key, function, ListOfPCBsNumbers, **kwargs)
+        except:
+            return INCORRECT_PARAMETERS
+        return present_solutions(json_data)
+
+    job = get_job_manager().submit(name, session, cached_call, cache, key, function, ListOfPCBsNumbers,
+                                   instrumented=search_statistics_enabled(), **kwargs)
+    return f"The {name} was started in the background as job #{job.id}. Its progress is shown in the sidebar, " + \
+        "where it can also be cancelled, and its result will be posted in the chat when it is done."
+
+
+def incremental_previous(ListOfPCBsNumbers):
+    # The previous result, if the PCBs changed by only a few boards since, so it can be re-optimized incrementally
+    previous = solutions_memory.get('current_solutions')
+    if previous is None or "Error" in previous:
+        return None
+    try:
+        changed = changed_pcbs(previous, ListOfPCBsNumbers)
+    except (KeyError, IndexError, StopIteration):
+        return None
+    return previous if changed <= MAX_CHANGED_PCBS_FOR_INCREMENTAL else None
+
+
+def parse_pcb_numbers(ListOfPCBsNumbers):
+    ListOfPCBsNumbers = sanitize_input(ListOfPCBsNumbers)
+    numbers = ListOfPCBsNumbers if isinstance(ListOfPCBsNumbers, list) else [ListOfPCBsNumbers]
+    if not numbers or not all(isinstance(number, int) and 1 <= number <= 50 for number in numbers):
+        raise ValueError("PCB numbers must be between 1 and 50")
+    return numbers
 
-solutions_memory = {}
 
 @tool
 def CallOptimizer(ListOfPCBsNumbers):
@@ -21,22 +93,20 @@ def CallOptimizer(ListOfPCBsNumbers):
     Argument (ListOfPCBsNumbers): should be a list of PCBs. If a range of PCBs should be optimized, expand it as a list of consecutive integers (1-5 -> [1, 2, 3, 4, 5]).
     """
     try:
-        ListOfPCBsNumbers = sanitize_input(ListOfPCBsNumbers)
-        if len(ListOfPCBsNumbers) <= MAX_PCBS_FOR_SERIAL:
-            print(F"Serial optimization is used for less than {MAX_PCBS_FOR_SERIAL} PCBs")
-            json_data = call_list(ListOfPCBsNumbers)
-        else:
-            print(F"Hybrid optimization is used for more than {MAX_PCBS_FOR_SERIAL} PCBs")
-            json_data = call_list_hybrid(ListOfPCBsNumbers)
+        ListOfPCBsNumbers = parse_pcb_numbers(ListOfPCBsNumbers)
     except:
-        return "Incorrect function parameters are provided: PCBnumber: this should either be a a list of PCBs or a single int for one PCBs"
+        return INCORRECT_PARAMETERS
 
-    solutions_memory['current_solutions'] = json_data
-    save_output(json_data)
-    try:
-        return check_n_of_combinations(json_data)
-    except:
-        return json_data
+    if len(ListOfPCBsNumbers) <= MAX_PCBS_FOR_SERIAL:
+        print(F"Serial optimization is used for at most {MAX_PCBS_FOR_SERIAL} PCBs")
+        return run_optimizer("serial optimization", call_list, ListOfPCBsNumbers, streamed=True, time_limit=CHAT_TIME_LIMIT)
+    elif previous := incremental_previous(ListOfPCBsNumbers):
+        print(F"Incremental optimization is used for at most {MAX_CHANGED_PCBS_FOR_INCREMENTAL} changed PCBs")
+        return run_optimizer("incremental optimization", call_list_incremental, ListOfPCBsNumbers, mode="call_list_hybrid", previous=previous, time_limit=CHAT_TIME_LIMIT)
+    else:
+        # the SAT solver enumerates all optimal groupings, which the serial optimizer cannot do for larger lists in time
+        print(F"All optimal groupings are enumerated with SAT for more than {MAX_PCBS_FOR_SERIAL} PCBs")
+        return run_optimizer("SAT optimization", call_list_sat_all, ListOfPCBsNumbers, streamed=True, time_limit=CHAT_TIME_LIMIT)
 
 
 @tool
@@ -49,18 +119,12 @@ def CallSerialOptimizer(ListOfPCBsNumbers):
     Argument (ListOfPCBsNumbers): should be a list of PCBs
     """
     try:
-        ListOfPCBsNumbers = sanitize_input(ListOfPCBsNumbers)
-        json_data = call_list(ListOfPCBsNumbers)
+        ListOfPCBsNumbers = parse_pcb_numbers(ListOfPCBsNumbers)
     except:
-        return "Incorrect function parameters are provided: PCBnumber: this should either be a a list of PCBs or a single int for one PCBs"
+        return INCORRECT_PARAMETERS
+
+    return run_optimizer("serial optimization", call_list, ListOfPCBsNumbers, streamed=True)
 
-    solutions_memory['current_solutions'] = json_data
-    save_output(json_data)
-    try:
-        return check_n_of_combinations(json_data)
-    except:
-        return json_data
-    
 
 @tool
 def CallHybridOptimizer(ListOfPCBsNumbers):
@@ -72,18 +136,14 @@ def CallHybridOptimizer(ListOfPCBsNumbers):
     Argument (ListOfPCBsNumbers): should be a list of PCBs
     """
     try:
-        ListOfPCBsNumbers = sanitize_input(ListOfPCBsNumbers)
-        json_data = call_list_hybrid(ListOfPCBsNumbers)
+        ListOfPCBsNumbers = parse_pcb_numbers(ListOfPCBsNumbers)
     except:
-        return "Incorrect function parameters are provided: PCBnumber: this should either be a a list of PCBs or a single int for one PCBs"
-    
-    solutions_memory['current_solutions'] = json_data
-    save_output(json_data)
-    try:
-        return check_n_of_combinations(json_data)
-    except:
-        return json_data
-    
+        return INCORRECT_PARAMETERS
+
+    if previous := incremental_previous(ListOfPCBsNumbers):
+        return run_optimizer("incremental optimization", call_list_incremental, ListOfPCBsNumbers, mode="call_list_hybrid", previous=previous)
+    return run_optimizer("hybrid optimization", call_list_hybrid, ListOfPCBsNumbers)
+
 
 @tool
 def CallParallelOptimizer(ListOfPCBsNumbers):
@@ -95,14 +155,41 @@ def CallParallelOptimizer(ListOfPCBsNumbers):
     Argument (ListOfPCBsNumbers): should be a list of PCBs
     """
     try:
-        ListOfPCBsNumbers = sanitize_input(ListOfPCBsNumbers)
-        json_data = call_list_parallel(ListOfPCBsNumbers)
+        ListOfPCBsNumbers = parse_pcb_numbers(ListOfPCBsNumbers)
     except:
-        return "Incorrect function parameters are provided: PCBnumber: this should either be a a list of PCBs or a single int for one PCBs"
-    
-    solutions_memory['current_solutions'] = json_data
-    save_output(json_data)
+        return INCORRECT_PARAMETERS
+
+    return run_optimizer("parallel optimization", call_list_parallel, ListOfPCBsNumbers)
+
+
+@tool
+def CallSATOptimizer(ListOfPCBsNumbers):
+    """
+    Function to optimize the grouping of PCBs for the production line with a constraint solver (SAT).
+    It should only be called if the user asks for SAT optimization.
+    Better suited for large lists of PCBs, up to all 50 PCBs.
+
+    Argument (ListOfPCBsNumbers): should be a list of PCBs
+    """
     try:
-        return check_n_of_combinations(json_data)
+        ListOfPCBsNumbers = parse_pcb_numbers(ListOfPCBsNumbers)
     except:
-        return json_data
+        return INCORRECT_PARAMETERS
+
+    return run_optimizer("SAT optimization", call_list_sat, ListOfPCBsNumbers)
+
+
+@tool
+def CallCountingOptimizer(ListOfPCBsNumbers):
+    """
+    Function to count the optimal groupings of PCBs for the production line without generating all of them.
+    It should be called if the user asks how many optimal groupings exist. It returns one of the optimal groupings.
+
+    Argument (ListOfPCBsNumbers): should be a list of PCBs
+    """
+    try:
+        ListOfPCBsNumbers = parse_pcb_numbers(ListOfPCBsNumbers)
+    except:
+        return INCORRECT_PARAMETERS
+
+    return run_optimizer("counting of the optimal groupings", call_list_dp, ListOfPCBsNumbers, time_limit=CHAT_TIME_LIMIT)
@@ -1,25 +1,39 @@
 import sys, os.path as path
 sys.path.append(path.abspath(path.join(__file__, path.pardir, path.pardir)))
 
-from functools import reduce
 import datetime as dt
+import hashlib
+import os
 
-import pandas as pd
+import numpy as np
 from langchain.agents import tool
 
 from algorithms.objects import *
+from algorithms.sat.scheduler import call_list_scheduled
+from algorithms.scheduling import SETUP_CHANGE, delivery_plan, production_plan, score_combinations
 from llm.prompt_utils import *
-from llm.algorithm_calls import solutions_memory
+from llm.algorithm_calls import C_MAX, CHAT_TIME_LIMIT, INCORRECT_PARAMETERS, parse_pcb_numbers, present_solutions, solutions_memory
+from utils.result_cache import cached_call, get_result_cache
+from utils.result_file import ResultFile
 from llm.prompt_utils import *
 from llm.get_data_callback import parse_tool_data
 
-TIME_PER_SETUP_CHANGE = 2 * 60 * 60
-TIME_PER_PCB = 10
-TIME_PER_DAY = 8 * 60 * 60
-SETUP_CHANGE = "SETUP_CHANGE"
+current_date = dt.datetime.strptime("2024-10-03", "%Y-%m-%d")
 
 
-current_date = dt.datetime.strptime("2024-10-03", "%Y-%m-%d")
+def compact_solutions(solutions: dict) -> CompactCombinations:
+    """
+    Returns the current solutions as CompactCombinations, converting them only once per optimization run.
+    """
+    combinations = solutions_memory.get('compact_solutions')
+    if combinations is None:        # present_solutions drops it together with the solutions it was converted from
+        result_path = solutions_memory.get('result_file')
+        if result_path and os.path.isfile(result_path):     # it holds every combination, also of the streamed results
+            combinations = CompactCombinations(CombinationTable.from_entries({"groups": groups} for groups in ResultFile(result_path).combinations()))
+        else:
+            combinations = CompactCombinations.from_json(solutions)
+        solutions_memory['compact_solutions'] = combinations
+    return combinations
 
 
 @tool
@@ -29,12 +43,32 @@ def SelectOneOptimalPCB():
     Returns one optimal pcb combination
     """
     solutions = solutions_memory.get('current_solutions')
-    if not solutions or not isinstance(solutions, dict):
+    if not solutions or not isinstance(solutions, dict) or not ("groups" in solutions or solutions.get('combinations')):
         return {"error": "Run the optimization again first. If the arguments are already known, don't ask the user and just run optimization again"}
-    
+
+    # the single grouping of the hybrid, SAT and scheduled optimizers, or the first of the enumerated combinations
+    if "groups" in solutions:
+        return {"combination1": solutions['groups']}
     return solutions['combinations'][0]
 
 
+@tool
+def SelectCombination(CombinationNumber: int):
+    """
+    Selects one of the optimal solutions by its number, e.g. if the user asks to show combination 5000.
+    Returns the pcb combination with that number
+    """
+    result_path = solutions_memory.get('result_file')
+    if not result_path or not os.path.isfile(result_path):
+        return {"error": "Run the optimization again first. If the arguments are already known, don't ask the user and just run optimization again"}
+
+    # only the groups of the combination are read from the result file
+    try:
+        return {f"combination{int(CombinationNumber)}": ResultFile(result_path).combination(int(CombinationNumber))}
+    except (IndexError, ValueError) as error:
+        return {"error": str(error)}
+
+
 @tool
 def PrioritizeBasedOnSAP(callbacks):
     """
@@ -43,82 +77,75 @@ def PrioritizeBasedOnSAP(callbacks):
     Returns a list of tuples with PCBs grouped by their delivery date and a production plan for the prioritized PCBs.
     """
     vbap_df = parse_tool_data(callbacks)["vbap_data"]
-
-    upcoming_orders = vbap_df[(vbap_df["EDATU"] > current_date) & (vbap_df["EDATU"] <= current_date + dt.timedelta(days=7))]
-    upcoming_orders_sorted = upcoming_orders.sort_values(by="EDATU")
     
     solutions = solutions_memory.get('current_solutions')
     if not isinstance(solutions, dict):
         return {"error": "Run the optimization again first. If the arguments are already known, don't ask the user and just run optimization again"}
-    combinations = Combinations.from_json(solutions)
+    combinations = compact_solutions(solutions)
+
+    sap_plan = delivery_plan(vbap_df, current_date)
+
+    # all combinations are scored at once, the plan is only built for the feasible one with the most slack
+    feasible, slack = score_combinations(combinations.table, sap_plan, current_date)
+    if not feasible.any():
+        return {"error": "No combination found with enough slack to fit the upcoming orders."}
+    row = int(np.argmax(np.where(feasible, slack, -1)))
+    combination = combinations.combinations[row]
+
+    ordering, _ = production_plan(combinations.table.mapping(row), sap_plan, current_date)
+    cache_order({
+        "production_plan": ordering
+    })
+
+    return {
+        "explanation": f"There are only {len(combination.groups)} SETUP_CHANGEs, which happen in between the PCBs from different groups or different days.",
+        "combination": combination.to_json(),
+        "production_plan": ordering
+    }
 
-    sap_plan = [*upcoming_orders_sorted.groupby("EDATU", as_index=False)[["MATNR", "KWMENG"]].agg(list).itertuples(index=False, name=None)]
-    
-    for combination in combinations.combinations:
-        cur_date = current_date
-        cur_deadline = current_date + dt.timedelta(days=1)
-
-        ordering = []
-        cur_group_to_pcbs: dict[int, dict[str, int]] = dict()
-        cur_working_time = 0
-
-        def push_in_ordering():
-            nonlocal ordering, cur_group_to_pcbs, cur_working_time, cur_date
-            ordering.append({
-                "date": cur_date.strftime("%Y-%m-%d"),
-                "order": reduce(lambda x, y: x + [SETUP_CHANGE] + y, ([*entry.items()] for entry in cur_group_to_pcbs.values()), [])
-            })
-            cur_group_to_pcbs = dict()
-            cur_working_time = 0
-            cur_date += dt.timedelta(days=1)
-
-        mapping = {pcb.name: group_id for (group_id, group) in enumerate(combination.groups) for pcb in group.pcbs}
-        for date, pcbs, number in sap_plan:
-            assert isinstance(date, pd.Timestamp)
-            cur_deadline = date.to_pydatetime()
-
-            for pcb, amount in sorted(zip(pcbs, number), key=lambda x: mapping[x[0]]):
-                group = mapping[pcb]
-                while amount > 0:
-                    if cur_date > cur_deadline:
-                        break
-
-                    possible_amount = max(0, min(amount, (TIME_PER_DAY - cur_working_time - (group not in cur_group_to_pcbs) * TIME_PER_SETUP_CHANGE) // TIME_PER_PCB))
-                    if possible_amount > 0:
-                        cur_working_time += possible_amount * TIME_PER_PCB + (group not in cur_group_to_pcbs) * TIME_PER_SETUP_CHANGE
-                        pcb_dict = cur_group_to_pcbs.setdefault(group, dict())
-                        pcb_dict[pcb] = pcb_dict.get(pcb, 0) + possible_amount
-                        amount -= possible_amount
-                    else:
-                        push_in_ordering()
-                
-                if cur_date > cur_deadline:
-                    break
-            
-            if cur_date > cur_deadline:
-                break
-        
-        if cur_date <= cur_deadline:
-            if cur_group_to_pcbs != dict():
-                push_in_ordering()
-            
-            cache_order({
-                "production_plan": ordering
-            })
-
-            return {
-                "explanation": f"There are only {len(combination.groups)} SETUP_CHANGEs, which happen in between the PCBs from different groups or different days.",
-                "combination": combination.to_json(),
-                "production_plan": ordering
-            }
-    
-    return {"error": "No combination found with enough slack to fit the upcoming orders."}
+
+@tool
+def PlanProductionWithSAP(ListOfPCBsNumbers, callbacks):
+    """
+    Optimizes the grouping of PCBs together with the production plan of the upcoming orders in the SAP data, so that every order is produced by its delivery date.
+    It should be called if the user wants a grouping that meets the delivery dates in one step, instead of optimizing first and prioritizing based on SAP data afterwards.
+
+    Argument (ListOfPCBsNumbers): should be a list of PCBs, including every PCB with an upcoming order.
+    """
+    try:
+        ListOfPCBsNumbers = parse_pcb_numbers(ListOfPCBsNumbers)
+    except:
+        return INCORRECT_PARAMETERS
+    vbap_df = parse_tool_data(callbacks)["vbap_data"]
+
+    # the result depends on the upcoming orders as well, so they are part of its cache key
+    sap_plan = delivery_plan(vbap_df, current_date)
+    orders = hashlib.sha256(json.dumps([current_date, sap_plan], default=str).encode()).hexdigest()
+    cache = get_result_cache()
+    key = cache.key(ListOfPCBsNumbers, C_MAX, f"call_list_scheduled {orders}")
+    try:
+        json_data = cached_call(cache, key, call_list_scheduled, ListOfPCBsNumbers, vbap_df, current_date, time_limit=CHAT_TIME_LIMIT)
+    except AssertionError as e:
+        return {"error": str(e)}
+    if "Error" in json_data:
+        return {"error": json_data["Error"]}
+
+    answer = present_solutions(json_data)
+    cache_order({
+        "production_plan": json_data["production_plan"]
+    })
+
+    setup_changes = sum(1 + day["order"].count(SETUP_CHANGE) for day in json_data["production_plan"])
+    return {
+        "explanation": f"The grouping has {len(json_data['groups'])} groups and the plan needs {setup_changes} SETUP_CHANGEs to produce every upcoming order by its delivery date.",
+        "combination": json_data["groups"] if answer is json_data else answer,
+        "production_plan": json_data["production_plan"]
+    }
 
 
 if __name__ == "__main__":
-    path_0 = "output/0.json"
-    with open(path_0, "r") as file:
-        solutions = json.load(file)
+    path_0 = "output/0.groups"
+    solutions = ResultFile(path_0).to_json()
     
     solutions_memory = {
         "current_solutions": solutions
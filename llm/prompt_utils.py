@@ -1,7 +1,11 @@
 import os
+import re
 import json
 
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from utils.result_file import RESULT_FILE_EXTENSION, write_result_file
 
 def sanitize_input(input):
     if isinstance(input, str):
@@ -9,34 +13,58 @@ def sanitize_input(input):
     return input
 
 
-current_id = 0
-def save_output(json_output: dict):
+OUTPUT_PATH = os.path.abspath(os.path.join(
+    __file__,
+    os.path.pardir,
+    os.path.pardir,
+    "output"
+))
+
+current_id = None
+def save_output(json_output: dict) -> str:
+    # Writes the result in the compact result format of utils.result_file and returns its path
     global current_id
+    os.makedirs(OUTPUT_PATH, exist_ok=True)
+    if current_id is None:
+        # continue after the results of earlier runs of the app instead of overwriting them
+        ids = [int(os.path.splitext(name)[0]) for name in os.listdir(OUTPUT_PATH) if re.fullmatch(r"\d+\.(json|groups)", name)]
+        current_id = max(ids, default=-1) + 1
     id = current_id
     current_id += 1
-    
-    path = os.path.abspath(os.path.join(
-        __file__,
-        os.path.pardir,
-        os.path.pardir,
-        f"output/{id}.json"
-    ))
-    os.makedirs(
-        os.path.dirname(path),
-        exist_ok=True
-    )
-    with open(path, "w") as file:
-        file.write(json.dumps(json_output))
+
+    path = write_result_file(os.path.join(OUTPUT_PATH, f"{id}{RESULT_FILE_EXTENSION}"), json_output)
 
     st.session_state["last_function_run"] = path
+    return path
+
+def current_session():
+    # The session of the app a tool is called from, None if it is not called from the app
+    if get_script_run_ctx() is None:
+        return None
+    return st.session_state.get("id")
+
+def search_statistics_enabled():
+    # Whether the user switched on the search statistics of the optimizations in the sidebar
+    return get_script_run_ctx() is not None and st.session_state.get("search_statistics", False)
 
 def cache_order(order: dict):
     st.session_state["last_order"] = order
 
 def check_n_of_combinations(json_data):
-    n = len(json_data['combinations'])
+    n = json_data.get('n_combinations', len(json_data['combinations']))     # streamed results only carry their first combination
+    # an enumeration stopped at its time limit or at the in-memory cap has found only part of the combinations
+    count = f"at least {n}" if json_data.get('complete', True) is False else f"{n}"
     if n > 3:
-        return f"More than 3 optimal solutions found. The number of combinations is {n}. " + \
+        return f"More than 3 optimal solutions found. The number of combinations is {count}. " + \
             "Would you like to use SAP data to select the suitable combination? Or maybe you want to see one of the combinations?"
     else:
-        return json_data
\ No newline at end of file
+        return json_data
+
+
+def check_optimality(json_data):
+    if json_data.get("optimal", True):
+        return None
+    groups = json_data["groups"] if "groups" in json_data else next(iter(json_data["combinations"][0].values()))
+    return f"The optimization was stopped at its time limit. The best grouping found so far has {len(groups)} groups, " + \
+        f"and at least {json_data['lower_bound']} groups are needed. " + \
+        f"Would you like to keep optimizing for a proven optimal grouping? The grouping found so far is: {groups}"
@@ -28,8 +28,12 @@ tools = [
     CallSerialOptimizer,
     CallHybridOptimizer,
     CallParallelOptimizer,
+    CallSATOptimizer,
+    CallCountingOptimizer,
     SelectOneOptimalPCB,
-    PrioritizeBasedOnSAP
+    SelectCombination,
+    PrioritizeBasedOnSAP,
+    PlanProductionWithSAP
 ]
 agent = create_tool_calling_agent(model, tools, prompt)
 
@@ -1,11 +1,13 @@
 import streamlit as st
 import llm.setup as llmchat
-from llm.algorithm_calls import solutions_memory
+from llm.algorithm_calls import solutions_memory, present_solutions
 from utils.streamlit_utils import *
+from utils.jobs import get_job_manager
 from utils.csv_utils import get_default_vbap_data
 from ui.buttons import EXPORTING_FUNCTIONS, DEPLOYING_FUNCTIONS, MessageButton, DataExport, OrderDeployment
 
 import re
+import json
 import datetime as dt
 
 import pandas as pd
@@ -95,6 +97,7 @@ if __name__ == "__main__":
     # Displaying side bar
     st.sidebar.title("Options")
     st.sidebar.button("✏️ Edit SAP data", on_click=edit_sap_data)
+    st.sidebar.toggle("Search statistics", key="search_statistics", help="Count the checks, prunes and nodes per depth of the optimizations ( slightly slower )")
 
     if prompt := st.chat_input():
         human_message = llmchat.HumanMessage(prompt)
@@ -191,4 +194,58 @@ if __name__ == "__main__":
             )
             st.session_state.messages.append(message_button)
             write_message(message_button)
-            
\ No newline at end of file
+            
+
+    # Background optimization jobs of this session
+    def format_search_statistics(progress):
+        statistics = progress.statistics()
+        text = f"Nodes explored: {statistics['nodes']:,}  \n" + \
+               f"Best grouping: {statistics['best'] or '-'} groups  \n" + \
+               f"Lower bound: {statistics['lower_bound'] or '-'} groups"
+        if progress.instrumented:
+            text += f"  \nValidity checks: {statistics['validity_checks']:,}  \n" + \
+                    f"Prunes by bound: {statistics['bound_prunes']:,}  \n" + \
+                    f"Solutions: {statistics['solutions']:,}"
+            if statistics["running_k"]:
+                text += f"  \nTesting k: {', '.join(map(str, statistics['running_k']))}"
+            if statistics["depth_seconds"]:
+                slowest = max(range(len(statistics["depth_seconds"])), key=statistics["depth_seconds"].__getitem__)
+                text += f"  \nSlowest depth: {slowest} ({statistics['depth_nodes'][slowest]:,} nodes, {statistics['depth_seconds'][slowest]:.2f} s)"
+        return text
+
+    def post_job_result(job):
+        if job.status == "done":
+            answer = present_solutions(job.result)
+            if not isinstance(answer, str):
+                answer = f"```json\n{json.dumps(answer)}\n```"
+            st.session_state.messages.append(llmchat.AIMessage(f"The {job.name} of job #{job.id} is done. {answer}"))
+            if job.progress.instrumented:
+                st.session_state.messages.append(llmchat.AIMessage(f"Search statistics of job #{job.id} ({job.elapsed:.1f} s):  \n{format_search_statistics(job.progress)}"))
+            st.session_state.messages.append(MessageButton(
+                export_button=DataExport(path=st.session_state["last_function_run"])
+            ))
+            st.session_state["last_function_run"] = None
+        elif job.status == "cancelled":
+            st.session_state.messages.append(llmchat.AIMessage(f"The {job.name} of job #{job.id} was cancelled."))
+        else:
+            st.session_state.messages.append(llmchat.AIMessage(f"The {job.name} of job #{job.id} failed: {job.result}"))
+
+    def show_jobs():
+        job_manager = get_job_manager()
+        finished = False
+        for job in job_manager.jobs_of(st.session_state["id"]):
+            if not job.running:
+                post_job_result(job)
+                job_manager.forget(job.id)
+                finished = True
+                continue
+
+            st.write(f"**Job #{job.id}**: {job.name} ({job.elapsed:.0f} s)")
+            st.caption(format_search_statistics(job.progress))
+            st.button("Cancel", key=f"cancel_job_{job.id}", on_click=job.cancel)
+        if finished:
+            st.rerun()
+
+    jobs_running = any(job.running for job in get_job_manager().jobs_of(st.session_state["id"]))
+    with st.sidebar:
+        st.fragment(run_every=1 if jobs_running else None)(show_jobs)()
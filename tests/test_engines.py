@@ -0,0 +1,75 @@
+"""
+The engines agree on the optimum: every exact engine finds the minimum number of groups, the serial optimizer, the
+SAT enumerator and the dynamic programming agree on the number of optimal combinations, the lower bound never
+exceeds the optimum and the greedy heuristic never beats it. Every grouping returned is valid.
+"""
+import sys, os.path as path
+sys.path.append(path.abspath(path.join(__file__, path.pardir, path.pardir)))
+
+import pytest
+
+from algorithms.bounds import lower_bound
+from algorithms.bruteforce.common import is_valid_group, load_pcbs
+from algorithms.bruteforce.serial import call_list
+from algorithms.dataset import DEFAULT_DATASET_PATH
+from algorithms.dp.subset import call_list_dp
+from algorithms.engines import ENGINES, n_groups
+from algorithms.sat.solver import call_list_sat_all
+from utils.result_file import iter_combinations
+
+C_MAX = 15
+PCB_LISTS = [list(range(1, 13)), list(range(20, 32)), [3, 7, 12, 18, 21, 25, 30, 41, 44]]
+
+
+def assert_valid_grouping(groups, pcb_numbers):
+    pcb_list, _, pcb_masks, material_widths = load_pcbs(pcb_numbers)
+    pcbs = [pcb for group in groups for pcb in group["PCBs"]]
+    assert sorted(pcbs) == sorted(pcb_list)             # every PCB is in exactly one group
+    assert all(is_valid_group(group["PCBs"], pcb_masks, material_widths, C_MAX) for group in groups)
+
+
+def combination_set(json_data):
+    return {frozenset(frozenset(group["PCBs"]) for group in groups) for groups in iter_combinations(json_data)}
+
+
+@pytest.mark.parametrize("pcb_numbers", PCB_LISTS)
+def test_exact_engines_find_the_minimum(pcb_numbers):
+    minimum = n_groups(call_list_dp(pcb_numbers))
+    for name, engine in ENGINES.items():
+        json_data = engine.function(pcb_numbers, progress=None, dataset_path=DEFAULT_DATASET_PATH)
+        for groups in iter_combinations(json_data):
+            assert_valid_grouping(groups, pcb_numbers)
+        if engine.exact:
+            assert n_groups(json_data) == minimum, name
+        else:
+            assert n_groups(json_data) >= minimum, name
+
+
+@pytest.mark.parametrize("pcb_numbers", PCB_LISTS)
+def test_engines_count_the_same_optimal_combinations(pcb_numbers):
+    serial = call_list(pcb_numbers)
+    sat = call_list_sat_all(pcb_numbers)
+    assert sat["complete"] and sat["optimal"]
+    assert combination_set(sat) == combination_set(serial)
+    assert call_list_dp(pcb_numbers)["n_combinations"] == len(serial["combinations"]) == len(combination_set(serial))
+
+
+def test_streamed_combinations_match_the_in_memory_ones(tmp_path):
+    pcb_numbers = PCB_LISTS[0]
+    serial = call_list(pcb_numbers, output_path=str(tmp_path / "serial.ndjson"))
+    sat = call_list_sat_all(pcb_numbers, output_path=str(tmp_path / "sat.ndjson"))
+    assert serial["n_combinations"] == sat["n_combinations"]
+    assert combination_set(serial) == combination_set(sat) == combination_set(call_list(pcb_numbers))
+
+
+@pytest.mark.parametrize("pcb_numbers", PCB_LISTS)
+def test_lower_bound_does_not_exceed_the_minimum(pcb_numbers):
+    pcb_list, _, pcb_masks, material_widths = load_pcbs(pcb_numbers)
+    assert lower_bound(pcb_list, pcb_masks, material_widths, C_MAX) <= n_groups(call_list_dp(pcb_numbers))
+
+
+def test_dp_falls_back_to_enumeration_beyond_its_budget():
+    pcb_numbers = PCB_LISTS[0]
+    json_data = call_list_dp(pcb_numbers, max_subsets=1)
+    assert "combinations_file" not in json_data
+    assert json_data["n_combinations"] == call_list_dp(pcb_numbers)["n_combinations"]
@@ -0,0 +1,78 @@
+"""
+The result cache answers identical requests with the stored result, never stores results cut short by a time limit,
+moves the streamed combinations into place along with the result and evicts the least recently used results.
+"""
+import sys, os.path as path
+sys.path.append(path.abspath(path.join(__file__, path.pardir, path.pardir)))
+
+import os
+
+from algorithms.bruteforce.serial import call_list
+from utils.result_cache import ResultCache, cached_call
+
+PCB_NUMBERS = list(range(1, 10))
+
+
+def test_key_depends_on_the_request(tmp_path):
+    cache = ResultCache(cache_path=str(tmp_path))
+    key = cache.key(PCB_NUMBERS, 15, "call_list")
+    assert cache.key(list(reversed(PCB_NUMBERS)) + [1], 15, "call_list") == key
+    assert cache.key(PCB_NUMBERS, 14, "call_list") != key
+    assert cache.key(PCB_NUMBERS, 15, "call_list_sat") != key
+    assert cache.key(PCB_NUMBERS[:-1], 15, "call_list") != key
+
+
+def test_final_results_are_cached(tmp_path):
+    cache = ResultCache(cache_path=str(tmp_path))
+    key = cache.key(PCB_NUMBERS, 15, "call_list")
+    calls = []
+
+    def optimizer(pcb_numbers):
+        calls.append(pcb_numbers)
+        return call_list(pcb_numbers)
+
+    json_data = cached_call(cache, key, optimizer, PCB_NUMBERS)
+    assert cached_call(cache, key, optimizer, PCB_NUMBERS) == json_data
+    assert len(calls) == 1
+
+
+def test_results_cut_short_are_not_cached(tmp_path):
+    cache = ResultCache(cache_path=str(tmp_path))
+    for number, json_data in enumerate([{"groups": [], "optimal": False}, {"combinations": [], "complete": False}, {"Error": "no PCBs"}]):
+        key = cache.key(PCB_NUMBERS, 15, f"mode {number}")
+        assert cached_call(cache, key, lambda pcb_numbers: json_data, PCB_NUMBERS) == json_data
+        assert cache.get(key) is None
+
+
+def test_streamed_combinations_are_moved_into_place(tmp_path):
+    cache = ResultCache(cache_path=str(tmp_path))
+    key = cache.key(PCB_NUMBERS, 15, "call_list")
+    first, second = cache.combinations_path(key), cache.combinations_path(key)
+    assert first != second                              # concurrent identical requests never share a file
+
+    json_data = cached_call(cache, key, call_list, PCB_NUMBERS, output_path=first)
+    call_list(PCB_NUMBERS, output_path=second)
+    assert sorted(os.listdir(tmp_path)) == sorted([f"{key}.json", f"{key}.ndjson", path.basename(second)])
+    assert json_data["combinations_file"] == os.path.join(str(tmp_path), f"{key}.ndjson")
+
+    cached = cache.get(key)
+    assert cached == json_data
+    with open(cached["combinations_file"]) as file:
+        assert sum(1 for _ in file) == cached["n_combinations"]
+
+    os.remove(cached["combinations_file"])              # a streamed result is gone once its combinations are evicted
+    assert cache.get(key) is None
+
+
+def test_least_recently_used_results_are_evicted(tmp_path):
+    cache = ResultCache(cache_path=str(tmp_path))
+    keys = [cache.key(PCB_NUMBERS, 15, f"mode {number}") for number in range(3)]
+    for number, key in enumerate(keys):
+        cache.put(key, {"groups": [{"group_id": 1, "PCBs": ["PCB001"]}]})
+        os.utime(os.path.join(str(tmp_path), f"{key}.json"), (number, number))
+    cache.get(keys[0])                                  # marks the oldest result as recently used
+
+    cache.max_bytes = 2 * os.path.getsize(os.path.join(str(tmp_path), f"{keys[0]}.json"))
+    cache.evict()
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[0]) is not None and cache.get(keys[2]) is not None
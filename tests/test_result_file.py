@@ -0,0 +1,62 @@
+"""
+A result written by write_result_file reads back as the result of the optimizer, in every format of the optimizers,
+and any of its combinations can be read on its own.
+"""
+import sys, os.path as path
+sys.path.append(path.abspath(path.join(__file__, path.pardir, path.pardir)))
+
+import pytest
+
+from algorithms.bruteforce.hybrid import call_list_hybrid
+from algorithms.bruteforce.serial import call_list
+from utils.result_file import ResultFile, write_result_file
+
+PCB_NUMBERS = list(range(1, 13))
+
+
+def test_combinations_round_trip(tmp_path):
+    json_data = call_list(PCB_NUMBERS)
+    result = ResultFile(write_result_file(str(tmp_path / "0.groups"), json_data))
+    assert len(result) == len(json_data["combinations"])
+    assert result.to_json() == json_data
+
+
+def test_groups_round_trip(tmp_path):
+    json_data = call_list_hybrid(PCB_NUMBERS, time_limit=30)
+    result = ResultFile(write_result_file(str(tmp_path / "0.groups"), json_data))
+    assert len(result) == 1
+    assert result.to_json() == json_data
+
+
+def test_streamed_combinations_are_read_from_their_file(tmp_path):
+    in_memory = call_list(PCB_NUMBERS)
+    streamed = call_list(PCB_NUMBERS, output_path=str(tmp_path / "combinations.ndjson"))
+    result = ResultFile(write_result_file(str(tmp_path / "0.groups"), streamed))
+    assert len(result) == streamed["n_combinations"] == len(in_memory["combinations"])
+    assert result.to_json()["combinations"] == in_memory["combinations"]
+    assert result.metadata["n_combinations"] == streamed["n_combinations"]
+
+
+def test_random_access(tmp_path):
+    json_data = call_list(PCB_NUMBERS)
+    result = ResultFile(write_result_file(str(tmp_path / "0.groups"), json_data))
+    last = len(json_data["combinations"])
+    assert result.combination(last) == json_data["combinations"][-1][f"combination{last}"]
+    with pytest.raises(IndexError):
+        result.combination(last + 1)
+    with pytest.raises(IndexError):
+        result.combination(0)
+
+
+def test_result_without_combinations(tmp_path):
+    json_data = {"Error": "empty input list"}
+    result = ResultFile(write_result_file(str(tmp_path / "0.groups"), json_data))
+    assert len(result) == 0
+    assert result.to_json() == json_data
+
+
+def test_other_files_are_rejected(tmp_path):
+    file_path = tmp_path / "0.json"
+    file_path.write_bytes(b"{}" * 32)
+    with pytest.raises(ValueError):
+        ResultFile(str(file_path))
@@ -0,0 +1,49 @@
+"""
+score_combinations simulates the schedule of production_plan for all combinations at once, so both have to agree on
+which combinations meet every delivery date.
+"""
+import sys, os.path as path
+sys.path.append(path.abspath(path.join(__file__, path.pardir, path.pardir)))
+
+import datetime as dt
+
+import numpy as np
+
+from algorithms.bruteforce.serial import call_list
+from algorithms.dataset import pcb_name
+from algorithms.objects import CombinationTable
+from algorithms.scheduling import production_plan, score_combinations
+
+PCB_NUMBERS = list(range(1, 10))
+START_DATE = dt.datetime(2024, 10, 3)
+
+
+def random_plan(rng):
+    # orders of 2 to 5 PCBs due on each of the next three days
+    sap_plan = []
+    for day in (1, 2, 3):
+        pcbs = sorted(rng.choice(PCB_NUMBERS, size=rng.integers(2, 6), replace=False).tolist())
+        sap_plan.append((START_DATE + dt.timedelta(days=day), [pcb_name(pcb) for pcb in pcbs], rng.integers(100, 900, size=len(pcbs)).tolist()))
+    return sap_plan
+
+
+def test_score_combinations_matches_production_plan():
+    table = CombinationTable.from_json(call_list(PCB_NUMBERS))
+    rng = np.random.default_rng(0)
+    n_feasible = 0
+    for _ in range(20):
+        sap_plan = random_plan(rng)
+        feasible, slack = score_combinations(table, sap_plan, START_DATE)
+        expected = [production_plan(table.mapping(row), sap_plan, START_DATE)[1] for row in range(len(table))]
+        assert feasible.tolist() == expected
+        assert (slack[~feasible] == 0).all() and (slack[feasible] >= 0).all()
+        n_feasible += feasible.sum()
+    assert 0 < n_feasible < 20 * len(table)             # the plans tell the combinations apart
+
+
+def test_orders_of_pcbs_outside_of_the_combinations_are_infeasible():
+    table = CombinationTable.from_json(call_list(PCB_NUMBERS))
+    sap_plan = [(START_DATE + dt.timedelta(days=1), [pcb_name(1), pcb_name(20)], [10, 10])]
+    feasible, slack = score_combinations(table, sap_plan, START_DATE)
+    assert not feasible.any()
+    assert (slack == 0).all()
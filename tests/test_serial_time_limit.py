@@ -0,0 +1,29 @@
+"""
+The serial optimizer answers the chat within its time limit ( CHAT_TIME_LIMIT ), also for lists of PCBs with far more
+optimal combinations than it can collect in that time.
+"""
+import sys, os.path as path
+sys.path.append(path.abspath(path.join(__file__, path.pardir, path.pardir)))
+
+import time
+
+from algorithms.bruteforce.serial import MAX_COMBINATIONS_IN_MEMORY, call_list
+
+TIME_LIMIT = 3          # seconds
+TOLERANCE = 1           # seconds for loading the PCBs and building the answer after the deadline
+
+
+def test_call_list_returns_within_time_limit():
+    start = time.monotonic()
+    json_data = call_list(list(range(1, 51)), time_limit=TIME_LIMIT)
+    assert time.monotonic() - start <= TIME_LIMIT + TOLERANCE
+    assert json_data["complete"] is False
+    assert 1 <= len(json_data["combinations"]) <= MAX_COMBINATIONS_IN_MEMORY
+
+
+def test_call_list_streaming_returns_within_time_limit(tmp_path):
+    start = time.monotonic()
+    json_data = call_list(list(range(1, 51)), output_path=str(tmp_path / "combinations.ndjson"), time_limit=TIME_LIMIT)
+    assert time.monotonic() - start <= TIME_LIMIT + TOLERANCE
+    assert json_data["complete"] is False
+    assert json_data["n_combinations"] >= 1
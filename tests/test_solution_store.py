@@ -0,0 +1,95 @@
+"""
+The solution store keeps the solutions of every session within its byte budget, spills the least recently used ones
+to disk and loads them back when they are used, also while other threads store solutions.
+"""
+import sys, os.path as path
+sys.path.append(path.abspath(path.join(__file__, path.pardir, path.pardir)))
+
+import os
+import threading
+
+import numpy as np
+import pytest
+
+from utils.solution_store import SessionSolutions, SolutionStore, deep_sizeof
+
+
+def solution(number):
+    return {"combinations": np.full(10000, number)}
+
+
+SIZE = deep_sizeof(solution(0))
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SolutionStore(max_bytes=3 * SIZE, spill_bytes=2 * SIZE, spill_path=str(tmp_path / "solutions"), max_spill_bytes=10 * SIZE)
+
+
+def test_least_recently_used_solutions_are_spilled(store):
+    for number in range(5):
+        store.put(f"session {number}", "current_solutions", solution(number))
+    assert store.memory_bytes <= store.max_bytes
+    assert len(os.listdir(store.spill_path)) == 2
+    for number in range(5):                             # spilled solutions are loaded back from disk
+        assert store.get(f"session {number}", "current_solutions")["combinations"][0] == number
+
+
+def test_large_solutions_are_spilled_right_away(store):
+    store.put("session", "current_solutions", {"combinations": np.zeros(3 * 10000)})
+    assert store.memory_bytes == 0
+    assert len(os.listdir(store.spill_path)) == 1
+    assert len(store.get("session", "current_solutions")["combinations"]) == 3 * 10000
+
+
+def test_replaced_and_discarded_solutions_are_removed_from_disk(store):
+    for number in range(5):
+        store.put(f"session {number}", "current_solutions", solution(number))
+    store.put("session 0", "current_solutions", solution(9))
+    store.discard("session 1", "current_solutions")
+    assert store.get("session 0", "current_solutions")["combinations"][0] == 9
+    assert store.get("session 1", "current_solutions") is None
+    assert len(os.listdir(store.spill_path)) == 1      # only session 2, spilled to make room for session 0
+    assert store.spilled_bytes == sum(os.path.getsize(entry.path) for entry in os.scandir(store.spill_path))
+
+
+def test_spilled_solutions_beyond_the_disk_budget_are_dropped(tmp_path):
+    store = SolutionStore(max_bytes=SIZE, spill_bytes=SIZE, spill_path=str(tmp_path), max_spill_bytes=int(2.5 * SIZE))
+    for number in range(5):
+        store.put(f"session {number}", "current_solutions", solution(number))
+    assert store.get("session 0", "current_solutions") is None
+    assert store.get("session 4", "current_solutions")["combinations"][0] == 4
+    assert store.spilled_bytes <= store.max_spill_bytes
+
+
+def test_session_solutions_are_separated(store):
+    first, second = SessionSolutions(lambda: "first", store), SessionSolutions(lambda: "second", store)
+    first["current_solutions"] = solution(1)
+    second["result_file"] = "output/0.groups"
+    assert list(first) == ["current_solutions"] and list(second) == ["result_file"]
+    assert "result_file" not in first
+    with pytest.raises(KeyError):
+        del first["result_file"]
+    del second["result_file"]
+    assert len(second) == 0
+
+
+def test_concurrent_use(store):
+    errors = []
+
+    def work(thread):
+        for number in range(100):
+            session = f"session {(thread * 7 + number) % 10}"
+            store.put(session, "current_solutions", solution(number))
+            value = store.get(session, "current_solutions")
+            if value is not None and not isinstance(value, dict):
+                errors.append(value)
+
+    threads = [threading.Thread(target=work, args=(thread,)) for thread in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors
+    assert store.memory_bytes <= store.max_bytes
+    assert sorted(os.listdir(store.spill_path)) == sorted(path.basename(file_path) for file_path, _ in store._spilled.values())
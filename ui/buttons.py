@@ -2,6 +2,7 @@ import sys, os.path as path
 sys.path.append(path.abspath(path.join(__file__, path.pardir, path.pardir)))
 
 import utils.csv_utils as csv_utils
+from utils.result_file import RESULT_FILE_EXTENSION, ResultFile
 import mqtt.connection as mqtt_connection
 import llm.setup as llmchat
 
@@ -19,7 +20,7 @@ class DataExport:
     path: str
 
     def __post_init__(self):
-        self.id = int(os.path.basename(self.path)[:-len(".json")])
+        self.id = int(os.path.splitext(os.path.basename(self.path))[0])
 
     def __get_json_data(self) -> dict:
         with open(self.path) as file:
@@ -29,6 +30,8 @@ class DataExport:
     @st.cache_data
     def get_tabular_csv(self) -> str:
         """Loads JSON data and returns it as a Pandas DataFrame."""
+        if self.path.endswith(RESULT_FILE_EXTENSION):
+            return csv_utils.result_file_to_tabular_csv(self.id, ResultFile(self.path))
         return csv_utils.json_solution_to_tabular_csv(
             self.id,
             self.__get_json_data()
@@ -59,6 +62,8 @@ EXPORTING_FUNCTIONS = [func.func.__name__ for func in [
     llmchat.CallSerialOptimizer,
     llmchat.CallHybridOptimizer,
     llmchat.CallParallelOptimizer,
+    llmchat.CallSATOptimizer,
+    llmchat.CallCountingOptimizer,
 ]]
 
 @dataclass
@@ -68,6 +73,7 @@ class OrderDeployment:
 
 DEPLOYING_FUNCTIONS = [func.func.__name__ for func in [
     llmchat.PrioritizeBasedOnSAP,
+    llmchat.PlanProductionWithSAP,
 ]]
 
 
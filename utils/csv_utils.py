@@ -38,6 +38,23 @@ def _combination_to_csv(json_data: dict, combination_id: int, writer) -> None:
             writer.writerow([combination_id, group_id, pcb])
 
 
+def result_file_to_tabular_csv(file_id: int, result_file) -> str:
+    # Streams the combinations of a ResultFile of utils.result_file into the csv file
+    path = os.path.abspath(os.path.join(
+        __file__,
+        os.path.pardir,
+        os.path.pardir,
+        f"output/{file_id}_tabular.csv"
+    ))
+
+    with open(path, "w") as file:
+        writer = csv.writer(file, lineterminator="\n")
+        for combination_id, groups in enumerate(result_file.combinations(), start=1):
+            _combination_to_csv({"groups": groups}, combination_id, writer)
+
+    return path
+
+
 def json_solution_to_tabular_csv(file_id: int, json_data: dict) -> str:
     path = os.path.abspath(os.path.join(
         __file__,
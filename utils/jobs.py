@@ -0,0 +1,138 @@
+import sys, os.path as path
+sys.path.append(path.abspath(path.join(__file__, path.pardir, path.pardir)))
+
+import itertools
+import multiprocessing
+import threading
+import time
+
+import psutil
+
+from algorithms.progress import SearchProgress
+
+
+# Function running an optimization in the job process and sending its result back to the UI process
+def _run(function, args, kwargs, progress, connection):
+    try:
+        result = function(*args, progress=progress, **kwargs)
+        connection.send(("done", result))
+    except Exception as e:
+        connection.send(("failed", repr(e)))
+    finally:
+        connection.close()
+
+
+class Job:
+    """
+    An optimization running in its own process. The UI polls it for its progress and its result, so neither a long
+    search nor a rerun of the Streamlit script blocks the other.
+    """
+
+    def __init__(self, job_id, name, session, function, args, kwargs, instrumented=False):
+        self.id = job_id
+        self.name = name
+        self.session = session
+        self.progress = SearchProgress(instrumented)
+        self.status = "running"                 # running, done, failed or cancelled
+        self.result = None
+        self.started = time.time()
+        self.finished = None
+
+        self._receiver, sender = multiprocessing.Pipe(duplex=False)
+        # not a daemon: the engines start worker processes of their own, which daemons must not do
+        self._process = multiprocessing.Process(target=_run, args=(function, args, kwargs, self.progress, sender))
+        self._process.start()
+        sender.close()
+
+    @property
+    def running(self) -> bool:
+        return self.status == "running"
+
+    @property
+    def elapsed(self) -> float:
+        return (self.finished or time.time()) - self.started
+
+    def poll(self) -> str:
+        """ Collects the result if the job finished and returns the status of the job. """
+        if not self.running:
+            return self.status
+        if self._receiver.poll():
+            try:
+                self.status, self.result = self._receiver.recv()
+            except EOFError:                    # the process died before sending its result
+                self.status, self.result = "failed", "The optimization process ended unexpectedly."
+        elif not self._process.is_alive():
+            self.status, self.result = "failed", "The optimization process ended unexpectedly."
+        else:
+            return self.status
+        self._finish()
+        return self.status
+
+    def cancel(self) -> None:
+        """ Stops the job together with the worker processes it started. """
+        if not self.running:
+            return
+        try:
+            parent = psutil.Process(self._process.pid)
+            for child in parent.children(recursive=True):
+                child.kill()
+            parent.kill()
+        except psutil.NoSuchProcess:
+            pass
+        self.status = "cancelled"
+        self._finish()
+
+    def _finish(self):
+        self.finished = time.time()
+        self._process.join(timeout=1)
+        self._receiver.close()
+
+
+class JobManager:
+    """
+    The optimization jobs of all sessions of the Streamlit server. It lives in the server process, so the jobs of a
+    session survive reruns of its script.
+    """
+
+    def __init__(self):
+        self._jobs = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def submit(self, name, session, function, *args, instrumented=False, **kwargs) -> Job:
+        """
+        Starts function(*args, progress=..., **kwargs) in a background process. An instrumented job also collects the
+        search statistics of SearchProgress, which slows the search down a little.
+        """
+        with self._lock:
+            job = Job(next(self._ids), name, session, function, args, kwargs, instrumented)
+            self._jobs[job.id] = job
+        return job
+
+    def get(self, job_id):
+        return self._jobs.get(job_id)
+
+    def jobs_of(self, session) -> list:
+        """ Returns the jobs of a session, oldest first, after polling them. """
+        with self._lock:
+            jobs = [job for job in self._jobs.values() if job.session == session]
+        for job in jobs:
+            job.poll()
+        return jobs
+
+    def forget(self, job_id) -> None:
+        """ Removes a job that is no longer running. """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and not job.running:
+                del self._jobs[job_id]
+
+
+_job_manager = None
+
+
+def get_job_manager() -> JobManager:
+    global _job_manager
+    if _job_manager is None:
+        _job_manager = JobManager()
+    return _job_manager
@@ -0,0 +1,160 @@
+import sys, os.path as path
+sys.path.append(path.abspath(path.join(__file__, path.pardir, path.pardir)))
+
+import hashlib
+import json
+import os
+import tempfile
+import threading
+
+from algorithms.dataset import DEFAULT_DATASET_PATH, MATERIAL_CATALOGUE_FILE, PACKED_DATASET_FILE, pcb_name
+
+DEFAULT_CACHE_PATH = os.path.abspath(os.path.join(
+    __file__,
+    os.path.pardir,
+    os.path.pardir,
+    "output/cache"
+))
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024     # the least recently used results are evicted beyond this size
+
+
+class ResultCache:
+    """
+    On-disk cache of optimizer results, shared by all sessions and kept across restarts. A result is stored under a
+    hash of everything it depends on: the set of PCBs, the maximum slot width, the engine and the contents of the
+    dataset files it was computed from, so a changed catalogue or bill of material never returns a stale result.
+    The modification time of a result file is its last use, and the least recently used files are evicted once the
+    cache grows beyond max_bytes.
+    """
+
+    def __init__(self, cache_path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES, dataset_path=DEFAULT_DATASET_PATH):
+        self.cache_path = cache_path
+        self.max_bytes = max_bytes
+        self.dataset_path = dataset_path
+        self._digests = {}                    # file name -> (modification time, size, sha256 of the contents)
+        self._lock = threading.Lock()
+
+    def _file_digest(self, file_name: str) -> str:
+        file_path = os.path.join(self.dataset_path, file_name)
+        stat = os.stat(file_path)
+        with self._lock:
+            cached = self._digests.get(file_name)
+        if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+            return cached[2]
+        with open(file_path, "rb") as file:
+            digest = hashlib.sha256(file.read()).hexdigest()
+        with self._lock:
+            self._digests[file_name] = (stat.st_mtime_ns, stat.st_size, digest)
+        return digest
+
+    def key(self, pcb_numbers, C_max: int, mode: str) -> str:
+        """ Returns the cache key of an optimization of the PCBs with the given engine. """
+        pcb_numbers = sorted(set(pcb_numbers))
+        files = [MATERIAL_CATALOGUE_FILE] + [f"{pcb_name(pcb_number)}.csv" for pcb_number in pcb_numbers]
+        files = [file_name for file_name in files if os.path.isfile(os.path.join(self.dataset_path, file_name))]
+        if os.path.isfile(os.path.join(self.dataset_path, PACKED_DATASET_FILE)):     # a packed dataset may hold the data instead
+            files.append(PACKED_DATASET_FILE)
+        description = {
+            "pcbs": pcb_numbers,
+            "C_max": C_max,
+            "mode": mode,
+            "dataset": [self._file_digest(file_name) for file_name in files],
+        }
+        return hashlib.sha256(json.dumps(description).encode()).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_path, f"{key}.json")
+
+    def combinations_path(self, key: str) -> str:
+        """
+        Path of a new temporary NDJSON file the combinations of a streamed result of a key are written to. put moves it
+        into place along with the result, so concurrent identical optimizations never write to the same file.
+        """
+        os.makedirs(self.cache_path, exist_ok=True)
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.cache_path, prefix=f"{key}.", suffix=".ndjson.tmp")
+        os.close(descriptor)
+        return temporary_path
+
+    def get(self, key: str):
+        """ Returns the cached result of a key, or None if there is none. """
+        try:
+            with open(self._path(key)) as file:
+                json_data = json.load(file)
+            os.utime(self._path(key))         # mark the result as recently used
+            if "combinations_file" in json_data:
+                os.utime(json_data["combinations_file"])    # a streamed result is gone once its combinations are evicted
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        return json_data
+
+    def put(self, key: str, json_data: dict) -> None:
+        """
+        Stores a result, replacing it atomically so concurrent readers never see a partial file. The combinations file
+        of a streamed result is renamed to its place in the cache first, and json_data updated to point to it.
+        """
+        os.makedirs(self.cache_path, exist_ok=True)
+        combinations_file = json_data.get("combinations_file")
+        if combinations_file and combinations_file.endswith(".ndjson.tmp") and \
+                os.path.dirname(os.path.abspath(combinations_file)) == os.path.abspath(self.cache_path):
+            final_path = os.path.join(self.cache_path, f"{key}.ndjson")
+            os.replace(combinations_file, final_path)
+            json_data["combinations_file"] = final_path
+        data = json.dumps(json_data)
+        if len(data) > self.max_bytes:        # it would evict every other result and then itself
+            return
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.cache_path, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w") as file:
+                file.write(data)
+            os.replace(temporary_path, self._path(key))
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+        self.evict()
+
+    def evict(self) -> None:
+        """
+        Removes the least recently used results and combination files until the cache fits into max_bytes, including
+        the temporary combination files of results which were not cached because they were cut short.
+        """
+        entries = []
+        for entry in os.scandir(self.cache_path):
+            if entry.name.endswith((".json", ".ndjson", ".ndjson.tmp")):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, file_path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:         # already evicted by another process
+                pass
+            total -= size
+
+
+def is_final(json_data: dict) -> bool:
+    # Results cut short by a time limit must not be answered from the cache
+    return "Error" not in json_data and json_data.get("optimal", True) and json_data.get("complete", True)
+
+
+def cached_call(cache, key, function, *args, **kwargs):
+    """
+    Returns the cached result of key, or calls function(*args, **kwargs) and caches its result if it is final.
+    """
+    json_data = cache.get(key)
+    if json_data is None:
+        json_data = function(*args, **kwargs)
+        if is_final(json_data):
+            cache.put(key, json_data)
+    return json_data
+
+
+_result_cache = None
+
+
+def get_result_cache() -> ResultCache:
+    global _result_cache
+    if _result_cache is None:
+        _result_cache = ResultCache()
+    return _result_cache
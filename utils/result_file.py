@@ -0,0 +1,164 @@
+import sys, os.path as path
+sys.path.append(path.abspath(path.join(__file__, path.pardir, path.pardir)))
+
+import os
+import struct
+import tempfile
+from array import array
+
+import numpy as np
+import orjson
+
+RESULT_FILE_EXTENSION = ".groups"
+MAGIC = b"PCBGRP01"
+TRAILER = struct.Struct("<Q8s")          # length of the footer and the magic bytes, at the end of the file
+CHUNK_SIZE = 1 << 16                     # group ids spooled or copied at once
+
+
+def iter_combinations(json_data):
+    """
+    Yields the groups of every combination of an optimizer result, in any of the formats of the optimizers. The
+    combinations of a result streamed to an NDJSON file ( combinations_file ) are read from that file one at a time.
+    """
+    if json_data.get("combinations_file") and os.path.isfile(json_data["combinations_file"]):
+        with open(json_data["combinations_file"], "rb") as file:
+            for line in file:
+                if line.strip():
+                    yield next(iter(orjson.loads(line).values()))
+    elif "groups" in json_data:
+        yield json_data["groups"]
+    else:
+        for combination in json_data.get("combinations", []):
+            yield next(iter(combination.values()))
+
+
+def _smallest_dtype(maximum):
+    return next(dtype for dtype in (np.uint8, np.uint16, np.uint32, np.uint64) if maximum <= np.iinfo(dtype).max)
+
+
+def write_result_file(file_path, json_data) -> str:
+    '''
+    This function writes an optimizer result in the compact result format. Every distinct group is stored once in a
+    group table and every combination as the ids of its groups, so combinations sharing most of their groups take a
+    few bytes each. The file consists of:
+        - the magic bytes,
+        - the group ids of all combinations, in the smallest unsigned integer type that fits the group table,
+        - the offset index: the position of the first group id of every combination and the total, in the smallest
+          unsigned integer type that fits the total,
+        - the footer, a JSON object with the group table, the layout and the other keys of the result,
+        - the length of the footer and the magic bytes again.
+
+    :param file_path: Path of the result file.
+    :param json_data: json dictionary returned by an optimizer.
+    :return: The path of the result file.
+    '''
+    group_ids = {}                                      # PCBs of a group -> its id in the group table
+    lengths = array("L")                                # number of groups of every combination
+    directory = os.path.dirname(os.path.abspath(file_path))
+
+    # the group ids are spooled while the group table grows, and narrowed once its size is known
+    with tempfile.TemporaryFile(dir=directory) as spool:
+        chunk = array("L")
+        for groups in iter_combinations(json_data):
+            for group in groups:
+                chunk.append(group_ids.setdefault(tuple(group["PCBs"]), len(group_ids)))
+            lengths.append(len(groups))
+            if len(chunk) >= CHUNK_SIZE:
+                spool.write(np.asarray(chunk, dtype=np.uint32).tobytes())
+                chunk = array("L")
+        spool.write(np.asarray(chunk, dtype=np.uint32).tobytes())
+
+        offsets = np.zeros(len(lengths) + 1, dtype=np.uint64)
+        np.cumsum(np.asarray(lengths, dtype=np.uint64), out=offsets[1:])
+        group_dtype = _smallest_dtype(max(len(group_ids) - 1, 0))
+        index_dtype = _smallest_dtype(offsets[-1])
+
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                file.write(MAGIC)
+                records_offset = file.tell()
+                spool.seek(0)
+                while data := spool.read(CHUNK_SIZE * 4):
+                    file.write(np.frombuffer(data, dtype=np.uint32).astype(group_dtype).tobytes())
+                file.write(b"\0" * (-file.tell() % 8))          # the index is aligned to its item size
+                index_offset = file.tell()
+                file.write(offsets.astype(index_dtype).tobytes())
+
+                footer = orjson.dumps({
+                    "version": 1,
+                    "n_combinations": len(lengths),
+                    "group_dtype": np.dtype(group_dtype).name,
+                    "records_offset": records_offset,
+                    "index_dtype": np.dtype(index_dtype).name,
+                    "index_offset": index_offset,
+                    "format": "groups" if "groups" in json_data else "combinations" if len(lengths) or "combinations" in json_data else None,
+                    "groups": list(group_ids),
+                    "metadata": {key: value for key, value in json_data.items() if key not in ("groups", "combinations")},
+                }, option=orjson.OPT_SERIALIZE_NUMPY)
+                file.write(footer)
+                file.write(TRAILER.pack(len(footer), MAGIC))
+            os.replace(temporary_path, file_path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+    return file_path
+
+
+class ResultFile:
+    """
+    Random access to a result file written by write_result_file. Opening it only reads the footer, and the group ids
+    and the offset index are memory-mapped, so reading any combination takes constant time.
+
+    :param file_path: Path of the result file.
+    """
+
+    def __init__(self, file_path):
+        self.path = file_path
+        with open(file_path, "rb") as file:
+            file.seek(-TRAILER.size, os.SEEK_END)
+            footer_length, magic = TRAILER.unpack(file.read(TRAILER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{file_path} is not a result file.")
+            file.seek(-TRAILER.size - footer_length, os.SEEK_END)
+            footer = orjson.loads(file.read(footer_length))
+
+        self.groups = [list(group) for group in footer["groups"]]         # group table
+        self.metadata = footer["metadata"]                                  # the other keys of the result, e.g. optimal
+        self.format = footer["format"]                                      # key of the combinations in the result
+        self._index = self._map(footer["index_dtype"], footer["index_offset"], footer["n_combinations"] + 1)
+        self._records = self._map(footer["group_dtype"], footer["records_offset"], int(self._index[-1]) if len(self._index) else 0)
+
+    def _map(self, dtype, offset, length):
+        if length == 0:                                     # an empty range cannot be mapped
+            return np.zeros(length, dtype=dtype)
+        return np.memmap(self.path, dtype=dtype, mode="r", offset=offset, shape=(length,))
+
+    def __len__(self):
+        return len(self._index) - 1
+
+    def group_ids(self, number: int) -> list[int]:
+        """ Ids in the group table of the groups of combination number ( counted from 1 ). """
+        if not 1 <= number <= len(self):
+            raise IndexError(f"There are {len(self)} combinations, combination {number} does not exist.")
+        return self._records[int(self._index[number - 1]):int(self._index[number])].tolist()
+
+    def combination(self, number: int) -> list[dict]:
+        """ Groups of combination number ( counted from 1 ) in the format of the optimizers. """
+        return [{"group_id": group_id, "PCBs": self.groups[group]} for group_id, group in enumerate(self.group_ids(number), start=1)]
+
+    def combinations(self):
+        """ Yields the groups of every combination, in the format of the optimizers. """
+        for number in range(1, len(self) + 1):
+            yield self.combination(number)
+
+    def to_json(self) -> dict:
+        """ The result as returned by the optimizer, with all of its combinations. """
+        if self.format == "groups":
+            json_data = {"groups": self.combination(1)}
+        elif self.format == "combinations":
+            json_data = {"combinations": [{f"combination{number}": groups} for number, groups in enumerate(self.combinations(), start=1)]}
+        else:
+            json_data = {}
+        json_data.update(self.metadata)
+        return json_data
@@ -0,0 +1,244 @@
+import sys, os.path as path
+sys.path.append(path.abspath(path.join(__file__, path.pardir, path.pardir)))
+
+import itertools
+import os
+import pickle
+import shutil
+import threading
+from collections import OrderedDict
+from collections.abc import MutableMapping
+
+import numpy as np
+
+DEFAULT_SPILL_PATH = os.path.abspath(os.path.join(
+    __file__,
+    os.path.pardir,
+    os.path.pardir,
+    "output/solutions"
+))
+FALLBACK_MAX_BYTES = 512 * 1024 * 1024          # budget if the memory limit of the container is unknown
+MEMORY_LIMIT_SHARE = 4                          # the store takes at most a quarter of the memory limit
+DEFAULT_MAX_SPILL_BYTES = 4 * 1024 * 1024 * 1024
+CGROUP_MEMORY_LIMITS = ["/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory/memory.limit_in_bytes"]
+
+
+def memory_limit():
+    """ Memory limit of the container ( cgroup v2 or v1 ), None if there is none. """
+    for limit_path in CGROUP_MEMORY_LIMITS:
+        try:
+            with open(limit_path) as file:
+                limit = file.read().strip()
+        except OSError:
+            continue
+        if limit.isdigit() and int(limit) < 1 << 60:        # "max" or a huge number mean unlimited
+            return int(limit)
+    return None
+
+
+def default_max_bytes() -> int:
+    """ Byte budget of the store: SOLUTION_STORE_MAX_BYTES if set, else a share of the memory limit of the container. """
+    if os.environ.get("SOLUTION_STORE_MAX_BYTES"):
+        return int(os.environ["SOLUTION_STORE_MAX_BYTES"])
+    limit = memory_limit()
+    return limit // MEMORY_LIMIT_SHARE if limit else FALLBACK_MAX_BYTES
+
+
+def deep_sizeof(value) -> int:
+    """
+    Bytes held by a value and everything it references, counting objects shared between its parts only once. Follows
+    containers, numpy arrays ( including the objects of object arrays and the base of views ) and instance attributes.
+    """
+    seen = set()
+    size = 0
+    stack = [value]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, type):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)              # numpy arrays that own their data include it
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        elif isinstance(obj, np.ndarray):
+            if obj.base is not None:
+                stack.append(obj.base)
+            if obj.dtype == object:
+                stack.extend(obj.ravel().tolist())
+        elif hasattr(obj, "__dict__") and not callable(obj):
+            stack.append(vars(obj))
+    return size
+
+
+class SolutionStore:
+    """
+    Solutions of the optimizations, kept per session of the app under a name ( e.g. current_solutions ). The store
+    holds at most max_bytes in memory, measured with deep_sizeof, and moves the least recently used solutions of all
+    sessions to disk beyond that. A solution larger than spill_bytes is pickled to disk right away. Spilled solutions
+    are only loaded when they are used, and dropped least recently used first beyond max_spill_bytes.
+
+    :param max_bytes: Bytes the solutions in memory may take.
+    :param spill_bytes: Solutions larger than this are kept on disk, by default an eighth of max_bytes.
+    :param spill_path: Directory of the spilled solutions, emptied when the store is created.
+    :param max_spill_bytes: Bytes the spilled solutions may take on disk.
+    """
+
+    def __init__(self, max_bytes=None, spill_bytes=None, spill_path=DEFAULT_SPILL_PATH, max_spill_bytes=DEFAULT_MAX_SPILL_BYTES):
+        self.max_bytes = max_bytes or default_max_bytes()
+        self.spill_bytes = spill_bytes or self.max_bytes // 8
+        self.spill_path = spill_path
+        self.max_spill_bytes = max_spill_bytes
+
+        self._memory = OrderedDict()            # (session, name) -> (value, bytes), least recently used first
+        self._spilled = OrderedDict()           # (session, name) -> (file path, bytes on disk)
+        self._spilling = {}                     # (session, name) -> (value, file path) while it is pickled
+        self._memory_bytes = 0
+        self._spilled_bytes = 0
+        self._file_ids = itertools.count()
+        self._lock = threading.RLock()
+
+        shutil.rmtree(spill_path, ignore_errors=True)       # the spilled solutions of earlier runs belong to no session
+        os.makedirs(spill_path, exist_ok=True)
+
+    @property
+    def memory_bytes(self) -> int:
+        return self._memory_bytes
+
+    @property
+    def spilled_bytes(self) -> int:
+        return self._spilled_bytes
+
+    def get(self, session, name, default=None):
+        """ Returns a solution of a session and marks it as recently used, or default if there is none. """
+        key = (session, name)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key][0]
+            if key in self._spilling:
+                return self._spilling[key][0]
+            if key not in self._spilled:
+                return default
+            self._spilled.move_to_end(key)
+            file_path = self._spilled[key][0]
+        # loaded outside of the lock, the file may have been dropped or replaced since, which counts as evicted
+        try:
+            with open(file_path, "rb") as file:
+                return pickle.load(file)
+        except FileNotFoundError:
+            return default
+
+    def put(self, session, name, value) -> None:
+        """ Stores a solution of a session, replacing the previous one of that name. """
+        key = (session, name)
+        size = deep_sizeof(value)
+        spills = []
+        with self._lock:
+            self.discard(session, name)
+            if size > self.spill_bytes:
+                spills.append(self._start_spill(key, value))
+            else:
+                self._memory[key] = (value, size)
+                self._memory_bytes += size
+                while self._memory_bytes > self.max_bytes:
+                    evicted_key, (evicted, evicted_size) = self._memory.popitem(last=False)
+                    self._memory_bytes -= evicted_size
+                    spills.append(self._start_spill(evicted_key, evicted))
+        # pickled outside of the lock, meanwhile the solutions being spilled are still served from memory
+        for spill_key, value, file_path in spills:
+            self._spill(spill_key, value, file_path)
+
+    def _start_spill(self, key, value) -> tuple:
+        # Reserves the file of a solution to be spilled, must be called with the lock held
+        file_path = os.path.join(self.spill_path, f"{next(self._file_ids)}.pickle")
+        self._spilling[key] = (value, file_path)
+        return key, value, file_path
+
+    def _spill(self, key, value, file_path) -> None:
+        # Pickles a solution to disk, swaps it in and drops the least recently used spilled solutions beyond max_spill_bytes
+        with open(file_path, "wb") as file:
+            pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+        removed = []
+        with self._lock:
+            if self._spilling.get(key, (None, None))[1] != file_path:
+                removed.append(file_path)           # replaced or discarded while it was pickled
+            else:
+                del self._spilling[key]
+                self._spilled[key] = (file_path, os.path.getsize(file_path))
+                self._spilled_bytes += self._spilled[key][1]
+                while self._spilled_bytes > self.max_spill_bytes and len(self._spilled) > 1:
+                    _, (evicted_path, evicted_size) = self._spilled.popitem(last=False)
+                    self._spilled_bytes -= evicted_size
+                    removed.append(evicted_path)
+        for removed_path in removed:
+            os.remove(removed_path)
+
+    def discard(self, session, name) -> None:
+        """ Removes a solution of a session if it is stored. """
+        key = (session, name)
+        with self._lock:
+            if key in self._memory:
+                self._memory_bytes -= self._memory.pop(key)[1]
+            self._spilling.pop(key, None)           # its file is removed once it is written
+            if key in self._spilled:
+                file_path, size = self._spilled.pop(key)
+                self._spilled_bytes -= size
+                os.remove(file_path)
+
+    def names(self, session) -> list:
+        """ Names of the solutions stored for a session. """
+        with self._lock:
+            return [name for (owner, name) in itertools.chain(self._memory, self._spilling, self._spilled) if owner == session]
+
+
+
+class SessionSolutions(MutableMapping):
+    """
+    The solutions of the current session as a dictionary. session_of is called on every access, so a single view can
+    be shared by the tools of all sessions.
+
+    :param session_of: Function returning the current session.
+    :param store: SolutionStore holding the solutions, by default the one of get_solution_store, created on first use.
+    """
+
+    def __init__(self, session_of, store=None):
+        self.session_of = session_of
+        self._store = store
+
+    @property
+    def store(self) -> SolutionStore:
+        return self._store or get_solution_store()
+
+    def __getitem__(self, name):
+        missing = object()
+        value = self.store.get(self.session_of(), name, missing)
+        if value is missing:
+            raise KeyError(name)
+        return value
+
+    def __setitem__(self, name, value):
+        self.store.put(self.session_of(), name, value)
+
+    def __delitem__(self, name):
+        if name not in self.store.names(self.session_of()):
+            raise KeyError(name)
+        self.store.discard(self.session_of(), name)
+
+    def __iter__(self):
+        return iter(self.store.names(self.session_of()))
+
+    def __len__(self):
+        return len(self.store.names(self.session_of()))
+
+
+_solution_store = None
+
+
+def get_solution_store() -> SolutionStore:
+    global _solution_store
+    if _solution_store is None:
+        _solution_store = SolutionStore()
+    return _solution_store